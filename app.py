@@ -1,42 +1,183 @@
+import asyncio
 import base64
 import configparser
+import cProfile
 import os
+import time
 from typing import Union, List, Dict
 
-from cassis.typesystem import load_typesystem
-from fastapi import FastAPI
-from pydantic import BaseModel
+# start of the import of app.py, for the startup report
+IMPORT_START = time.perf_counter()
 
-from question_generator.scripts import generate_question_from_text
-from src.annotations.annotations import AnnotationAdder
-from src.cleaning.cleaning_tika import get_text_tika
-from src.cleaning.cleaning_trafilatura import get_json_trafilatura
-from src.sentence_classification.trainer_bert_sequence_classifier import TrainerBertSequenceClassifier
-from src.terms.terms import TermExtractor
+from src import instrumentation
+from src.parallelism import configure_parallelism, get_spacy_n_process
+from src.profiling import RequestProfiler
 
 # path to the model for sentence classification:
 PATH_MODEL = "/work/models"
 # path to the media folder ( typesystem and config file with names of the annotations )
 MEDIA_ROOT = "media"
 
-# load the model for sentence classification
-trainer_bert_sequence_classifier = \
-    TrainerBertSequenceClassifier( \
-        pretrained_model_name_or_path=PATH_MODEL, model_type='DISTILBERT')
+# Load config file with the names of the annotations and the service settings
+config = configparser.ConfigParser()
+config.read(os.path.join(MEDIA_ROOT, 'TermExtraction.config'))
+
+
+def get_optional_int(section: str, key: str) -> Union[int, type(None)]:
+    # empty (or missing) settings in the config file mean: use the default
+    value = config.get(section, key, fallback='').strip()
+    return int(value) if value else None
+
+
+# thread settings (see [Parallelism] section of the config file) should be configured before torch, spacy and numpy
+# are imported, because OpenMP and MKL read OMP_NUM_THREADS and MKL_NUM_THREADS when they are initialized.
+if 'Parallelism' in config:
+    configure_parallelism(config['Parallelism'])
+
+# stage timers, per-request logs and the /metrics endpoint (see [Instrumentation] section of the config file)
+if 'Instrumentation' in config:
+    instrumentation.configure_instrumentation(config['Instrumentation'])
+
+from cassis.typesystem import load_typesystem
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+from question_generator.question_cache import QuestionCache
+from src.annotations.annotations import AnnotationAdder
+from src.components import ComponentRegistry
+from src.jobs.job_queue import JobQueue, JobQueueFullError
+from src.jobs.store import DiskJobStore, InMemoryJobStore
+from src.service_profiles import ServiceProfile, parse_list
+from src.terms.document_frequency import load_document_frequency_table
+from src.terms.scoring import TermScorer
 
 with open(os.path.join(MEDIA_ROOT, 'typesystem.xml'), 'rb') as f:
     TYPESYSTEM = load_typesystem(f)
 
-# Load config file with the annotations
-config = configparser.ConfigParser()
-config.read(os.path.join(MEDIA_ROOT, 'TermExtraction.config'))
-
 annotation_adder = AnnotationAdder(TYPESYSTEM, config)
 
-# all supported languages: [ 'en', 'de', 'nl', 'fr', 'it', 'nb', 'sl', 'hr']
+# The heavy components (models and the libraries they need: spacy, torch, transformers, tika...) are imported and
+# loaded on first use, or by the warm-up started at startup (see [Startup] section of the config file), so the
+# endpoints that do not need them (e.g. /chunking) can be served right away.
+components = ComponentRegistry()
+
+# components needed by the endpoints, an endpoint also covers the paths below it (e.g. /question_generator/jobs)
+ENDPOINT_COMPONENTS = {
+    '/chunking': ['trafilatura'],
+    '/extract_terms': ['trafilatura', 'term_extractor'],
+    '/extract_contact_info': ['tika', 'sentence_classifier'],
+    '/extract_questions_answers': ['trafilatura'],
+    '/question_generator': ['question_generator'],
+}
+
+# endpoints served by this replica (see [Service] and [ServiceProfiles] sections of the config file). The
+# SERVICE_PROFILE environment variable overrides the profile of the config file, so replicas can share one config file.
+service_profile = ServiceProfile.from_config(
+    os.environ.get('SERVICE_PROFILE', config.get('Service', 'PROFILE', fallback='full')).strip(),
+    config['ServiceProfiles'] if 'ServiceProfiles' in config else {'full': '*'}, ENDPOINT_COMPONENTS)
+# languages of the term extractor (spacy models loaded), empty means all supported languages
+TERM_LANGUAGES = parse_list(config.get('Service', 'LANGUAGES', fallback='')) or \
+                 ['en', 'de', 'nl', 'fr', 'it', 'nb', 'sl', 'hr']
+
+
+def load_trafilatura():
+    from src.cleaning import cleaning_trafilatura
+    return cleaning_trafilatura
 
-termextractor = TermExtractor(['en', 'de', 'nl', 'fr', 'it', 'nb', 'sl', 'hr'], max_ngram=10, remove_stopwords=True,
-                              use_spellcheck_tool=False)
+
+def load_tika():
+    from src.cleaning import cleaning_tika
+    # starts tika (tika.initVM)
+    cleaning_tika.get_tika_parser()
+    return cleaning_tika
+
+
+def load_sentence_classifier():
+    from src.sentence_classification.dynamic_batching import BatchedSequenceClassifier
+    from src.sentence_classification.trainer_bert_sequence_classifier import TrainerBertSequenceClassifier
+
+    # load the model for sentence classification (now, not lazily on the first predict in the thread of the batcher)
+    trainer_bert_sequence_classifier = \
+        TrainerBertSequenceClassifier( \
+            pretrained_model_name_or_path=PATH_MODEL, model_type='DISTILBERT')
+    trainer_bert_sequence_classifier.load_model()
+
+    # paragraphs of concurrent /extract_contact_info requests are classified together (see [Batching] section of the config file)
+    return BatchedSequenceClassifier(trainer_bert_sequence_classifier,
+                                     max_batch_size=config.getint('Batching', 'MAX_BATCH_SIZE', fallback=32),
+                                     max_latency_ms=config.getfloat('Batching', 'MAX_LATENCY_MS', fallback=5.0))
+
+
+def load_term_extractor():
+    from src.terms.terms import TermExtractor
+
+    # all supported languages: [ 'en', 'de', 'nl', 'fr', 'it', 'nb', 'sl', 'hr']
+    return TermExtractor(TERM_LANGUAGES, max_ngram=10, remove_stopwords=True, use_spellcheck_tool=False)
+
+
+def load_question_generator():
+    from question_generator.scripts import generate_question_from_text
+
+    # settings of the question generator (see [QuestionGeneration] section of the config file). When this replica
+    # extracts English terms, the English spacy model of the TermExtractor is shared with the question generator (named
+    # entities for multiple-choice answers), otherwise the question generator loads its own (small) English model.
+    if 'term_extractor' in service_profile.components and 'en' in TERM_LANGUAGES:
+        spacy_nlp = components.get('term_extractor').get_nlp('en')
+    else:
+        spacy_nlp = None
+    generate_question_from_text.configure_question_generator(
+        spacy_nlp=spacy_nlp,
+        question_cache=question_cache,
+        batch_size=config.getint('QuestionGeneration', 'BATCH_SIZE', fallback=8),
+        max_question_length=get_optional_int('QuestionGeneration', 'MAX_QUESTION_LENGTH'),
+        num_beams=get_optional_int('QuestionGeneration', 'NUM_BEAMS'),
+        max_inputs_per_segment=get_optional_int('QuestionGeneration', 'MAX_INPUTS_PER_SEGMENT'),
+        use_fast_tokenizer=config.getboolean('QuestionGeneration', 'USE_FAST_TOKENIZER', fallback=True))
+    # load the question generator models
+    generate_question_from_text.get_question_generator()
+    return generate_question_from_text
+
+
+components.register('trafilatura', load_trafilatura, imports=['trafilatura'])
+components.register('tika', load_tika, imports=['tika'])
+components.register('term_extractor', load_term_extractor, imports=['spacy'])
+components.register('sentence_classifier', load_sentence_classifier, imports=['torch', 'transformers'])
+components.register('question_generator', load_question_generator, imports=['torch', 'transformers'])
+
+# cache of the generated questions (see [QuestionCache] section of the config file)
+if config.getboolean('QuestionCache', 'ENABLED', fallback=False):
+    question_cache = QuestionCache(config.get('QuestionCache', 'PATH', fallback='/tmp/c4c_question_cache.sqlite'),
+                                   max_entries=config.getint('QuestionCache', 'MAX_ENTRIES', fallback=100000))
+else:
+    question_cache = None
+
+# the document frequency tables used to score the terms are loaded once, on first use per language (see [TermScoring]
+# section of the config file)
+DOCUMENT_FREQUENCY_DIR = config.get('TermScoring', 'DOCUMENT_FREQUENCY_DIR', fallback='media/document_frequency')
+AGGREGATE_LEMMAS = config.getboolean('TermScoring', 'AGGREGATE_LEMMAS', fallback=False)
+# documents longer than MAX_CHUNK_CHARS are processed in chunks by /extract_terms (see [Chunking] section of the config file)
+MAX_CHUNK_CHARS = config.getint('Chunking', 'MAX_CHUNK_CHARS', fallback=0)
+# 'search' (the extracted terms are searched in all sentences) or 'extracted' (terms are annotated at the offsets found
+# by spacy), see TOKEN_OFFSETS in the [Annotation] section of the config file
+TOKEN_OFFSETS = config.get('Annotation', 'TOKEN_OFFSETS', fallback='search')
+if TOKEN_OFFSETS not in ('search', 'extracted'):
+    raise ValueError(f"TOKEN_OFFSETS should be 'search' or 'extracted', but received '{TOKEN_OFFSETS}'.")
+
+
+def get_term_scorer(language: str) -> TermScorer:
+    return TermScorer(load_document_frequency_table(DOCUMENT_FREQUENCY_DIR, language))
+
+
+# background jobs for long-running question generation (see [Jobs] section of the config file)
+if config.get('Jobs', 'STORE', fallback='memory') == 'disk':
+    job_store = DiskJobStore(config.get('Jobs', 'STORE_DIR', fallback='/tmp/c4c_jobs'),
+                             ttl_seconds=config.getfloat('Jobs', 'TTL_SECONDS', fallback=3600))
+else:
+    job_store = InMemoryJobStore(ttl_seconds=config.getfloat('Jobs', 'TTL_SECONDS', fallback=3600))
+
+job_queue = JobQueue(job_store, max_workers=config.getint('Jobs', 'MAX_WORKERS', fallback=1),
+                     max_pending=config.getint('Jobs', 'MAX_PENDING', fallback=100))
 
 
 class Document(BaseModel):
@@ -44,16 +185,92 @@ class Document(BaseModel):
     language: Union[str, type(None)]
 
 
-app = FastAPI()
+class Segments(BaseModel):
+    segments: List[str]
+
 
+app = FastAPI()
 
-def create_output_json(document: Document):
+# components loaded at startup, in this order (see [Startup] section of the config file). Components that are not
+# needed by the endpoints of the service profile are never loaded.
+WARM_UP = parse_list(config.get('Startup', 'WARM_UP', fallback=','.join(components.names)))
+for name in WARM_UP:
+    if name not in components.names:
+        raise ValueError(f"Unknown component '{name}' in WARM_UP, components are {components.names}.")
+WARM_UP = [name for name in WARM_UP if name in service_profile.components]
+startup_report = {'import_seconds': time.perf_counter() - IMPORT_START, **service_profile.report()}
+
+
+def print_startup_report():
+    print(f"Startup report of service profile '{service_profile.name}' "
+          f"(app.py imported in {startup_report['import_seconds']:.2f}s, "
+          f"components loaded {time.perf_counter() - IMPORT_START:.2f}s after the start of the import):\n"
+          f"{components.format_report()}")
+
+
+@app.on_event("startup")
+def warm_up_components():
+    # in the background, the worker starts serving right away; endpoints needing a component that is still loading
+    # wait for it (without blocking the event loop)
+    components.warm_up(WARM_UP, background=config.getboolean('Startup', 'BACKGROUND', fallback=True),
+                       on_done=print_startup_report)
+
+# profiling of single requests (see [Profiling] section of the config file), None when disabled
+request_profiler = RequestProfiler.from_config(config['Profiling']) if 'Profiling' in config else None
+PROFILE_HEADER = config.get('Profiling', 'HEADER', fallback='X-Profile')
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    # requests are profiled only when profiling is enabled and the header carries the configured token
+    if request_profiler is None or request.url.path.startswith('/profiles'):
+        return await call_next(request)
+    if PROFILE_HEADER not in request.headers:
+        # cProfile captures the whole event loop: the other requests wait while a request is profiled (EXCLUSIVE)
+        async with request_profiler.track_request():
+            return await call_next(request)
+    if not request_profiler.is_authorized(request.headers[PROFILE_HEADER]):
+        return JSONResponse(status_code=403, content={'detail': "Invalid profiling token."})
+    if not request_profiler.acquire():
+        return JSONResponse(status_code=429, content={'detail': "Another request is being profiled, try again later."})
+
+    try:
+        concurrent_requests = await request_profiler.start_exclusive()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profile.disable()
+        profile_id = request_profiler.save(profile, f"{request.method} {request.url.path}", time.perf_counter() - start,
+                                           concurrent_requests=concurrent_requests)
+    finally:
+        request_profiler.end_exclusive()
+        request_profiler.release()
+
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def check_profiling_access(request: Request):
+    if request_profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (see [Profiling] section of the config file).")
+    if not request_profiler.is_authorized(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid profiling token.")
+
+
+async def create_output_json(document: Document):
     output_json = {}
 
     # Extract text from html (i.e. without boilerplate sections such as headers...) using trafilatura library.
     # When document.language!=None, then document.html in other language than document.language will be ignored.
     # setting target_language==None for trafilatura, because we want to extract all text.
-    json_trafilatura = get_json_trafilatura(document.html, target_language=None)
+    instrumentation.count('documents_total')
+    instrumentation.count('bytes_in_total', len(document.html.encode('utf-8')))
+    with instrumentation.stage('trafilatura'):
+        json_trafilatura = (await components.get_async('trafilatura')).get_json_trafilatura(document.html,
+                                                                                            target_language=None)
     # json_trafilatura=get_json_trafilatura( document.html, target_language=document.language )
     if 'title' in json_trafilatura:  # i.e. title tag from html, extracted via BeautifulSoup
         output_json['title'] = json_trafilatura['title']
@@ -88,19 +305,27 @@ def create_output_json(document: Document):
     return output_json
 
 
+def encode_cas(cas) -> str:
+    with instrumentation.stage('to_xmi'):
+        encoded_cas = base64.b64encode(bytes(cas.to_xmi(), 'utf-8')).decode()
+    instrumentation.count('bytes_out_total', len(encoded_cas))
+    return encoded_cas
+
+
 @app.get("/")
 async def home():
     return {'msg': "Term extraction API."}
 
 
 @app.post("/chunking")
+@instrumentation.instrumented("/chunking")
 async def chunk(document: Document):
-    output_json = create_output_json(document)
+    output_json = await create_output_json(document)
 
     # now add sentence annotations:
     annotation_adder.create_cas_from_text(output_json['text'])
     annotation_adder.add_sentence_annotation()
-    encoded_cas = base64.b64encode(bytes(annotation_adder.cas.to_xmi(), 'utf-8')).decode()
+    encoded_cas = encode_cas(annotation_adder.cas)
 
     output_json['cas_content'] = encoded_cas
 
@@ -108,38 +333,76 @@ async def chunk(document: Document):
 
 
 @app.post("/extract_terms")
+@instrumentation.instrumented("/extract_terms")
 async def term_extraction(document: Document):
     if not document.language:
         raise ValueError("Language should be specified when doing term extraction and named entity recognition.")
 
-    output_json = create_output_json(document)
+    output_json = await create_output_json(document)
+    termextractor = await components.get_async('term_extractor')
 
     # now add sentence annotations:
     annotation_adder.create_cas_from_text(output_json['text'])
     annotation_adder.add_sentence_annotation()
-    sentences = [sentence.get_covered_text() for \
-                 sentence in annotation_adder.cas.get_view(config['Annotation']['SOFA_ID']).select(
-            config['Annotation']['SENTENCE_TYPE'])]
-    terms_lemmas, ner_list = termextractor.get_terms_ner(sentences, language=document.language)
-    annotation_adder.add_token_annotation(terms_lemmas)
+    sentence_annotations = annotation_adder.cas.get_view(config['Annotation']['SOFA_ID']).select(
+        config['Annotation']['SENTENCE_TYPE'])
+    chunked = MAX_CHUNK_CHARS and len(output_json['text']) > MAX_CHUNK_CHARS
+    if chunked:
+        # long documents are processed in chunks, only the extracted terms and named entities are kept in memory
+        chunk_kwargs = dict(sentence_segmentation=annotation_adder.sentence_segmentation,
+                            max_chunk_chars=MAX_CHUNK_CHARS, n_jobs=get_spacy_n_process(), language=document.language)
+    else:
+        sentences = [sentence.get_covered_text() for sentence in sentence_annotations]
+    if TOKEN_OFFSETS == 'extracted':
+        # annotate the terms at the offsets found by spacy
+        if chunked:
+            term_occurrences, ner_list = termextractor.get_term_occurrences_ner_chunked(output_json['text'],
+                                                                                        **chunk_kwargs)
+        else:
+            term_occurrences, ner_list = termextractor.get_term_occurrences_ner(sentences, n_jobs=get_spacy_n_process(),
+                                                                                language=document.language)
+        annotation_adder.add_token_annotation_occurrences(term_occurrences,
+                                                          term_scorer=get_term_scorer(document.language),
+                                                          aggregate_lemmas=AGGREGATE_LEMMAS)
+    else:
+        if chunked:
+            terms_lemmas, ner_list = termextractor.get_terms_ner_chunked(output_json['text'], **chunk_kwargs)
+        else:
+            terms_lemmas, ner_list = termextractor.get_terms_ner(sentences, n_jobs=get_spacy_n_process(),
+                                                                  language=document.language)
+        annotation_adder.add_token_annotation(terms_lemmas, term_scorer=get_term_scorer(document.language),
+                                              aggregate_lemmas=AGGREGATE_LEMMAS)
     assert len(ner_list) == len(
-        sentences), "For every sentence (annotated via SENTENCE_TYPE) there should be exactly one list of detected named entities provided ( List[Named_entity])"
+        sentence_annotations), "For every sentence (annotated via SENTENCE_TYPE) there should be exactly one list of detected named entities provided ( List[Named_entity])"
+    instrumentation.count('terms_total', len(annotation_adder.term_records))
+    instrumentation.count('sentences_total', len(ner_list))
+    instrumentation.count('named_entities_total', sum(len(named_entities) for named_entities in ner_list))
     annotation_adder.add_named_entity_annotation(ner_list)
-    encoded_cas = base64.b64encode(bytes(annotation_adder.cas.to_xmi(), 'utf-8')).decode()
+    encoded_cas = encode_cas(annotation_adder.cas)
 
     output_json['cas_content'] = encoded_cas
+    if AGGREGATE_LEMMAS:
+        # one record (lemma, variants, count, score) per lemma
+        output_json['terms'] = annotation_adder.term_records
 
     return output_json
 
 
 @app.post("/extract_contact_info")
+@instrumentation.instrumented("/extract_contact_info")
 async def contact_info_extraction(document: Document):
     output_json = {}
 
     # parse html input with tika:
-    text = get_text_tika(document.html)
+    instrumentation.count('documents_total')
+    instrumentation.count('bytes_in_total', len(document.html.encode('utf-8')))
+    with instrumentation.stage('tika'):
+        text = (await components.get_async('tika')).get_text_tika(document.html)
     output_json['text'] = text
 
+    # this endpoint awaits the batched classifier, so other requests can run in the meantime.
+    # Use an AnnotationAdder per request, so the cas is not overwritten by a concurrent request.
+    annotation_adder = AnnotationAdder(TYPESYSTEM, config)
     annotation_adder.create_cas_from_text(output_json['text'])
     # add paragraphs to be send to sentence classifier for contact info classification ( DISTILBERT sequence classifier )
     # also specify parsing method used to extract text, because paragraphs should be detected differently if 'tika' or 'trafilatura' is used.
@@ -158,7 +421,11 @@ async def contact_info_extraction(document: Document):
     # sanity check
     assert len(paragraphs) == len(paragraphs_text)
 
-    pred_labels, _ = trainer_bert_sequence_classifier.predict(paragraphs_text)
+    instrumentation.count('paragraphs_total', len(paragraphs_text))
+    # includes the time waiting for the batch (see [Batching] section of the config file)
+    with instrumentation.stage('sequence_classification'):
+        batched_sequence_classifier = await components.get_async('sentence_classifier')
+        pred_labels, _ = await batched_sequence_classifier.predict_async(paragraphs_text)
 
     # sanity check
     assert len(pred_labels) == len(paragraphs_text)
@@ -176,7 +443,7 @@ async def contact_info_extraction(document: Document):
     annotation_adder.add_context(root_type='CONTACT_PARAGRAPH_TYPE', type_to_add='SENTENCE_TYPE', append=True,
                                  prepend=True)
 
-    encoded_cas = base64.b64encode(bytes(annotation_adder.cas.to_xmi(), 'utf-8')).decode()
+    encoded_cas = encode_cas(annotation_adder.cas)
     output_json['cas_content'] = encoded_cas
     output_json['language'] = document.language
 
@@ -184,10 +451,11 @@ async def contact_info_extraction(document: Document):
 
 
 @app.post("/extract_questions_answers")
+@instrumentation.instrumented("/extract_questions_answers")
 async def question_answer_extraction(document: Document):
     output_json = {}
 
-    output_json = create_output_json(document)
+    output_json = await create_output_json(document)
 
     annotation_adder.create_cas_from_text(output_json['text'])
 
@@ -208,13 +476,14 @@ async def question_answer_extraction(document: Document):
     annotation_adder.add_context(root_type='QUESTION_PARAGRAPH_TYPE', type_to_add='PARAGRAPH_TYPE', append=True,
                                  prepend=False)
 
-    encoded_cas = base64.b64encode(bytes(annotation_adder.cas.to_xmi(), 'utf-8')).decode()
+    encoded_cas = encode_cas(annotation_adder.cas)
     output_json['cas_content'] = encoded_cas
 
     return output_json
 
 
 @app.post("/question_generator/generate")
+@instrumentation.instrumented("/question_generator/generate")
 async def question_answer_extraction(segment: str) -> List[Dict[str, str]]:
     """
     Generates questions based on a text segment.
@@ -223,4 +492,122 @@ async def question_answer_extraction(segment: str) -> List[Dict[str, str]]:
     :return:
     """
 
-    return generate_question_from_text.main(segment)
+    instrumentation.count('bytes_in_total', len(segment.encode('utf-8')))
+    generate_question_from_text = await components.get_async('question_generator')
+    # in a thread of the default executor: the question generator is used by one thread at a time (see
+    # QuestionGenerator.generate), a running job should not block the event loop
+    with instrumentation.stage('question_generation'):
+        return await asyncio.get_event_loop().run_in_executor(None, generate_question_from_text.main, segment)
+
+
+def generate_questions_for_segments(segments: List[str]) -> List[List[Dict[str, str]]]:
+    # runs in a job thread, so the question generator can be loaded (or waited for) here
+    generate_question_from_text = components.get('question_generator')
+    return [generate_question_from_text.main(segment) for segment in segments]
+
+
+@app.post("/question_generator/jobs")
+async def submit_question_generation_job(segments: Segments):
+    """
+    Submits a question generation job for a list of text segments. The job runs in the background, its status and
+    results can be polled via GET /question_generator/jobs/{job_id}.
+
+    :param segments: Text segments to generate questions from.
+    :return: The id of the job.
+    """
+
+    try:
+        job_id = job_queue.submit(generate_questions_for_segments, segments.segments)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {'job_id': job_id, 'status': 'pending'}
+
+
+@app.get("/question_generator/jobs/{job_id}")
+async def get_question_generation_job(job_id: str):
+    """
+    Returns the status ('pending', 'running', 'done' or 'failed') of a question generation job. When the job is done,
+    the 'result' field contains the generated questions for every segment (in the order of the submitted segments).
+
+    :param job_id: Id returned when submitting the job.
+    :return: The job record.
+    """
+
+    record = job_queue.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job id '{job_id}'.")
+
+    return record
+
+
+@app.get("/question_generator/cache")
+async def get_question_cache_stats():
+    """
+    Returns the hit statistics (of this worker process) and the size of the question cache.
+    """
+
+    if question_cache is None:
+        return {'enabled': False}
+
+    return {'enabled': True, **question_cache.stats()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Returns the request and stage duration histograms and the counters (documents, sentences, terms, bytes in/out) of
+    this worker process, in the Prometheus text format. Only available when instrumentation is enabled.
+    """
+
+    if not instrumentation.is_enabled():
+        raise HTTPException(status_code=404, detail="Instrumentation is disabled (see [Instrumentation] section of the config file).")
+
+    return PlainTextResponse(instrumentation.render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    """
+    Lists the stored profiles (most recent first). Requires the profiling header with the configured token.
+
+    cProfile profiles the thread of the event loop: work done in executor threads (run_in_executor, the batched
+    sentence classifier...) is not captured and shows up as waiting time. With EXCLUSIVE (see [Profiling] section of
+    the config file), the other requests wait while a request is profiled, so they do not pollute its profile; the
+    summary reports the requests that were still in flight after DRAIN_TIMEOUT seconds.
+    """
+
+    check_profiling_access(request)
+    return request_profiler.list_profiles()
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, format: str = 'txt'):
+    """
+    Returns a stored profile: the text summary (format=txt) or the pstats dump (format=prof, e.g. for snakeviz).
+    Requires the profiling header with the configured token.
+    """
+
+    check_profiling_access(request)
+    path = request_profiler.get_path(profile_id, extension=f'.{format}')
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}' or format '{format}'.")
+
+    if format == 'txt':
+        with open(path, encoding='utf-8') as f:
+            return PlainTextResponse(f.read())
+    return FileResponse(path, media_type='application/octet-stream', filename=f"{profile_id}.prof")
+
+
+@app.get("/startup")
+async def get_startup_report():
+    """
+    Returns the service profile (served endpoints and the components they need), the import time of app.py, and the
+    status, import time and load time of every component (of this worker process).
+    """
+
+    return {**startup_report, 'components': components.report()}
+
+
+# only the routes of the endpoints of the service profile are served, the other endpoints return 404
+app.router.routes[:] = service_profile.filter_routes(app.router.routes)
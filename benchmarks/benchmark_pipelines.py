@@ -0,0 +1,378 @@
+'''
+End-to-end benchmark of the pipelines of app.py: /chunking, /extract_terms (per language), /extract_contact_info, /extract_questions_answers and /question_generator/generate. The endpoints are called in-process (without HTTP), on a fixed corpus: the HTML files in user_scripts and tests/test_files, optionally scaled up by concatenating the documents (--scales).
+
+For every pipeline the latency percentiles, the throughput and the peak RSS are reported, and the latency percentiles of its stages (trafilatura/tika parsing, spacy, annotation, classification, question generation...), measured by wrapping the functions of the stages. The results are written to a JSON file, which can be compared with the results of another commit (--compare).
+
+Usage (from the root of the repository, with the models of app.py available):
+
+python -m benchmarks.benchmark_pipelines --output benchmark.json
+python -m benchmarks.benchmark_pipelines --pipelines extract_terms --languages en nl --scales 1 8 --output benchmark.json --compare benchmark_main.json
+'''
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import numpy as np
+
+PIPELINES=[ 'chunking', 'extract_terms', 'extract_contact_info', 'extract_questions_answers', 'question_generation' ]
+
+DEFAULT_INPUT=[ os.path.join( 'user_scripts', '*.html' ), os.path.join( 'tests', 'test_files', '*.html' ) ]
+
+PERCENTILES=[ 50, 90, 99 ]
+
+
+class StageTimer():
+
+    '''
+    Measures the duration of the stages of the pipelines, by replacing functions (module attributes or methods) with timed wrappers. self.restore puts the original functions back.
+
+    A call nested in a call of the same stage (e.g. get_terms_ner, called for every chunk by get_terms_ner_chunked) is not timed again, so the time of a stage is only counted once.
+    '''
+
+    def __init__( self ):
+
+        self.durations=defaultdict( list )
+        self._patched=[]
+        #stages of the timed calls in progress (per thread and asyncio task)
+        self._active_stages=contextvars.ContextVar( 'active_stages', default=frozenset() )
+
+    def wrap( self, owner, name:str, stage:str ):
+
+        '''
+        :param owner: module, class or object with the attribute name.
+        :param name: str. Name of the function.
+        :param stage: str. Name of the stage.
+        '''
+
+        function=getattr( owner, name )
+        durations=self.durations[ stage ]
+        active_stages=self._active_stages
+
+        if asyncio.iscoroutinefunction( function ):
+            @functools.wraps( function )
+            async def timed( *args, **kwargs ):
+                if stage in active_stages.get():
+                    return await function( *args, **kwargs )
+                token=active_stages.set( active_stages.get() | { stage } )
+                start=time.perf_counter()
+                try:
+                    return await function( *args, **kwargs )
+                finally:
+                    durations.append( time.perf_counter()-start )
+                    active_stages.reset( token )
+        else:
+            @functools.wraps( function )
+            def timed( *args, **kwargs ):
+                if stage in active_stages.get():
+                    return function( *args, **kwargs )
+                token=active_stages.set( active_stages.get() | { stage } )
+                start=time.perf_counter()
+                try:
+                    return function( *args, **kwargs )
+                finally:
+                    durations.append( time.perf_counter()-start )
+                    active_stages.reset( token )
+
+        #instance attributes are removed again, class and module attributes are set back
+        self._patched.append( ( owner, name, owner.__dict__.get( name ) if hasattr( owner, '__dict__' ) else function ) )
+        setattr( owner, name, timed )
+
+    def reset( self ):
+
+        for durations in self.durations.values():
+            durations.clear()
+
+    def summary( self )->Dict[ str, Dict[ str, float ] ]:
+
+        return { stage: summarize( durations ) for stage, durations in self.durations.items() if durations }
+
+    def restore( self ):
+
+        for owner, name, original in reversed( self._patched ):
+            if original is None:
+                delattr( owner, name )
+            else:
+                setattr( owner, name, original )
+        self._patched=[]
+
+
+def wrap_stages( app_module, timer:StageTimer ):
+
+    '''
+    Wraps the functions of the stages of the pipelines of app.py.
+    '''
+
+    from cassis.cas import Cas
+    from question_generator.questiongenerator import QuestionGenerator
+    from src.annotations.annotations import AnnotationAdder
+
+    #the components of app.py are loaded lazily, they are loaded here so their loading time is not measured
+    timer.wrap( app_module.components.get( 'trafilatura' ), 'get_json_trafilatura', 'trafilatura' )
+    timer.wrap( app_module.components.get( 'tika' ), 'get_text_tika', 'tika' )
+    #the chunked methods call get_terms_ner (get_term_occurrences_ner) for every chunk, the nested calls are not counted again
+    for name in [ 'get_terms_ner', 'get_terms_ner_chunked', 'get_term_occurrences_ner', 'get_term_occurrences_ner_chunked' ]:
+        timer.wrap( app_module.components.get( 'term_extractor' ), name, 'spacy_terms_ner' )
+    #/extract_contact_info creates an AnnotationAdder per request, so the methods are wrapped on the class
+    for name, stage in [ ( 'create_cas_from_text', 'create_cas' ), ( 'add_sentence_annotation', 'sentence_annotation' ), ( 'add_paragraph_annotation', 'paragraph_annotation' ),
+                         ( 'add_token_annotation', 'token_annotation' ), ( 'add_token_annotation_occurrences', 'token_annotation' ),
+                         ( 'add_named_entity_annotation', 'named_entity_annotation' ), ( 'merge_annotation', 'merge_annotation' ), ( 'add_context', 'add_context' ) ]:
+        timer.wrap( AnnotationAdder, name, stage )
+    timer.wrap( Cas, 'to_xmi', 'to_xmi' )
+    timer.wrap( app_module.components.get( 'sentence_classifier' ), 'predict_async', 'sequence_classification' )
+    app_module.components.get( 'question_generator' )
+    for name, stage in [ ( 'generate_qg_inputs', 'qg_inputs' ), ( '_encode_qg_inputs', 'qg_encode' ), ( '_generate_questions_cached', 'qg_generate' ), ( '_get_qa_scores', 'qa_evaluate' ) ]:
+        timer.wrap( QuestionGenerator, name, stage )
+
+
+def summarize( durations:List[ float ] )->Dict[ str, float ]:
+
+    '''
+    :param durations: List of float. Durations in seconds.
+    :return: Dict. Number of calls, mean, max and percentiles of the durations in milliseconds.
+    '''
+
+    milliseconds=np.asarray( durations )*1000
+    summary={ 'n': len( durations ), 'mean_ms': float( milliseconds.mean() ), 'max_ms': float( milliseconds.max() ) }
+    for percentile in PERCENTILES:
+        summary[ f'p{percentile}_ms' ]=float( np.percentile( milliseconds, percentile ) )
+    return summary
+
+
+def reset_peak_rss():
+
+    '''
+    Resets the peak resident set size of the process (Linux only, see "clear_refs" in man proc). Without reset, the peak of the pipeline includes the peak of the previous pipelines.
+    '''
+
+    try:
+        with open( '/proc/self/clear_refs', 'w' ) as f:
+            f.write( '5' )
+    except OSError:
+        pass
+
+
+def get_peak_rss_mb()->float:
+
+    try:
+        with open( '/proc/self/status' ) as f:
+            for line in f:
+                if line.startswith( 'VmHWM:' ):
+                    return int( line.split()[ 1 ] )/1024
+    except OSError:
+        pass
+
+    import resource
+    maxrss=resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    #kilobytes on Linux, bytes on macOS
+    return maxrss/1024/1024 if sys.platform == 'darwin' else maxrss/1024
+
+
+def read_corpus( patterns:List[ str ] )->List[ Dict[ str, str ] ]:
+
+    '''
+    :param patterns: List of str. Glob patterns of the HTML files.
+    :return: List of Dict. 'name' and 'html' of every document.
+    '''
+
+    corpus=[]
+    for pattern in patterns:
+        for path in sorted( glob.glob( pattern ) ):
+            with open( path, encoding='utf-8' ) as f:
+                corpus.append( { 'name': os.path.basename( path ), 'html': f.read() } )
+    if not corpus:
+        raise ValueError( f"No HTML files found for {patterns}." )
+    return corpus
+
+
+def scale_up( corpus:List[ Dict[ str, str ] ], scale:int )->List[ Dict[ str, str ] ]:
+
+    '''
+    Synthetic scale-up: every document is made scale times longer by repeating its body.
+    '''
+
+    if scale == 1:
+        return corpus
+
+    scaled=[]
+    for document in corpus:
+        html=document[ 'html' ]
+        begin=html.lower().find( '<body' )
+        end=html.lower().rfind( '</body>' )
+        if begin == -1 or end == -1:
+            html="\n".join( [ html ]*scale )
+        else:
+            begin=html.find( '>', begin )+1
+            html=html[ :begin ]+"\n".join( [ html[ begin:end ] ]*scale )+html[ end: ]
+        scaled.append( { 'name': f"{document[ 'name' ]} x{scale}", 'html': html } )
+    return scaled
+
+
+def get_endpoint( app_module, path:str )->Callable:
+
+    #several endpoints of app.py share a function name, so the endpoints are looked up by path
+    for route in app_module.app.routes:
+        if getattr( route, 'path', None ) == path:
+            return route.endpoint
+    raise KeyError( f"app.py has no endpoint {path}." )
+
+
+def get_requests( app_module, pipeline:str, corpus:List[ Dict[ str, str ] ], languages:List[ str ], qg_max_chars:int ):
+
+    '''
+    :return: List of ( name of the pipeline, coroutine function without arguments, number of characters of the input ) Tuples.
+    '''
+
+    requests=[]
+    if pipeline == 'question_generation':
+        endpoint=get_endpoint( app_module, '/question_generator/generate' )
+        for document in corpus:
+            segment=app_module.components.get( 'trafilatura' ).get_json_trafilatura( document[ 'html' ], target_language=None ).get( 'text', '' )[ :qg_max_chars ]
+            if segment.strip():
+                requests.append( ( pipeline, functools.partial( endpoint, segment ), len( segment ) ) )
+        return requests
+
+    path={ 'chunking': '/chunking', 'extract_terms': '/extract_terms', 'extract_contact_info': '/extract_contact_info', 'extract_questions_answers': '/extract_questions_answers' }[ pipeline ]
+    endpoint=get_endpoint( app_module, path )
+    for language in ( languages if pipeline == 'extract_terms' else [ languages[ 0 ] ] ):
+        name=f"{pipeline}[{language}]" if pipeline == 'extract_terms' else pipeline
+        for document in corpus:
+            requests.append( ( name, functools.partial( endpoint, app_module.Document( html=document[ 'html' ], language=language ) ), len( document[ 'html' ] ) ) )
+    return requests
+
+
+def run_pipeline( requests, timer:StageTimer, n_warmup:int, n_runs:int )->Dict:
+
+    '''
+    Runs the requests of one pipeline sequentially, n_runs times (after n_warmup runs that are not measured).
+
+    :return: Dict. Latency summary, throughput, peak RSS and stage summaries of the pipeline.
+    '''
+
+    #one event loop for all requests, as in the server
+    loop=asyncio.new_event_loop()
+
+    for _ in range( n_warmup ):
+        for _, request, _ in requests:
+            loop.run_until_complete( request() )
+
+    timer.reset()
+    reset_peak_rss()
+    latencies=[]
+    n_chars=0
+    start=time.perf_counter()
+    for _ in range( n_runs ):
+        for _, request, request_chars in requests:
+            request_start=time.perf_counter()
+            loop.run_until_complete( request() )
+            latencies.append( time.perf_counter()-request_start )
+            n_chars+=request_chars
+    seconds=time.perf_counter()-start
+    loop.close()
+
+    return { 'latency': summarize( latencies ),
+             'throughput_rps': len( latencies )/seconds,
+             'throughput_chars_per_second': n_chars/seconds,
+             'peak_rss_mb': get_peak_rss_mb(),
+             'stages': timer.summary() }
+
+
+def get_commit()->str:
+
+    try:
+        return subprocess.run( [ 'git', 'rev-parse', 'HEAD' ], capture_output=True, text=True, check=True ).stdout.strip()
+    except ( OSError, subprocess.CalledProcessError ):
+        return ''
+
+
+def compare( results:Dict, baseline:Dict ):
+
+    '''
+    Prints the p50 and p90 latency and the throughput relative to a baseline (results of another commit).
+    '''
+
+    print( f"\nCompared with {baseline.get( 'commit', '' )[ :10 ]} (ratio current/baseline, <1 is faster for latency):" )
+    print( f"{'pipeline':<44}{'p50':>8}{'p90':>8}{'rps':>8}" )
+    for name, result in results[ 'pipelines' ].items():
+        base=baseline.get( 'pipelines', {} ).get( name )
+        if base is None:
+            continue
+        ratios=[ result[ 'latency' ][ 'p50_ms' ]/base[ 'latency' ][ 'p50_ms' ],
+                 result[ 'latency' ][ 'p90_ms' ]/base[ 'latency' ][ 'p90_ms' ],
+                 result[ 'throughput_rps' ]/base[ 'throughput_rps' ] ]
+        print( f"{name:<44}" + "".join( f"{ratio:>8.2f}" for ratio in ratios ) )
+
+
+if __name__ == '__main__':
+
+    parser=argparse.ArgumentParser( description="End-to-end benchmark of the pipelines of app.py." )
+    parser.add_argument( '--pipelines', nargs='+', default=PIPELINES, choices=PIPELINES, help="Pipelines to benchmark." )
+    parser.add_argument( '--input', nargs='+', default=DEFAULT_INPUT, help="Glob patterns of the HTML files of the corpus." )
+    parser.add_argument( '--languages', nargs='+', default=[ 'en', 'nl' ], help="Languages of the documents. /extract_terms is benchmarked for every language, the other pipelines use the first one." )
+    parser.add_argument( '--scales', nargs='+', type=int, default=[ 1 ], help="Synthetic scale-ups: every document is also benchmarked repeated scale times." )
+    parser.add_argument( '--n_runs', type=int, default=3, help="Number of measured runs over the corpus." )
+    parser.add_argument( '--n_warmup', type=int, default=1, help="Number of runs over the corpus before measuring." )
+    parser.add_argument( '--qg_max_chars', type=int, default=2000, help="Maximum length of the text segments sent to the question generator." )
+    parser.add_argument( '--output', default='benchmark_pipelines.json', help="Path of the JSON file with the results." )
+    parser.add_argument( '--compare', default=None, help="JSON file with the results of another commit." )
+    args=parser.parse_args()
+
+    start=time.perf_counter()
+    import app as app_module
+    startup_seconds=time.perf_counter()-start
+    rss_after_startup=get_peak_rss_mb()
+    print( f"Loaded app.py in {startup_seconds:.1f}s (peak RSS {rss_after_startup:.0f} MB)." )
+
+    corpus=read_corpus( args.input )
+    timer=StageTimer()
+    wrap_stages( app_module, timer )
+
+    results={ 'commit': get_commit(),
+              'timestamp': time.strftime( '%Y-%m-%dT%H:%M:%S%z' ),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpu_count': os.cpu_count(),
+              'arguments': vars( args ),
+              'corpus': [ document[ 'name' ] for document in corpus ],
+              'startup_seconds': startup_seconds,
+              'startup_peak_rss_mb': rss_after_startup,
+              'components': app_module.components.report(),
+              'pipelines': {} }
+
+    try:
+        for scale in args.scales:
+            scaled_corpus=scale_up( corpus, scale )
+            for pipeline in args.pipelines:
+                requests=get_requests( app_module, pipeline, scaled_corpus, args.languages, args.qg_max_chars )
+                #one result per pipeline name (extract_terms has one per language)
+                by_name=defaultdict( list )
+                for request in requests:
+                    by_name[ request[ 0 ] ].append( request )
+                for name, name_requests in by_name.items():
+                    key=f"{name} x{scale}"
+                    result=run_pipeline( name_requests, timer, args.n_warmup, args.n_runs )
+                    results[ 'pipelines' ][ key ]=result
+                    latency=result[ 'latency' ]
+                    print( f"{key:<44} p50 {latency[ 'p50_ms' ]:>9.1f}ms  p90 {latency[ 'p90_ms' ]:>9.1f}ms  p99 {latency[ 'p99_ms' ]:>9.1f}ms  {result[ 'throughput_rps' ]:>7.2f} req/s  peak RSS {result[ 'peak_rss_mb' ]:>7.0f} MB" )
+                    for stage, summary in sorted( result[ 'stages' ].items(), key=lambda item: -item[ 1 ][ 'mean_ms' ]*item[ 1 ][ 'n' ] ):
+                        print( f"    {stage:<40} p50 {summary[ 'p50_ms' ]:>9.1f}ms  p90 {summary[ 'p90_ms' ]:>9.1f}ms  ({summary[ 'n' ]} calls)" )
+    finally:
+        timer.restore()
+
+    with open( args.output, 'w', encoding='utf-8' ) as f:
+        json.dump( results, f, indent=2 )
+    print( f"\nResults written to {args.output}." )
+
+    if args.compare:
+        with open( args.compare, encoding='utf-8' ) as f:
+            compare( results, json.load( f ) )
@@ -0,0 +1,82 @@
+'''
+Benchmark of the split based (annotations.py) and regex based (segmentation.py) sentence and paragraph offset helpers on multi-megabyte texts.
+
+Usage (from the root of the repository):
+
+python -m benchmarks.benchmark_segmentation --input tika_output.txt --size_mb 5
+
+Without --input, the text is built by repeating the test files in tests/test_files. Tika outputs can be obtained with src.cleaning.cleaning_tika.get_text_tika.
+'''
+
+import argparse
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+from src.annotations.annotations import get_sentences_index, get_paragraphs_index, get_paragraphs_index_trafilatura
+from src.annotations.segmentation import iter_sentence_offsets, iter_paragraph_offsets, iter_paragraph_offsets_trafilatura
+
+HELPERS=[ ( 'sentences', get_sentences_index, iter_sentence_offsets ),
+          ( 'paragraphs (tika)', get_paragraphs_index, iter_paragraph_offsets ),
+          ( 'paragraphs (trafilatura)', get_paragraphs_index_trafilatura, iter_paragraph_offsets_trafilatura ) ]
+
+
+def read_texts( paths ):
+
+    texts=[]
+    for path in paths:
+        with open( path, encoding='utf-8' ) as f:
+            text=f.read()
+        if path.endswith( '.json' ):
+            text=json.loads( text ).get( 'text', text )
+        texts.append( text )
+    return texts
+
+
+def build_text( texts, size_mb ):
+
+    text="\n\n".join( texts )
+    n_repeats=max( 1, int( size_mb*1024*1024/max( len( text ), 1 ) ) )
+    return "\n\n".join( [ text ]*n_repeats )
+
+
+def measure( function, text, n_runs ):
+
+    '''
+    :return: Tuple. Best time of n_runs (seconds), peak memory allocated during one run (bytes) and number of segments.
+    '''
+
+    times=[]
+    for _ in range( n_runs ):
+        start=time.perf_counter()
+        n_segments=sum( 1 for _ in function( text ) )
+        times.append( time.perf_counter()-start )
+
+    tracemalloc.start()
+    for _ in function( text ):
+        pass
+    _, peak=tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min( times ), peak, n_segments
+
+
+if __name__ == '__main__':
+
+    parser=argparse.ArgumentParser( description="Benchmark of the sentence and paragraph offset helpers." )
+    parser.add_argument( '--input', nargs='*', default=None, help="Text (or trafilatura JSON) files. Default: the files in tests/test_files." )
+    parser.add_argument( '--size_mb', type=float, default=5, help="Size of the benchmark text, the input texts are repeated to reach it." )
+    parser.add_argument( '--n_runs', type=int, default=5, help="Number of runs, the best time is reported." )
+    args=parser.parse_args()
+
+    paths=args.input if args.input else sorted( glob.glob( os.path.join( 'tests', 'test_files', '*' ) ) )
+    text=build_text( read_texts( paths ), args.size_mb )
+    print( f"Text of {len( text )/1024/1024:.1f} MB, {text.count( chr( 10 ) )} lines.\n" )
+
+    print( f"{'helper':<26}{'implementation':<16}{'seconds':>10}{'peak MB':>10}{'segments':>10}" )
+    for name, split_helper, regex_helper in HELPERS:
+        for implementation, function in [ ( 'split', split_helper ), ( 'regex', regex_helper ) ]:
+            seconds, peak, n_segments=measure( function, text, args.n_runs )
+            print( f"{name:<26}{implementation:<16}{seconds:>10.3f}{peak/1024/1024:>10.1f}{n_segments:>10}" )
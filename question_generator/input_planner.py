@@ -0,0 +1,62 @@
+"""
+Planning of the question generation inputs: canonicalisation of the answers, a cheap salience score to cap the number
+of inputs per segment, and deduplication of identical inputs (so each unique input is fed to the model once and the
+generated question is fanned back out to all its occurrences).
+"""
+import re
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def canonicalize_answer(answer):
+    """
+    Collapses all whitespace in the answer to single spaces and strips it, so answers that only differ in whitespace
+    map to the same qg input.
+    """
+    return " ".join(answer.split())
+
+
+def salience_score(answer):
+    """
+    Cheap salience score of an answer: the number of distinct words of at least 4 characters, plus the number of
+    distinct words containing a digit or starting with an uppercase letter (names, dates, amounts,...).
+    """
+    words = set(WORD_PATTERN.findall(answer))
+    content_words = {word.lower() for word in words if len(word) >= 4}
+    specific_words = {
+        word for word in words if word[0].isupper() or any(c.isdigit() for c in word)
+    }
+    return len(content_words) + len(specific_words)
+
+
+def select_salient(answers, max_inputs=None):
+    """
+    Returns the indices of the (at most) max_inputs answers with the highest salience score, in their original order.
+    Answers with equal scores are selected in their original order.
+
+    :param answers: List of answers (strings).
+    :param max_inputs: Maximum number of answers to keep. None keeps all answers.
+    """
+    if max_inputs is None or len(answers) <= max_inputs:
+        return list(range(len(answers)))
+    ranked = sorted(range(len(answers)), key=lambda i: -salience_score(answers[i]))
+    return sorted(ranked[:max_inputs])
+
+
+def deduplicate(keys):
+    """
+    Deduplicates a list of hashable keys.
+
+    :param keys: List of hashable keys, e.g. tuples of token ids of the qg inputs.
+    :return: Tuple (unique_indices, fan_out). unique_indices are the indices of the first occurrence of every unique
+        key, fan_out maps every key to the position of its unique key in unique_indices.
+    """
+    positions = {}
+    unique_indices = []
+    fan_out = []
+    for i, key in enumerate(keys):
+        if key not in positions:
+            positions[key] = len(unique_indices)
+            unique_indices.append(i)
+        fan_out.append(positions[key])
+    return unique_indices, fan_out
@@ -0,0 +1,194 @@
+"""
+Persistent cache of generated questions and their QA evaluator scores, so paragraphs that are submitted again (e.g. of
+re-crawled FAQ pages) are not passed to the models again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SQLITE_MAX_VARIABLES = 900
+
+# the entries are counted exactly (a scan of the table) at most every COUNT_INTERVAL puts, in between the number of
+# entries is estimated from the inserts of this process
+COUNT_INTERVAL = 100
+
+
+class QuestionCache:
+    """
+    SQLite backed cache of (question, score) per qg input. The key of an input is a hash of the model ids, the
+    generation parameters and the token ids of the input (which contain both the answer and the context). The least
+    recently used entries are removed when the cache holds more than max_entries entries.
+
+    The database can be shared by several worker processes. The number of entries is estimated from the inserts of
+    every process and only counted exactly every COUNT_INTERVAL puts (or when the estimate exceeds max_entries), so the
+    cache can briefly hold more than max_entries entries when several processes insert.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        """
+        :param path: Path of the SQLite database. Will be created if it does not exist.
+        :param max_entries: Maximum number of cached inputs.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries should be >= 1, but received {}".format(max_entries))
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._hits = 0
+        self._misses = 0
+        self._entries = 0
+        self._puts_since_count = 0
+
+        with self._lock:
+            self._get_connection()
+
+    @staticmethod
+    def make_key(model_ids, generation_params, input_ids):
+        """
+        :param model_ids: Ids of the question generation and QA evaluator models.
+        :param generation_params: Dictionary with the parameters passed to qg_model.generate.
+        :param input_ids: Token ids of the qg input.
+        """
+        payload = json.dumps(
+            [list(model_ids), sorted(generation_params.items()), list(input_ids)]
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get_questions(self, keys):
+        """
+        Looks up the cached questions. Updates the hit statistics and the last use of the entries found.
+
+        :return: Dictionary key -> question of the keys found in the cache.
+        """
+        rows = self._select(keys, "question")
+        with self._lock:
+            self._hits += len(rows)
+            self._misses += len(set(keys)) - len(rows)
+            connection = self._get_connection()
+            with connection:
+                connection.executemany(
+                    "UPDATE questions SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key in rows],
+                )
+        return rows
+
+    def get_scores(self, keys):
+        """
+        :return: Dictionary key -> QA evaluator score of the keys found in the cache that have a score.
+        """
+        return {
+            key: score for key, score in self._select(keys, "score").items() if score is not None
+        }
+
+    def put_questions(self, questions):
+        """
+        :param questions: Dictionary key -> generated question.
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO questions (key, question, score, last_used) VALUES (?, ?, NULL, ?)",
+                    [(key, question, now) for key, question in questions.items()],
+                )
+                self._evict(connection, len(questions))
+
+    def put_scores(self, scores):
+        """
+        :param scores: Dictionary key -> QA evaluator score. Keys that are not in the cache are ignored.
+        """
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.executemany(
+                    "UPDATE questions SET score = ? WHERE key = ?",
+                    [(float(score), key) for key, score in scores.items()],
+                )
+
+    def stats(self):
+        """
+        :return: Dictionary with the number of hits and misses (of this process) and the number of cached entries.
+        """
+        with self._lock:
+            entries = self._count(self._get_connection())
+            self._entries = entries
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+    def _select(self, keys, column):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            connection = self._get_connection()
+            # stay below the maximum number of variables of a SQLite statement
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                rows = connection.execute(
+                    "SELECT key, {} FROM questions WHERE key IN ({})".format(
+                        column, ", ".join("?" * len(chunk))
+                    ),
+                    chunk,
+                )
+                found.update(rows)
+        return found
+
+    def _evict(self, connection, inserted):
+        # replaced entries are counted as inserted, so the estimate can only be too high
+        self._entries += inserted
+        self._puts_since_count += 1
+        if self._entries <= self.max_entries and self._puts_since_count < COUNT_INTERVAL:
+            return
+
+        entries = self._count(connection)
+        if entries > self.max_entries:
+            connection.execute(
+                "DELETE FROM questions WHERE key IN "
+                "(SELECT key FROM questions ORDER BY last_used ASC LIMIT ?)",
+                (entries - self.max_entries,),
+            )
+            entries = self.max_entries
+        self._entries = entries
+
+    def _count(self, connection):
+        (entries,) = connection.execute("SELECT COUNT(*) FROM questions").fetchone()
+        self._puts_since_count = 0
+        return entries
+
+    def _get_connection(self):
+        # the connection is opened on first use in every process, so a cache created before forking can be used by
+        # the child processes
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS questions "
+                    "(key TEXT PRIMARY KEY, question TEXT NOT NULL, score REAL, last_used REAL NOT NULL)"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS questions_last_used ON questions (last_used)"
+                )
+            self._connection = connection
+            self._pid = os.getpid()
+            self._hits = 0
+            self._misses = 0
+            self._entries = self._count(connection)
+        return self._connection
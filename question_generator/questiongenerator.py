@@ -1,9 +1,11 @@
-import json
+import logging
 import random
 import re
+import threading
 import warnings
+from collections import defaultdict
+from functools import lru_cache, wraps
 
-import en_core_web_sm
 import numpy as np
 import torch
 from transformers import (
@@ -12,34 +14,161 @@ from transformers import (
     AutoModelForSequenceClassification,
 )
 
+try:
+    from .input_planner import canonicalize_answer, deduplicate, select_salient
+except ImportError:
+    # imported as a top-level module by run_qg.py
+    from input_planner import canonicalize_answer, deduplicate, select_salient
+
+
+logger = logging.getLogger(__name__)
+
+QG_PRETRAINED = "iarfmoose/t5-base-question-generator"
+QAE_PRETRAINED = "iarfmoose/bert-base-cased-qa-evaluator"
+
+# the tokenizers and models are shared by all threads of the process (e.g. the /question_generator/generate requests
+# and the job threads): they are loaded by one thread at a time, and used by one call of QuestionGenerator.generate at
+# a time (the fast tokenizers are not thread-safe, their truncation and padding settings are changed per call)
+_LOAD_LOCK = threading.Lock()
+_GENERATE_LOCK = threading.Lock()
+
+
+def _load_once(loader):
+    """
+    lru_cache for the loaders, a cold cache is filled by one thread while the other threads wait.
+    """
+    cached_loader = lru_cache(maxsize=None)(loader)
+
+    @wraps(loader)
+    def load(*args, **kwargs):
+        with _LOAD_LOCK:
+            return cached_loader(*args, **kwargs)
+
+    load.cache_clear = cached_loader.cache_clear
+    return load
+
+
+@_load_once
+def load_tokenizer(pretrained_model_name_or_path, use_fast=None):
+    """
+    Loads a tokenizer once per process, so it is shared by all QuestionGenerator and QAEvaluator instances.
+
+    :param use_fast: Whether to load the Rust-backed (fast) tokenizer instead of the pure-Python one. None keeps the
+        default of AutoTokenizer.
+    """
+    if use_fast is None:
+        return AutoTokenizer.from_pretrained(pretrained_model_name_or_path)
+    return AutoTokenizer.from_pretrained(pretrained_model_name_or_path, use_fast=use_fast)
+
+
+@_load_once
+def load_qg_model(pretrained_model_name_or_path, device):
+    """
+    Loads the question generation model once per process and device.
+    """
+    model = AutoModelForSeq2SeqLM.from_pretrained(pretrained_model_name_or_path)
+    model.to(torch.device(device))
+    model.eval()
+    return model
+
+
+@_load_once
+def load_qae_model(pretrained_model_name_or_path, device):
+    """
+    Loads the QA evaluator model once per process and device.
+    """
+    model = AutoModelForSequenceClassification.from_pretrained(pretrained_model_name_or_path)
+    model.to(torch.device(device))
+    model.eval()
+    return model
+
+
+@_load_once
+def load_spacy_model():
+    """
+    Loads the spaCy pipeline used to extract named entities for multiple-choice answers. The pipeline is loaded once
+    per process and shared by all QuestionGenerator instances.
+    """
+    import en_core_web_sm
+
+    return en_core_web_sm.load()
+
 
 class QuestionGenerator:
-    def __init__(self, model_dir=None):
+    def __init__(
+            self,
+            model_dir=None,
+            batch_size=8,
+            max_question_length=None,
+            num_beams=None,
+            spacy_nlp=None,
+            use_fast_tokenizer=None,
+            max_inputs_per_segment=None,
+            question_cache=None,
+    ):
+        """
+        :param model_dir: The folder that the trained model checkpoints are in.
+        :param batch_size: Number of inputs passed to qg_model.generate at once.
+        :param max_question_length: Maximum length (in tokens) of a generated question.
+            None uses the default of the model configuration.
+        :param num_beams: Number of beams for beam search. None uses the default of the model configuration.
+        :param spacy_nlp: English spaCy pipeline used to extract named entities for multiple-choice answers (e.g. the
+            pipeline already loaded by a TermExtractor). None loads en_core_web_sm when it is first needed.
+        :param use_fast_tokenizer: Whether to use the Rust-backed (fast) tokenizers instead of the pure-Python ones.
+            None uses the pure-Python tokenizer for the question generation model and the AutoTokenizer default for
+            the QA evaluator. question_generator/tests/test_tokenizer_parity.py checks that both produce the same
+            input ids.
+        :param max_inputs_per_segment: Maximum number of sentence answers per segment, the most salient sentences
+            (see input_planner.salience_score) are kept. None keeps all sentences.
+        :param question_cache: QuestionCache in which the generated questions and their QA evaluator scores are
+            cached. None disables caching.
+        """
 
-        QG_PRETRAINED = "iarfmoose/t5-base-question-generator"
         self.ANSWER_TOKEN = "<answer>"
         self.CONTEXT_TOKEN = "<context>"
         self.SEQ_LENGTH = 512
 
+        if batch_size < 1:
+            raise ValueError("batch_size should be >= 1, but received {}".format(batch_size))
+        self.batch_size = batch_size
+        self.max_question_length = max_question_length
+        self.num_beams = num_beams
+        if max_inputs_per_segment is not None and max_inputs_per_segment < 1:
+            raise ValueError(
+                "max_inputs_per_segment should be >= 1, but received {}".format(max_inputs_per_segment)
+            )
+        self.max_inputs_per_segment = max_inputs_per_segment
+        self.question_cache = question_cache
+        self._spacy_nlp = spacy_nlp
+
         device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device = torch.device(device)
         if device == 'cpu':
             warnings.warn('QuestionGenerator operates on CPU', UserWarning)
 
-        self.qg_tokenizer = AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=False)
-        self.qg_model = AutoModelForSeq2SeqLM.from_pretrained(QG_PRETRAINED)
-        self.qg_model.to(self.device)
+        # tokenizers and models are loaded once per process and shared between instances
+        self.qg_tokenizer = load_tokenizer(QG_PRETRAINED, use_fast=bool(use_fast_tokenizer))
+        self.qg_model = load_qg_model(QG_PRETRAINED, device)
 
-        self.qa_evaluator = QAEvaluator(model_dir)
+        self.qa_evaluator = QAEvaluator(model_dir, use_fast_tokenizer=use_fast_tokenizer)
 
     def generate(
             self, article, use_evaluator=True, num_questions=None, answer_style="all"
     ):
+        # the tokenizers and models are shared by all threads, see _GENERATE_LOCK
+        with _GENERATE_LOCK:
+            return self._generate(article, use_evaluator, num_questions, answer_style)
+
+    def _generate(self, article, use_evaluator, num_questions, answer_style):
 
         print("Generating questions...\n")
 
         qg_inputs, qg_answers = self.generate_qg_inputs(article, answer_style)
-        generated_questions = self.generate_questions_from_inputs(qg_inputs)
+        encoded_inputs = self._encode_qg_inputs(qg_inputs)
+        cache_keys = self._get_cache_keys(encoded_inputs)
+        generated_questions = self._generate_questions_cached(
+            encoded_inputs, cache_keys
+        )
 
         message = "{} questions doesn't match {} answers".format(
             len(generated_questions), len(qg_answers)
@@ -50,10 +179,11 @@ class QuestionGenerator:
 
             print("Evaluating QA pairs...\n")
 
-            encoded_qa_pairs = self.qa_evaluator.encode_qa_pairs(
-                generated_questions, qg_answers
+            qa_scores = self._get_qa_scores(
+                generated_questions, qg_answers, cache_keys
             )
-            scores = self.qa_evaluator.get_scores(encoded_qa_pairs)
+            # stable sort, so pairs with equal scores keep their original order
+            scores = np.argsort(-qa_scores, kind="stable").tolist()
             if num_questions:
                 qa_list = self._get_ranked_qa_pairs(
                     generated_questions, qg_answers, scores, num_questions
@@ -67,6 +197,10 @@ class QuestionGenerator:
             print("Skipping evaluation step.\n")
             qa_list = self._get_all_qa_pairs(generated_questions, qg_answers)
 
+        # stats() counts the cached entries, only when they are logged
+        if self.question_cache is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Question cache: %s", self.question_cache.stats())
+
         return qa_list
 
     def generate_qg_inputs(self, text, answer_style):
@@ -85,8 +219,12 @@ class QuestionGenerator:
 
         if answer_style == "sentences" or answer_style == "all":
             segments = self._split_into_segments(text)
-            for segment in segments:
-                sentences = self._split_text(segment)
+            for segment, segment_text in segments:
+                sentences = self._split_text(segment_text)
+                sentences = [
+                    sentences[i]
+                    for i in select_salient(sentences, self.max_inputs_per_segment)
+                ]
                 prepped_inputs, prepped_answers = self._prepare_qg_inputs(
                     sentences, segment
                 )
@@ -102,63 +240,174 @@ class QuestionGenerator:
         return inputs, answers
 
     def generate_questions_from_inputs(self, qg_inputs):
-        generated_questions = []
+        encoded_inputs = self._encode_qg_inputs(qg_inputs)
+        return self._generate_questions_cached(
+            encoded_inputs, self._get_cache_keys(encoded_inputs)
+        )
 
-        for qg_input in qg_inputs:
-            question = self._generate_question(qg_input)
-            generated_questions.append(question)
+    def _get_cache_keys(self, encoded_inputs):
+        """
+        Returns the question cache keys of the encoded qg inputs, None if caching is disabled.
+        """
+        if self.question_cache is None:
+            return None
+        generation_kwargs = self._get_generation_kwargs()
+        return [
+            self.question_cache.make_key(
+                (QG_PRETRAINED, QAE_PRETRAINED), generation_kwargs, encoded_input
+            )
+            for encoded_input in encoded_inputs
+        ]
 
-        return generated_questions
+    def _generate_questions_cached(self, encoded_inputs, cache_keys):
+        """
+        Generates the questions of the encoded qg inputs. Only the inputs that are not in the question cache are
+        passed to the model.
+        """
+        if cache_keys is None:
+            return self._generate_unique_questions(encoded_inputs)
+
+        questions = self.question_cache.get_questions(cache_keys)
+        missing = [i for i, key in enumerate(cache_keys) if key not in questions]
+        generated_questions = self._generate_unique_questions(
+            [encoded_inputs[i] for i in missing]
+        )
+        new_questions = {
+            cache_keys[i]: question for i, question in zip(missing, generated_questions)
+        }
+        self.question_cache.put_questions(new_questions)
+        questions.update(new_questions)
+        return [questions[key] for key in cache_keys]
+
+    def _get_qa_scores(self, generated_questions, qg_answers, cache_keys):
+        """
+        Returns the QA evaluator scores of the (question, answer) pairs. Only the pairs without a cached score are
+        passed to the QA evaluator.
+        """
+        if cache_keys is None:
+            return self.qa_evaluator.score_qa_pairs(
+                self.qa_evaluator.encode_qa_pairs(generated_questions, qg_answers)
+            )
 
-    def _split_text(self, text):
-        MAX_SENTENCE_LEN = 128
+        scores = self.question_cache.get_scores(cache_keys)
+        missing = [i for i, key in enumerate(cache_keys) if key not in scores]
+        new_scores = self.qa_evaluator.score_qa_pairs(
+            self.qa_evaluator.encode_qa_pairs(
+                [generated_questions[i] for i in missing],
+                [qg_answers[i] for i in missing],
+            )
+        )
+        new_scores = {
+            cache_keys[i]: float(score) for i, score in zip(missing, new_scores)
+        }
+        self.question_cache.put_scores(new_scores)
+        scores.update(new_scores)
+        return np.array([scores[key] for key in cache_keys], dtype=np.float32)
+
+    def _generate_unique_questions(self, encoded_inputs):
+        self.qg_model.eval()
 
-        sentences = re.findall(".*?[.!\?]", text)
+        # identical inputs (e.g. an entity occurring twice in a sentence) are only passed to the model once, the
+        # generated question is fanned back out to all of them
+        unique_indices, fan_out = deduplicate(
+            [tuple(encoded_input) for encoded_input in encoded_inputs]
+        )
+        unique_inputs = [encoded_inputs[i] for i in unique_indices]
+
+        # sort the inputs by length, so the inputs in a batch need little padding
+        order = sorted(range(len(unique_inputs)), key=lambda i: len(unique_inputs[i]))
 
-        cut_sentences = []
-        for sentence in sentences:
-            if len(sentence) > MAX_SENTENCE_LEN:
-                cut_sentences.extend(re.split("[,;:)]", sentence))
-        # temporary solution to remove useless post-quote sentence fragments
-        cut_sentences = [s for s in sentences if len(s.split(" ")) > 5]
-        sentences = sentences + cut_sentences
+        unique_questions = [None] * len(unique_inputs)
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start:start + self.batch_size]
+            questions = self._generate_questions(
+                [unique_inputs[i] for i in batch_indices]
+            )
+            for i, question in zip(batch_indices, questions):
+                unique_questions[i] = question
 
-        return list(set([s.strip(" ") for s in sentences]))
+        return [unique_questions[i] for i in fan_out]
+
+    def _split_text(self, text):
+        sentences = re.findall(".*?[.!\?]", text)
+
+        # canonicalise and deduplicate the sentences, keeping the order of their first occurrence so the qg inputs
+        # (and the questions generated from them) do not depend on the hash seed
+        return list(
+            dict.fromkeys(canonicalize_answer(sentence) for sentence in sentences)
+        )
 
     def _split_into_segments(self, text):
+        """
+        Splits the text in segments of at least MAX_TOKENS tokens (unless the end of the text is reached), made of
+        consecutive paragraphs. Every segment is returned as its token ids (used as context of the qg inputs, without
+        decoding and encoding them again) and its paragraphs joined by newlines (from which the answers are taken).
+        """
         MAX_TOKENS = 490
 
-        paragraphs = text.split("\n")
-        tokenized_paragraphs = [
-            self.qg_tokenizer(p)["input_ids"] for p in paragraphs if len(p) > 0
-        ]
+        paragraphs = [p for p in text.split("\n") if len(p) > 0]
+        if not paragraphs:
+            return []
+        tokenized_paragraphs = self.qg_tokenizer(paragraphs)["input_ids"]
 
         segments = []
-        while len(tokenized_paragraphs) > 0:
-            segment = []
-            while len(segment) < MAX_TOKENS and len(tokenized_paragraphs) > 0:
-                paragraph = tokenized_paragraphs.pop(0)
-                segment.extend(paragraph)
-            segments.append(segment)
-        return [self.qg_tokenizer.decode(s) for s in segments]
-
-    def _prepare_qg_inputs(self, sentences, text):
+        segment = []
+        segment_paragraphs = []
+        for paragraph, tokenized_paragraph in zip(paragraphs, tokenized_paragraphs):
+            segment.extend(tokenized_paragraph)
+            segment_paragraphs.append(paragraph)
+            if len(segment) >= MAX_TOKENS:
+                segments.append((segment, "\n".join(segment_paragraphs)))
+                segment = []
+                segment_paragraphs = []
+        if segment:
+            segments.append((segment, "\n".join(segment_paragraphs)))
+        return segments
+
+    def _prepare_qg_inputs(self, sentences, encoded_context):
+        """
+        Builds the qg inputs ("<answer> sentence <context> context") as token ids, by splicing the encoded answer in
+        front of the token ids of the context (e.g. of a segment, see _split_into_segments), so the context is not
+        encoded again for every answer. The spliced ids are equal to the ids of the tokenized qg input strings, see
+        question_generator/tests/test_qg_inputs.py.
+        """
         inputs = []
         answers = []
 
-        for sentence in sentences:
-            qg_input = "{} {} {} {}".format(
-                self.ANSWER_TOKEN, sentence, self.CONTEXT_TOKEN, text
-            )
+        if not sentences:
+            return inputs, answers
+
+        encoded_answers = self.qg_tokenizer(
+            [
+                "{} {} {}".format(self.ANSWER_TOKEN, sentence, self.CONTEXT_TOKEN)
+                for sentence in sentences
+            ],
+            add_special_tokens=False,
+        )["input_ids"]
+
+        for sentence, encoded_answer in zip(sentences, encoded_answers):
+            # truncate like the tokenizer would (keeping room for the end of sequence token)
+            qg_input = (encoded_answer + list(encoded_context))[: self.SEQ_LENGTH - 1]
+            qg_input.append(self.qg_tokenizer.eos_token_id)
             inputs.append(qg_input)
             answers.append(sentence)
 
         return inputs, answers
 
+    @property
+    def spacy_nlp(self):
+        if self._spacy_nlp is None:
+            self._spacy_nlp = load_spacy_model()
+        return self._spacy_nlp
+
+    @spacy_nlp.setter
+    def spacy_nlp(self, spacy_nlp):
+        self._spacy_nlp = spacy_nlp
+
     def _prepare_qg_inputs_MC(self, sentences):
 
-        spacy_nlp = en_core_web_sm.load()
-        docs = list(spacy_nlp.pipe(sentences, disable=["parser"]))
+        docs = list(self.spacy_nlp.pipe(sentences, disable=["parser"]))
+        entity_pool = self._get_entity_pool(docs)
         inputs_from_text = []
         answers_from_text = []
 
@@ -169,66 +418,106 @@ class QuestionGenerator:
                     qg_input = "{} {} {} {}".format(
                         self.ANSWER_TOKEN, entity, self.CONTEXT_TOKEN, sentences[i]
                     )
-                    answers = self._get_MC_answers(entity, docs)
+                    answers = self._get_MC_answers(entity, entity_pool)
                     inputs_from_text.append(qg_input)
                     answers_from_text.append(answers)
 
         return inputs_from_text, answers_from_text
 
-    def _get_MC_answers(self, correct_answer, docs):
+    def _get_entity_pool(self, docs):
+        """
+        Collects the unique (text, label) entities of all docs once per document, together with an index of the
+        entities per NER label.
+        """
+        entities = list(
+            dict.fromkeys((e.text, e.label_) for doc in docs for e in doc.ents)
+        )
+        entities_by_label = defaultdict(list)
+        for entity in entities:
+            entities_by_label[entity[1]].append(entity)
+        return entities, entities_by_label
 
-        entities = []
-        for doc in docs:
-            entities.extend([{"text": e.text, "label_": e.label_} for e in doc.ents])
+    def _get_MC_answers(self, correct_answer, entity_pool):
 
-        # remove duplicate elements
-        entities_json = [json.dumps(kv) for kv in entities]
-        pool = set(entities_json)
+        entities, entities_by_label = entity_pool
+        correct_entity = (correct_answer.text, correct_answer.label_)
         num_choices = (
-                min(4, len(pool)) - 1
+                min(4, len(entities)) - 1
         )  # -1 because we already have the correct answer
 
         # add the correct answer
         final_choices = []
-        correct_label = correct_answer.label_
         final_choices.append({"answer": correct_answer.text, "correct": True})
-        pool.remove(
-            json.dumps({"text": correct_answer.text, "label_": correct_answer.label_})
-        )
 
         # find answers with the same NER label
-        matches = [e for e in pool if correct_label in e]
+        matches = [
+            e for e in entities_by_label[correct_answer.label_] if e != correct_entity
+        ]
 
         # if we don't have enough then add some other random answers
         if len(matches) < num_choices:
-            choices = matches
-            pool = pool.difference(set(choices))
-            choices.extend(random.sample(pool, num_choices - len(choices)))
+            choices = matches + self._sample_other_entities(
+                entities, correct_answer.label_, num_choices - len(matches)
+            )
         else:
             choices = random.sample(matches, num_choices)
 
-        choices = [json.loads(s) for s in choices]
         for choice in choices:
-            final_choices.append({"answer": choice["text"], "correct": False})
+            final_choices.append({"answer": choice[0], "correct": False})
         random.shuffle(final_choices)
         return final_choices
 
-    def _generate_question(self, qg_input):
-        self.qg_model.eval()
-        encoded_input = self._encode_qg_input(qg_input)
-        with torch.no_grad():
-            output = self.qg_model.generate(input_ids=encoded_input["input_ids"])
-        question = self.qg_tokenizer.decode(output[0], skip_special_tokens=True)
-        return question
-
-    def _encode_qg_input(self, qg_input):
-        return self.qg_tokenizer(
-            qg_input,
-            padding='max_length',
-            max_length=self.SEQ_LENGTH,
-            truncation=True,
-            return_tensors="pt",
+    def _sample_other_entities(self, entities, label, k):
+        """
+        Samples k distinct entities with a NER label different from label. The caller guarantees that there are at
+        least k such entities.
+        """
+        sampled = []
+        while len(sampled) < k:
+            entity = random.choice(entities)
+            if entity[1] != label and entity not in sampled:
+                sampled.append(entity)
+        return sampled
+
+    def _generate_questions(self, encoded_inputs):
+        # pad to the longest input in the batch instead of to SEQ_LENGTH
+        batch = self.qg_tokenizer.pad(
+            {"input_ids": encoded_inputs}, padding=True, return_tensors="pt"
         ).to(self.device)
+        with torch.no_grad():
+            output = self.qg_model.generate(
+                input_ids=batch["input_ids"],
+                attention_mask=batch["attention_mask"],
+                **self._get_generation_kwargs()
+            )
+        return self.qg_tokenizer.batch_decode(output, skip_special_tokens=True)
+
+    def _get_generation_kwargs(self):
+        generation_kwargs = {}
+        if self.max_question_length is not None:
+            generation_kwargs["max_length"] = self.max_question_length
+        if self.num_beams is not None:
+            generation_kwargs["num_beams"] = self.num_beams
+        return generation_kwargs
+
+    def _encode_qg_inputs(self, qg_inputs):
+        """
+        Encodes the qg inputs that are strings, inputs that are lists of token ids are already encoded.
+        """
+        texts = [qg_input for qg_input in qg_inputs if isinstance(qg_input, str)]
+        if not texts:
+            return list(qg_inputs)
+        encoded_texts = iter(
+            self.qg_tokenizer(
+                texts,
+                max_length=self.SEQ_LENGTH,
+                truncation=True,
+            )["input_ids"]
+        )
+        return [
+            next(encoded_texts) if isinstance(qg_input, str) else qg_input
+            for qg_input in qg_inputs
+        ]
 
     def _get_ranked_qa_pairs(
             self, generated_questions, qg_answers, scores, num_questions=10
@@ -267,56 +556,97 @@ class QuestionGenerator:
 
 
 class QAEvaluator:
-    def __init__(self, model_dir=None):
+    def __init__(self, model_dir=None, batch_size=16, use_fast_tokenizer=None):
+        """
+        :param model_dir: The folder that the trained model checkpoints are in.
+        :param batch_size: Number of QA pairs scored by qae_model at once.
+        :param use_fast_tokenizer: Whether to use the Rust-backed (fast) tokenizer. None keeps the AutoTokenizer
+            default (the fast tokenizer, when available).
+        """
 
-        QAE_PRETRAINED = "iarfmoose/bert-base-cased-qa-evaluator"
         self.SEQ_LENGTH = 512
 
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if batch_size < 1:
+            raise ValueError("batch_size should be >= 1, but received {}".format(batch_size))
+        self.batch_size = batch_size
 
-        self.qae_tokenizer = AutoTokenizer.from_pretrained(QAE_PRETRAINED)
-        self.qae_model = AutoModelForSequenceClassification.from_pretrained(
-            QAE_PRETRAINED
-        )
-        self.qae_model.to(self.device)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+
+        self.qae_tokenizer = load_tokenizer(QAE_PRETRAINED, use_fast=use_fast_tokenizer)
+        self.qae_model = load_qae_model(QAE_PRETRAINED, device)
 
     def encode_qa_pairs(self, questions, answers):
-        encoded_pairs = []
-        for i in range(len(questions)):
-            encoded_qa = self._encode_qa(questions[i], answers[i])
-            encoded_pairs.append(encoded_qa.to(self.device))
-        return encoded_pairs
+        """
+        Encodes all (question, answer) pairs in one tokenizer call. The pairs are not padded, padding is done per
+        batch in get_scores.
+        """
+        if not questions:
+            return []
+        correct_answers = [self._get_correct_answer(answer) for answer in answers]
+        return self.qae_tokenizer(
+            text=list(questions),
+            text_pair=correct_answers,
+            max_length=self.SEQ_LENGTH,
+            truncation=True,
+        )
 
     def get_scores(self, encoded_qa_pairs):
-        scores = {}
-        self.qae_model.eval()
-        with torch.no_grad():
-            for i in range(len(encoded_qa_pairs)):
-                scores[i] = self._evaluate_qa(encoded_qa_pairs[i])
+        """
+        Scores the encoded QA pairs in batches of self.batch_size and returns the indices of the pairs, sorted from
+        highest to lowest score.
+        """
+        scores = self.score_qa_pairs(encoded_qa_pairs)
+
+        # stable sort, so pairs with equal scores keep their original order
+        return np.argsort(-scores, kind="stable").tolist()
+
+    def score_qa_pairs(self, encoded_qa_pairs):
+        """
+        Scores the encoded QA pairs in batches of self.batch_size and returns the scores in the order of the pairs.
+        """
+        if not encoded_qa_pairs:
+            return np.empty(0, dtype=np.float32)
+
+        # identical pairs (questions generated from duplicated answers) are only scored once
+        unique_indices, fan_out = deduplicate(
+            [tuple(input_ids) for input_ids in encoded_qa_pairs["input_ids"]]
+        )
+        n_pairs = len(unique_indices)
+        scores = np.empty(n_pairs, dtype=np.float32)
 
-        return [
-            k for k, v in sorted(scores.items(), key=lambda item: item[1], reverse=True)
-        ]
+        # score the pairs ordered by length, so the pairs in a batch need little padding
+        lengths = np.array(
+            [len(encoded_qa_pairs["input_ids"][i]) for i in unique_indices]
+        )
+        order = np.argsort(lengths, kind="stable")
 
-    def _encode_qa(self, question, answer):
+        self.qae_model.eval()
+        with torch.no_grad():
+            for start in range(0, n_pairs, self.batch_size):
+                batch_indices = order[start:start + self.batch_size]
+                batch = {
+                    key: [values[unique_indices[i]] for i in batch_indices]
+                    for key, values in encoded_qa_pairs.items()
+                }
+                scores[batch_indices] = self._evaluate_qa(batch)
+        return scores[fan_out]
+
+    def _get_correct_answer(self, answer):
         if type(answer) is list:
             for a in answer:
                 if a["correct"]:
                     correct_answer = a["answer"]
         else:
             correct_answer = answer
-        return self.qae_tokenizer(
-            text=question,
-            text_pair=correct_answer,
-            padding="max_length",
-            max_length=self.SEQ_LENGTH,
-            truncation=True,
-            return_tensors="pt",
-        )
+        return correct_answer
 
-    def _evaluate_qa(self, encoded_qa_pair):
-        output = self.qae_model(**encoded_qa_pair)
-        return output[0][0][1]
+    def _evaluate_qa(self, encoded_qa_batch):
+        batch = self.qae_tokenizer.pad(
+            encoded_qa_batch, padding=True, return_tensors="pt"
+        ).to(self.device)
+        output = self.qae_model(**batch)
+        return output[0][:, 1].cpu().numpy()
 
 
 def print_qa(qa_list, show_answers=True):
@@ -0,0 +1,95 @@
+"""
+Benchmark of batched question generation.
+
+Measures the number of generated questions per second of QuestionGenerator.generate_questions_from_inputs
+for different batch sizes, on the articles in question_generator/articles (or on the text files in --text_dir).
+
+Run from the root of the repository:
+
+    python -m question_generator.scripts.benchmark_question_generation --batch_sizes 1 4 8 16
+"""
+import argparse
+import glob
+import os
+import time
+
+from question_generator.questiongenerator import QuestionGenerator
+
+ARTICLES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "articles")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--text_dir",
+        default=ARTICLES_DIR,
+        type=str,
+        help="Folder with .txt files used as context for question generation.",
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        default=[1, 2, 4, 8, 16],
+        type=int,
+        nargs="+",
+        help="Batch sizes to benchmark.",
+    )
+    parser.add_argument(
+        "--max_inputs",
+        default=64,
+        type=int,
+        help="Maximum number of question generation inputs (answer, context) to use.",
+    )
+    parser.add_argument(
+        "--answer_style",
+        default="all",
+        type=str,
+        help="The desired type of answers. Choose from ['all', 'sentences', 'multiple_choice']",
+    )
+    parser.add_argument(
+        "--max_question_length",
+        default=None,
+        type=int,
+        help="Maximum length (in tokens) of the generated questions.",
+    )
+    parser.add_argument(
+        "--num_beams",
+        default=None,
+        type=int,
+        help="Number of beams for beam search.",
+    )
+    args = parser.parse_args()
+
+    qg = QuestionGenerator(
+        max_question_length=args.max_question_length, num_beams=args.num_beams
+    )
+
+    qg_inputs = []
+    for path in sorted(glob.glob(os.path.join(args.text_dir, "*.txt"))):
+        with open(path, "r") as file:
+            inputs, _ = qg.generate_qg_inputs(file.read(), args.answer_style)
+        qg_inputs.extend(inputs)
+    qg_inputs = qg_inputs[: args.max_inputs]
+
+    if not qg_inputs:
+        raise ValueError("No question generation inputs found in {}".format(args.text_dir))
+
+    # warm-up, so the first benchmarked batch size does not pay for lazy initialisation
+    qg.batch_size = 1
+    qg.generate_questions_from_inputs(qg_inputs[:1])
+
+    print("{} inputs on {}".format(len(qg_inputs), qg.device))
+    print("{:>10} {:>10} {:>15}".format("batch_size", "seconds", "questions/s"))
+    for batch_size in args.batch_sizes:
+        qg.batch_size = batch_size
+        start = time.perf_counter()
+        questions = qg.generate_questions_from_inputs(qg_inputs)
+        elapsed = time.perf_counter() - start
+        print(
+            "{:>10} {:>10.2f} {:>15.2f}".format(
+                batch_size, elapsed, len(questions) / elapsed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
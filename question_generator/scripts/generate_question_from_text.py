@@ -1,12 +1,47 @@
+import threading
 from enum import Enum, unique
 
 from question_generator.questiongenerator import QuestionGenerator, print_qa
+from src.parallelism import apply_torch_parallelism
 
-# TODO should we load this once, instead of with every call?
 model_dir = None
-QG = QuestionGenerator(
-    model_dir
-)
+
+# the QuestionGenerator is created once per process, on first use (see get_question_generator)
+_QG = None
+_QG_KWARGS = {}
+_QG_LOCK = threading.Lock()
+
+
+def configure_question_generator(**kwargs):
+    """
+    Sets the keyword arguments (e.g. spacy_nlp, batch_size, num_beams) used to create the shared QuestionGenerator.
+    Should be called before the first call of get_question_generator.
+    """
+    with _QG_LOCK:
+        if _QG is not None:
+            raise RuntimeError("The QuestionGenerator was already created, configure it before its first use.")
+        _QG_KWARGS.update(kwargs)
+
+
+def get_question_generator() -> QuestionGenerator:
+    """
+    Returns the QuestionGenerator shared by all callers in this process. Its tokenizers and models are loaded on the
+    first call.
+    """
+    global _QG
+    with _QG_LOCK:
+        if _QG is None:
+            # apply the configured torch thread settings (see src/parallelism.py) before loading the models
+            apply_torch_parallelism()
+            _QG = QuestionGenerator(model_dir, **_QG_KWARGS)
+        return _QG
+
+
+def __getattr__(name):
+    # QG used to be created at import of this module, it is now created on first access
+    if name == "QG":
+        return get_question_generator()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 @unique
@@ -40,7 +75,7 @@ def main(text: str,
     :return:
     """
 
-    qa_list = QG.generate(
+    qa_list = get_question_generator().generate(
         text,
         num_questions=int(num_questions),
         answer_style=answer_style,
@@ -0,0 +1,28 @@
+import glob
+import json
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def corpus_texts():
+    """
+    Texts of our corpora: the example articles, a page extracted by trafilatura and the example of user_scripts.
+    """
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "question_generator", "articles", "*.txt"))):
+        with open(path) as f:
+            texts.append(f.read())
+    with open(os.path.join(ROOT, "tests", "test_files", "json_trafilatura.json")) as f:
+        texts.append(json.load(f)["text"])
+    with open(os.path.join(ROOT, "user_scripts", "example.txt")) as f:
+        texts.append(f.read())
+    return [text for text in texts if text]
+
+
+@pytest.fixture(scope="session")
+def corpus_paragraphs(corpus_texts):
+    return [p for text in corpus_texts for p in text.split("\n") if len(p) > 0]
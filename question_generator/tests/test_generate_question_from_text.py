@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from question_generator.scripts import generate_question_from_text  # noqa: E402
+
+
+def test_qg_is_created_on_access(monkeypatch):
+    # QG is still importable, but the QuestionGenerator is only created when it is accessed
+    sentinel = object()
+    monkeypatch.setattr(generate_question_from_text, "_QG", sentinel)
+    assert generate_question_from_text.QG is sentinel
+
+    with pytest.raises(AttributeError):
+        generate_question_from_text.UNKNOWN
@@ -0,0 +1,33 @@
+from question_generator.input_planner import (
+    canonicalize_answer,
+    deduplicate,
+    salience_score,
+    select_salient,
+)
+
+
+def test_canonicalize_answer():
+    assert canonicalize_answer("  I walk  500\nmiles. ") == "I walk 500 miles."
+
+
+def test_select_salient():
+    answers = [
+        "It was ok.",
+        "Amsterdam welcomed 500 visitors in March.",
+        "So it is.",
+        "The European Commission published the report.",
+    ]
+    assert salience_score(answers[1]) > salience_score(answers[0])
+
+    assert select_salient(answers) == [0, 1, 2, 3]
+    assert select_salient(answers, max_inputs=2) == [1, 3]
+    # ties keep the original order
+    assert select_salient(["a b.", "c d.", "e f."], max_inputs=2) == [0, 1]
+
+
+def test_deduplicate():
+    keys = [(1, 2), (3,), (1, 2), (4,), (3,)]
+    unique_indices, fan_out = deduplicate(keys)
+    assert unique_indices == [0, 1, 3]
+    assert fan_out == [0, 1, 0, 2, 1]
+    assert [keys[unique_indices[i]] for i in fan_out] == keys
@@ -0,0 +1,71 @@
+"""
+The qg inputs are built by splicing token ids (QuestionGenerator._prepare_qg_inputs): they should be equal to the ids
+of the tokenized "<answer> sentence <context> text" strings, including the truncation to 512 tokens. The context of the
+inputs of a segment are the token ids of the segment. Both the slow and the fast tokenizer are tested (production
+uses the fast one by default, see USE_FAST_TOKENIZER in the [QuestionGeneration] section of the config file).
+"""
+import pytest
+
+pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from question_generator.questiongenerator import QG_PRETRAINED, QuestionGenerator  # noqa: E402
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["slow", "fast"])
+def question_generator(request):
+    try:
+        tokenizer = transformers.AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=request.param)
+    except OSError:
+        pytest.skip("the tokenizer of {} is not available".format(QG_PRETRAINED))
+
+    # only the tokenizer is needed to build the qg inputs, the models are not loaded
+    question_generator = QuestionGenerator.__new__(QuestionGenerator)
+    question_generator.ANSWER_TOKEN = "<answer>"
+    question_generator.CONTEXT_TOKEN = "<context>"
+    question_generator.SEQ_LENGTH = 512
+    question_generator.qg_tokenizer = tokenizer
+    return question_generator
+
+
+def assert_spliced_inputs_equal(question_generator, sentences, text):
+    encoded_text = question_generator.qg_tokenizer(text, add_special_tokens=False)["input_ids"]
+    inputs, answers = question_generator._prepare_qg_inputs(sentences, encoded_text)
+    assert answers == sentences
+
+    expected = question_generator.qg_tokenizer(
+        ["<answer> {} <context> {}".format(sentence, text) for sentence in sentences],
+        max_length=512,
+        truncation=True,
+    )["input_ids"]
+    for sentence, spliced, tokenized in zip(sentences, inputs, expected):
+        assert spliced == tokenized, sentence
+
+
+def test_qg_inputs_of_segments(question_generator, corpus_texts):
+    tokenizer = question_generator.qg_tokenizer
+    for text in corpus_texts:
+        for segment, segment_text in question_generator._split_into_segments(text):
+            # the segment is made of the (tokenized) paragraphs of its text
+            paragraphs = segment_text.split("\n")
+            assert segment == [i for ids in tokenizer(paragraphs)["input_ids"] for i in ids]
+
+            sentences = question_generator._split_text(segment_text)
+            assert_spliced_inputs_equal(question_generator, sentences, segment_text)
+
+            # the segment ids are used as context, without decoding and encoding them again
+            inputs, _ = question_generator._prepare_qg_inputs(sentences, segment)
+            for sentence, qg_input in zip(sentences, inputs):
+                prefix = tokenizer(
+                    "<answer> {} <context>".format(sentence), add_special_tokens=False
+                )["input_ids"]
+                assert qg_input == (prefix + segment)[:511] + [tokenizer.eos_token_id]
+
+
+def test_qg_inputs_of_long_context(question_generator, corpus_texts):
+    # context longer than 512 tokens: the spliced inputs are truncated like the tokenized strings
+    text = " ".join(p for text in corpus_texts for p in text.split("\n") if p)
+    assert len(question_generator.qg_tokenizer(text)["input_ids"]) > 512
+
+    sentences = question_generator._split_text(text)[:20]
+    assert_spliced_inputs_equal(question_generator, sentences, text)
@@ -0,0 +1,60 @@
+import time
+
+from question_generator.question_cache import COUNT_INTERVAL, QuestionCache
+
+MODEL_IDS = ("qg-model", "qae-model")
+
+
+def test_question_cache(tmp_path):
+    cache = QuestionCache(str(tmp_path / "cache.sqlite"))
+
+    key = QuestionCache.make_key(MODEL_IDS, {"num_beams": 4}, [1, 2, 3])
+    assert key == QuestionCache.make_key(MODEL_IDS, {"num_beams": 4}, (1, 2, 3))
+    assert key != QuestionCache.make_key(MODEL_IDS, {"num_beams": 2}, [1, 2, 3])
+    assert key != QuestionCache.make_key(MODEL_IDS, {"num_beams": 4}, [1, 2])
+
+    assert cache.get_questions([key]) == {}
+    cache.put_questions({key: "What is it?"})
+    assert cache.get_questions([key, "unknown"]) == {key: "What is it?"}
+
+    assert cache.get_scores([key]) == {}
+    cache.put_scores({key: 0.5, "unknown": 1.0})
+    assert cache.get_scores([key, "unknown"]) == {key: 0.5}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+    # the cache is persistent
+    assert QuestionCache(str(tmp_path / "cache.sqlite")).get_questions([key]) == {key: "What is it?"}
+
+
+def test_question_cache_eviction(tmp_path):
+    cache = QuestionCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+    cache.put_questions({"a": "A?"})
+    time.sleep(0.01)
+    cache.put_questions({"b": "B?"})
+    time.sleep(0.01)
+    # using "a" makes "b" the least recently used entry
+    cache.get_questions(["a"])
+    time.sleep(0.01)
+    cache.put_questions({"c": "C?"})
+
+    assert cache.get_questions(["a", "b", "c"]) == {"a": "A?", "c": "C?"}
+    assert cache.stats()["entries"] == 2
+
+
+def test_question_cache_counts_entries_every_interval(tmp_path):
+    cache = QuestionCache(str(tmp_path / "cache.sqlite"), max_entries=1000)
+    statements = []
+    cache._get_connection().set_trace_callback(statements.append)
+
+    # the entries are not counted on every put
+    for i in range(COUNT_INTERVAL):
+        cache.put_questions({str(i): "Q{}?".format(i)})
+    assert sum("COUNT(*)" in statement for statement in statements) == 1
+
+    # the estimate exceeding max_entries triggers the count and the eviction
+    cache.put_questions({"new {}".format(i): "Q?" for i in range(1000)})
+    assert sum("COUNT(*)" in statement for statement in statements) == 2
+    assert cache.stats()["entries"] == 1000
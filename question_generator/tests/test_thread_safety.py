@@ -0,0 +1,55 @@
+"""
+The tokenizers and models are shared by all threads of a process: they are loaded once, and used by one call of
+QuestionGenerator.generate at a time.
+"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from question_generator import questiongenerator  # noqa: E402
+from question_generator.questiongenerator import QuestionGenerator  # noqa: E402
+
+
+def run_threads(target, n_threads=4):
+    threads = [threading.Thread(target=target) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_loader_loads_once_on_cold_cache():
+    calls = []
+
+    @questiongenerator._load_once
+    def load(name):
+        calls.append(name)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    run_threads(lambda: results.append(load("model")))
+    assert calls == ["model"]
+    assert all(result is results[0] for result in results)
+
+
+def test_generate_is_serialized(monkeypatch):
+    running = []
+    overlaps = []
+
+    def generate(self, article, use_evaluator, num_questions, answer_style):
+        running.append(article)
+        overlaps.append(len(running))
+        time.sleep(0.02)
+        running.remove(article)
+        return []
+
+    monkeypatch.setattr(QuestionGenerator, "_generate", generate)
+    # only the shared lock is tested, the models are not loaded
+    question_generator = QuestionGenerator.__new__(QuestionGenerator)
+    run_threads(lambda: question_generator.generate(threading.current_thread().name))
+    assert overlaps == [1, 1, 1, 1]
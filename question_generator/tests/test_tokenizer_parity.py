@@ -0,0 +1,34 @@
+"""
+Parity test between the pure-Python (slow) and the Rust-backed (fast) tokenizers used by QuestionGenerator and
+QAEvaluator: both should produce identical input ids on our corpora.
+"""
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+from question_generator.questiongenerator import QAE_PRETRAINED, QG_PRETRAINED  # noqa: E402
+
+
+@pytest.mark.parametrize("pretrained", [QG_PRETRAINED, QAE_PRETRAINED])
+def test_fast_tokenizer_parity(pretrained, corpus_paragraphs):
+    slow_tokenizer = transformers.AutoTokenizer.from_pretrained(pretrained, use_fast=False)
+    fast_tokenizer = transformers.AutoTokenizer.from_pretrained(pretrained, use_fast=True)
+
+    slow_ids = slow_tokenizer(corpus_paragraphs, max_length=512, truncation=True)["input_ids"]
+    fast_ids = fast_tokenizer(corpus_paragraphs, max_length=512, truncation=True)["input_ids"]
+
+    for paragraph, slow, fast in zip(corpus_paragraphs, slow_ids, fast_ids):
+        assert slow == fast, paragraph
+
+
+def test_fast_tokenizer_parity_qg_inputs(corpus_paragraphs):
+    slow_tokenizer = transformers.AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=False)
+    fast_tokenizer = transformers.AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=True)
+
+    # inputs as built by QuestionGenerator._prepare_qg_inputs (answer prefix) and _prepare_qg_inputs_MC
+    answer_prefixes = [
+        "<answer> {} <context>".format(p) for p in corpus_paragraphs
+    ]
+    slow_ids = slow_tokenizer(answer_prefixes, add_special_tokens=False)["input_ids"]
+    fast_ids = fast_tokenizer(answer_prefixes, add_special_tokens=False)["input_ids"]
+    assert slow_ids == fast_ids
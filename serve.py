@@ -0,0 +1,75 @@
+"""
+Pre-forking server for app.py: the components (models) are loaded once, in the master process, before the uvicorn
+workers are forked. The workers share the memory of the models (copy-on-write), so running more workers on a node only
+costs the unique memory of every worker. A memory report (RSS, PSS and USS of the master and every worker) is printed
+after --report-delay seconds, and on SIGUSR1 (kill -USR1 <pid of the master>).
+
+Usage (from the root of the repository, replaces uvicorn app:app --workers 4):
+
+python serve.py --workers 4 --host 0.0.0.0 --port 5001
+python serve.py --workers 8 --preload trafilatura,term_extractor --share-torch
+
+The service profile and the components loaded at startup are configured as for uvicorn (see [Service] and [Startup]
+sections of the config file). Components that use the GPU should not be preloaded: CUDA can not be used after a fork.
+"""
+
+import argparse
+import os
+
+from src.prefork import (PreforkServer, check_fork_safety, check_preloaded, create_socket, format_memory_report,
+                         share_torch_modules)
+from src.service_profiles import parse_list
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the models once, then fork the uvicorn workers.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--preload', default=None,
+                        help="Comma separated components loaded in the master. Default: WARM_UP of the [Startup] "
+                             "section of the config file (restricted to the service profile).")
+    parser.add_argument('--share-torch', action='store_true',
+                        help="Move the weights of the torch models to shared memory (needs a large enough /dev/shm).")
+    parser.add_argument('--report-delay', type=float, default=30.0,
+                        help="Seconds after the start of the workers when the memory report is printed.")
+    parser.add_argument('--log-level', default='info')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    import app as app_module
+
+    preload = app_module.WARM_UP if args.preload is None else parse_list(args.preload)
+    for name in preload:
+        if name not in app_module.service_profile.components:
+            raise ValueError(f"Component '{name}' is not needed by service profile '{app_module.service_profile.name}',"
+                             f" its components are {app_module.service_profile.components}.")
+
+    # load the components in the master, in the foreground: no threads should be running when the workers are forked
+    app_module.components.warm_up(preload, background=False)
+    app_module.print_startup_report()
+    # the models of the preloaded components should be in the memory of the master, to be shared by the workers
+    check_preloaded(app_module.components, preload)
+    check_fork_safety()
+    if args.share_torch:
+        print(f"Moved {share_torch_modules()} torch modules to shared memory.")
+    print(f"Memory of the master after loading:\n{format_memory_report({'master': os.getpid()})}", flush=True)
+
+    sock = create_socket(args.host, args.port)
+
+    def run_worker(sock):
+        import uvicorn
+
+        # the startup event of app.py warms up the components that were not preloaded
+        config = uvicorn.Config(app_module.app, log_level=args.log_level)
+        uvicorn.Server(config).run(sockets=[sock])
+
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers (master pid {os.getpid()}).", flush=True)
+    PreforkServer(run_worker, sock, workers=args.workers, report_delay=args.report_delay).run()
+
+
+if __name__ == '__main__':
+    main()
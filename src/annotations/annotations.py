@@ -1,14 +1,18 @@
-from typing import List, Tuple
-
-import ahocorasick as ahc
+from typing import List, Optional, Tuple
 
 from configparser import ConfigParser
 
 from cassis.typesystem import TypeSystem
 from cassis.cas import Cas
+import numpy as np
 
-from .utils import is_token
+from .segmentation import SENTENCE_SEGMENTATION_MODES, iter_paragraph_offsets, iter_paragraph_offsets_trafilatura, iter_sentence_offsets_mode
+from .utils import find_terms
+from .. import instrumentation
 from ..aliases import Named_entity, Term_lemma
+from ..terms.scoring import TermScorer
+from ..terms.occurrences import TermOccurrences
+from ..terms.term_index import TermIndex
 
 class AnnotationAdder():
     
@@ -43,10 +47,25 @@ class AnnotationAdder():
             
         if "NER_TYPE" not in config[ "Annotation" ]:
             raise KeyError( "Annotation section of config file should contain 'NER_TYPE'." )
+            
+        #optional: sentence segmentation mode used by self.add_sentence_annotation (see segmentation.py). Defaults to 'newline' (every line is a sentence).
+        self._sentence_segmentation=config[ "Annotation" ].get( "SENTENCE_SEGMENTATION", "newline" )
+        if self._sentence_segmentation not in SENTENCE_SEGMENTATION_MODES:
+            raise ValueError( f"SENTENCE_SEGMENTATION in the Annotation section of config file should be one of {list( SENTENCE_SEGMENTATION_MODES )}, but received '{self._sentence_segmentation}'." )
                                  
         self._config=config
         
         
+    @property
+    def sentence_segmentation( self )->str:
+        
+        '''
+        Sentence segmentation mode used by self.add_sentence_annotation (SENTENCE_SEGMENTATION of the config file).
+        '''
+        
+        return self._sentence_segmentation
+        
+        
     def create_cas_from_text( self, text:str ):
         
         '''
@@ -60,10 +79,12 @@ class AnnotationAdder():
         self.cas.create_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string=text
         
         
-    def add_sentence_annotation( self ):
+    def add_sentence_annotation( self, sentence_segmentation:Optional[ str ]=None ):
         
         '''
-        Add sentence annotations ( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] ) to self.cas using the get_sentences_index() helper function. If self.cas already contains self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] annotations, the will be removed before adding new ones. 
+        Add sentence annotations ( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] ) to self.cas using the iter_sentence_offsets_mode() helper function (see segmentation.py). If self.cas already contains self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] annotations, the will be removed before adding new ones. 
+        
+        :param sentence_segmentation: String or None. Sentence segmentation mode: 'newline' (every line is a sentence), 'rules' (lines are split at sentence ends by rules) or 'sentencizer' (lines are split by the spaCy sentencizer). None uses the SENTENCE_SEGMENTATION of the config file ('newline' if not set).
         '''
         
         #first check if AnnotationAdder contains _cas object:
@@ -80,17 +101,21 @@ class AnnotationAdder():
             for sentence_annotation in sentence_annotations:
                 self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ]  ).remove_annotation( sentence_annotation )
         
-        indices_sentences=get_sentences_index( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string )
+        if sentence_segmentation is None:
+            sentence_segmentation=self._sentence_segmentation
+        
+        indices_sentences=iter_sentence_offsets_mode( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string, sentence_segmentation )
                 
-        for index in indices_sentences:
+        with instrumentation.stage( 'sentence_annotation' ):
+            for index in indices_sentences:
 
-            self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( sentence_type( begin=index[0], end=index[1], id='regular sentence' ) )
+                self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( sentence_type( begin=index[0], end=index[1], id='regular sentence' ) )
             
             
     def add_paragraph_annotation( self, parsing_method:str='tika' ):
         
         '''
-        Add paragraph annotations ( self._config[ 'Annotation' ][ 'PARAGRAPH_TYPE' ] ) to self.cas using the get_paragraphs_index() or get_paragraphs_index_trafilatura() helper functions dending on what method was used to obtain the text in self._config[ 'Annotation' ][ 'SOFA_ID' ]  ). If self.cas already contains self._config[ 'Annotation' ][ 'PARAGRAPH_TYPE'] annotations, the will be removed before adding new ones. 
+        Add paragraph annotations ( self._config[ 'Annotation' ][ 'PARAGRAPH_TYPE' ] ) to self.cas using the iter_paragraph_offsets() or iter_paragraph_offsets_trafilatura() helper functions (see segmentation.py) depending on what method was used to obtain the text in self._config[ 'Annotation' ][ 'SOFA_ID' ]  ). If self.cas already contains self._config[ 'Annotation' ][ 'PARAGRAPH_TYPE'] annotations, the will be removed before adding new ones. 
         
         :param parsing_method: string. Parsing method. Should be either 'tika' or 'trafilatura'.
         '''
@@ -113,25 +138,27 @@ class AnnotationAdder():
                 self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ]  ).remove_annotation( paragraph_annotation )
         
         if parsing_method=='tika':
-            indices_paragraphs=get_paragraphs_index( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string )
+            indices_paragraphs=iter_paragraph_offsets( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string )
         elif parsing_method=='trafilatura':
-            indices_paragraphs=get_paragraphs_index_trafilatura( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string )
+            indices_paragraphs=iter_paragraph_offsets_trafilatura( self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).sofa_string )
                 
-        for index in indices_paragraphs:
+        with instrumentation.stage( 'paragraph_annotation' ):
+            for index in indices_paragraphs:
 
-            self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( paragraph_type( begin=index[0], end=index[1] ) )
+                self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( paragraph_type( begin=index[0], end=index[1] ) )
 
             
-    def add_token_annotation( self, terms_lemmas: List[ Term_lemma ] ):
+    def add_token_annotation( self, terms_lemmas: List[ Term_lemma ], term_scorer:Optional[ TermScorer ]=None, aggregate_lemmas:bool=False ):
         
         '''
-        Add token annotations ( self._config[ 'Annotation' ][ 'TOKEN_TYPE' ] ) to self.cas. Tokens should be provided via the list terms_lemmas ( list of (term, lemma) tuples ).
+        Add token annotations ( self._config[ 'Annotation' ][ 'TOKEN_TYPE' ] ) to self.cas. Tokens should be provided via the list terms_lemmas ( list of (term, lemma) tuples ). The score feature of the tokens is the score of the term given by term_scorer, computed from the number of occurrences of the term in the document. One record per term ( see TermIndex.get_records ) is available via self.term_records.
 
         :param terms_lemmas: List of (term,lemma) Tuples.
+        :param term_scorer: TermScorer or None. Scorer of the terms. None uses a TermScorer without document frequencies (i.e. sublinear term frequency).
+        :param aggregate_lemmas: bool. Whether to group inflected variants of a term under their lemma ( see TermIndex ). Variants then share one count, score and record. The idf of a lemma is computed from the document frequencies of its variants and of the lemma itself, since the document frequency tables count surface forms.
         '''
         
-        #Score given to terms. TODO: change this to tfidf or other score.
-        SCORE=1.0
+        self.term_records=[]
         
         if not terms_lemmas:
             print( "List of terms and lemmas is empty. Not adding any TOKEN_TYPE annotations to the cas." )
@@ -141,21 +168,14 @@ class AnnotationAdder():
         if not hasattr( self, 'cas' ):
             raise AttributeError( "AnnotationAdder should contain 'cas' attribute. Please create 'cas' attribute from text via the self.create_cas_from_text method(text), before using the self.add_sentence_annotation() method" )
             
-        token_type=self._typesystem.get_type(  self._config[ 'Annotation' ][ 'TOKEN_TYPE' ] )
+        if term_scorer is None:
+            term_scorer=TermScorer()
             
-        #make terms_lemmas list unique (on term.lower() key)
-        terms_lemmas_unique=[]
-        terms_unique=set()
-        for term_lemma in terms_lemmas:
-            if term_lemma[0].lower() not in terms_unique:
-                terms_lemmas_unique.append( term_lemma )
-                terms_unique.add( term_lemma[0].lower() )
-        
-        #make automaton
-        A=ahc.Automaton()
-        for term_lemma in terms_lemmas_unique:
-            A.add_word( term_lemma[0].lower(), ( SCORE, term_lemma[1].lower(), term_lemma[0].lower()  ) )
-        A.make_automaton()
+        #make terms_lemmas list unique (on term.lower() key), and group the terms under their lemma if aggregate_lemmas
+        term_index=TermIndex( terms_lemmas, aggregate_lemmas=aggregate_lemmas )
+        
+        #make automaton (one entry per unique term)
+        A=term_index.make_automaton()
         
         sentences=self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).select( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] )
         if not sentences:
@@ -163,17 +183,84 @@ class AnnotationAdder():
             self.add_sentence_annotation()
             sentences=self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).select( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] )
         
-        #add token type annotation at correct location using automaton
-        for sentence in sentences:
-            text=sentence.get_covered_text().lower()
-            for end_index, ( score, lemma, term ) in A.iter( text ):
-                if not term:
-                    continue
-                start_index = end_index - (len(term) - 1)
-                #check if detected term in text is not part of other token via is_token
-                if is_token( start_index, end_index, text ):
-                    self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( \
-                     token_type( begin=sentence.begin+start_index, end=sentence.begin+end_index+1, score=SCORE, lemma=lemma, term=term ) )
+        #find the occurrences of the terms using the automaton
+        occurrences=[]
+        with instrumentation.stage( 'term_matching' ):
+            for sentence in sentences:
+                text=sentence.get_covered_text().lower()
+                for start_index, end_index, index in find_terms( A, text ):
+                    occurrences.append( ( sentence.begin+start_index, sentence.begin+end_index+1, index ) )
+        
+        self._add_scored_token_annotations( term_index, occurrences, term_scorer )
+        
+        
+    def add_token_annotation_occurrences( self, term_occurrences:TermOccurrences, term_scorer:Optional[ TermScorer ]=None, aggregate_lemmas:bool=False ):
+        
+        '''
+        Add token annotations ( self._config[ 'Annotation' ][ 'TOKEN_TYPE' ] ) to self.cas at the offsets found by the TermExtractor ( see TermExtractor.get_term_occurrences_ner ), instead of searching the terms in the sentences ( see self.add_token_annotation ). Scores and self.term_records are computed as in self.add_token_annotation, from the number of occurrences.
+
+        :param term_occurrences: TermOccurrences. Occurrences of the terms, the sentence indices refer to the SENTENCE_TYPE annotations of self.cas.
+        :param term_scorer: TermScorer or None. Scorer of the terms. None uses a TermScorer without document frequencies (i.e. sublinear term frequency).
+        :param aggregate_lemmas: bool. Whether to group inflected variants of a term under their lemma ( see TermIndex ).
+        '''
+        
+        self.term_records=[]
+        
+        if not len( term_occurrences ):
+            print( "List of term occurrences is empty. Not adding any TOKEN_TYPE annotations to the cas." )
+            return
+        
+        if not hasattr( self, 'cas' ):
+            raise AttributeError( "AnnotationAdder should contain 'cas' attribute. Please create 'cas' attribute from text via the self.create_cas_from_text method(text), before using the self.add_sentence_annotation() method" )
+            
+        if term_scorer is None:
+            term_scorer=TermScorer()
+            
+        term_index=TermIndex( term_occurrences.get_terms_lemmas(), aggregate_lemmas=aggregate_lemmas )
+        
+        sentences=self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).select( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] )
+        if not sentences:
+            print( "self.cas does not contain sentences ( SENTENCE_TYPE ). Adding sentence annotations via the .add_sentence_annotation() method." )
+            self.add_sentence_annotation()
+            sentences=self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).select( self._config[ 'Annotation' ][ 'SENTENCE_TYPE' ] )
+        
+        #map the terms of term_occurrences to the variants of the term_index (terms are lowercased by the TermIndex)
+        variant_indices={ variant: index for index, variant in enumerate( term_index.variants ) }
+        term_variants=[ variant_indices[ term.lower() ] for term in term_occurrences.terms ]
+        
+        occurrences=[ ( sentences[ sentence ].begin+begin, sentences[ sentence ].begin+end, term_variants[ index ] ) \
+                     for sentence, begin, end, index in zip( term_occurrences.sentences, term_occurrences.begins, term_occurrences.ends, term_occurrences.term_indices ) ]
+        
+        self._add_scored_token_annotations( term_index, occurrences, term_scorer )
+        
+        
+    def _add_scored_token_annotations( self, term_index:TermIndex, occurrences:List[ Tuple[ int, int, int ] ], term_scorer:TermScorer ):
+        
+        '''
+        :param term_index: TermIndex.
+        :param occurrences: List of ( begin, end, index of the variant in term_index ) Tuples.
+        :param term_scorer: TermScorer.
+        '''
+        
+        token_type=self._typesystem.get_type(  self._config[ 'Annotation' ][ 'TOKEN_TYPE' ] )
+        
+        #score all terms at once, using the number of occurrences of the terms in the document as term frequency
+        with instrumentation.stage( 'term_scoring' ):
+            term_frequencies=term_index.count( [ occurrence[2] for occurrence in occurrences ] )
+            if term_index.aggregate_lemmas:
+                #the document frequency tables count surface forms: the lemmas are scored via their variants (and the lemma itself)
+                variants=term_index.variants+term_index.keys
+                variant_keys=np.concatenate( [ term_index.variant_keys, np.arange( len( term_index.keys ) ) ] )
+                scores=term_scorer.score( term_index.keys, term_frequencies, variants=variants, variant_terms=variant_keys )
+            else:
+                scores=term_scorer.score( term_index.keys, term_frequencies )
+            self.term_records=term_index.get_records( term_frequencies, scores )
+        
+        #add token type annotation at correct location
+        with instrumentation.stage( 'token_annotation' ):
+            for begin, end, index in occurrences:
+                self.cas.get_view( self._config[ 'Annotation' ][ 'SOFA_ID' ] ).add_annotation( \
+                 token_type( begin=begin, end=end, score=float( scores[ term_index.variant_keys[ index ] ] ), lemma=term_index.variant_lemmas[ index ], term=term_index.variants[ index ] ) )
                     
                     
     def add_named_entity_annotation( self, named_entities_sentences: List[ List[ Named_entity ] ] ):
@@ -200,18 +287,19 @@ class AnnotationAdder():
         #sanity check: for every annotated sentence, there should be a list of named entities provided.
         assert len( sentences ) ==len( named_entities_sentences ), "For every sentence (annotated via SENTENCE_TYPE) there should be exactly one list of detected named entities provided ( List[Named_entity])"
         
-        for sentence, named_entities_sentence in zip( sentences, named_entities_sentences ):
+        with instrumentation.stage( 'named_entity_annotation' ):
+            for sentence, named_entities_sentence in zip( sentences, named_entities_sentences ):
             
-            #for some sentences, it could be that no named_entities are found. I.e. List[Named_entity] is [].
-            if not named_entities_sentence:
-                continue
+                #for some sentences, it could be that no named_entities are found. I.e. List[Named_entity] is [].
+                if not named_entities_sentence:
+                    continue
                 
-            for named_entity in named_entities_sentence:
-                self.cas.get_view(self._config[ 'Annotation' ][ 'SOFA_ID' ]  ).add_annotation( \
-                 ner_type( begin=sentence.begin+named_entity[2], \
-                           end=sentence.begin+named_entity[3],\
-                           value=named_entity[0],\
-                           label=named_entity[1] ) )
+                for named_entity in named_entities_sentence:
+                    self.cas.get_view(self._config[ 'Annotation' ][ 'SOFA_ID' ]  ).add_annotation( \
+                     ner_type( begin=sentence.begin+named_entity[2], \
+                               end=sentence.begin+named_entity[3],\
+                               value=named_entity[0],\
+                               label=named_entity[1] ) )
                 
                 
     def merge_annotation( self, label='contact', root_type:str='PARAGRAPH_TYPE', merge_type:str='CONTACT_PARAGRAPH_TYPE'   ):
@@ -327,6 +415,8 @@ def get_sentences_index( text:str )->List[ Tuple[ int, int ] ]:
     '''
     Helper function to find offsets of the sentences in a string (sentences are considered strings split via "\n")
     
+    Reference implementation of segmentation.iter_sentence_offsets, which is used by the AnnotationAdder (see tests/test_segmentation.py).
+    
     :param text: String. String, for instance results of tika parser.
     :return: List[ Tuple[ int, int ] ]. List with offsets of the sentences
     '''
@@ -358,6 +448,8 @@ def get_paragraphs_index( text:str )->List[ Tuple[ int, int ] ]:
     '''
     Helper function to find offsets of the paragraphs in a string ( consecutive sentences (obtained via text.split("\n") ) for which sentence.strip() is not None are considered paragraphs.
     
+    Reference implementation of segmentation.iter_paragraph_offsets, which is used by the AnnotationAdder (see tests/test_segmentation.py).
+    
     :param text: String. String, for instance results of tika parser.
     :return: List[ Tuple[ int, int ] ]. List with offsets of the paragraphs.
     '''
@@ -394,6 +486,8 @@ def get_paragraphs_index_trafilatura( text:str )-> List[ Tuple[ int,int ] ]:
     '''
     Helper function to find offsets of the paragraphs in the json['text'] generated by trafilatura library. Paragraphs are obtained using text.split( "\n" ). If two consecutive paragraps are prepended by "- " they are considered belonging to the same paragraph by trafilatura library (i.e. they indicate an enumeration, or list in the trafilatura library, so we want them in the same paragraph).
     
+    Reference implementation of segmentation.iter_paragraph_offsets_trafilatura, which is used by the AnnotationAdder (see tests/test_segmentation.py).
+    
     :param text: String. String, for instance results of tika parser.
     :return: List[ Tuple[ int, int ] ]. List with offsets of the paragraphs.
     '''
@@ -0,0 +1,207 @@
+'''
+Segmentation of a text in sentences and paragraphs. The offsets are yielded lazily by compiled regular expressions over the original string, without splitting the text in lines.
+
+The offsets are identical to the ones of the split based helpers get_sentences_index, get_paragraphs_index and get_paragraphs_index_trafilatura in annotations.py (see tests/test_segmentation.py).
+
+Sentences can be segmented in three modes (see iter_sentence_offsets_mode): every line is a sentence ('newline'), lines are split at sentence ends by rules ('rules'), or lines are split by the spaCy sentencizer ('sentencizer'). Line breaks are sentence boundaries in all modes.
+'''
+
+from typing import Iterator, Tuple
+import re
+from functools import lru_cache
+
+#a line with at least one non-whitespace character. Group 1 spans the line without leading and trailing whitespace.
+SENTENCE_PATTERN=re.compile( r"^[^\S\n]*(\S(?:[^\n]*\S)?)", re.MULTILINE )
+
+#consecutive lines with at least one non-whitespace character, without the "\n" after the last line
+PARAGRAPH_PATTERN=re.compile( r"^[^\n]*\S[^\n]*(?:\n[^\n]*\S[^\n]*)*", re.MULTILINE )
+
+#sentence-ending punctuation, optionally followed by closing quotes or brackets (group 1), followed by whitespace. The whitespace is not part of a sentence.
+SENTENCE_END_PATTERN=re.compile( r"([.!?]+[\"'’”»)\]]*)[^\S\n]+(?=\S)" )
+
+#abbreviations (lowercased, without the final period) after which a period does not end a sentence (en, nl, de, fr)
+ABBREVIATIONS={ 'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'vs', 'etc', 'nr', 'fig', 'approx', 'dept', 'inc', 'ltd', 'jr', 'sr',
+                'vb', 'bv', 'dhr', 'mevr', 'mw', 'ca', 'zgn', 'bijv', 'resp', 'evt', 'incl', 'excl', 'tel', 'blz', 'pag',
+                'bzw', 'usw', 'ggf', 'vgl', 'str', 'mme', 'mlle', 'cf' }
+
+#trafilatura paragraphs: a list (consecutive lines starting with "- ", empty lines in between are part of the list) or another non-empty line. A list followed by another line includes the newlines up to the "\n" preceding that line.
+TRAFILATURA_PARAGRAPH_PATTERN=re.compile( r"^(?:- [^\n]*(?:\n+- [^\n]*)*(?:\n*(?=\n[^\n]))?|(?!- )[^\n]+)", re.MULTILINE )
+
+
+def iter_sentence_offsets( text:str )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of the sentences (lines that are not empty or whitespace only), without leading and trailing whitespace.
+
+    :param text: String. String, for instance results of tika parser.
+    :return: Iterator of ( begin, end ) Tuples.
+    '''
+
+    for match in SENTENCE_PATTERN.finditer( text ):
+        yield match.span( 1 )
+
+
+def iter_sentence_offsets_rules( text:str )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of the sentences, splitting every line (see iter_sentence_offsets) after sentence-ending punctuation (".", "!", "?", optionally followed by closing quotes or brackets) followed by whitespace, unless the next word starts with a lowercase letter or the punctuation ends an abbreviation (e.g. "e.g.", "Dr.") or an initial (e.g. "J."). Runs in linear time.
+
+    :param text: String.
+    :return: Iterator of ( begin, end ) Tuples, without leading and trailing whitespace.
+    '''
+
+    for line_begin, line_end in iter_sentence_offsets( text ):
+        begin=line_begin
+        for match in SENTENCE_END_PATTERN.finditer( text, line_begin, line_end ):
+            end, next_begin=match.end( 1 ), match.end()
+            if text[ next_begin ].islower() or ( text[ match.start() ] == '.' and _ends_with_abbreviation( text, begin, match.start() ) ):
+                continue
+            yield ( begin, end )
+            begin=next_begin
+        yield ( begin, line_end )
+
+
+def iter_sentence_offsets_sentencizer( text:str, batch_size:int=1000 )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of the sentences, splitting every line (see iter_sentence_offsets) with the rule based spaCy sentencizer (punctuation based, language independent).
+
+    :param text: String.
+    :param batch_size: int. Number of lines processed by spaCy at once.
+    :return: Iterator of ( begin, end ) Tuples, without leading and trailing whitespace.
+    '''
+
+    nlp=load_sentencizer()
+    lines=iter_sentence_offsets( text )
+    while True:
+        batch=[ line for line, _ in zip( lines, range( batch_size ) ) ]
+        if not batch:
+            return
+        for ( line_begin, line_end ), doc in zip( batch, nlp.pipe( text[ line_begin:line_end ] for line_begin, line_end in batch ) ):
+            for sentence in doc.sents:
+                #spaCy sentences can start or end with whitespace tokens
+                sentence_text=sentence.text
+                if not sentence_text.strip():
+                    continue
+                begin=line_begin+sentence.start_char+( len( sentence_text )-len( sentence_text.lstrip() ) )
+                end=line_begin+sentence.end_char-( len( sentence_text )-len( sentence_text.rstrip() ) )
+                yield ( begin, end )
+
+
+SENTENCE_SEGMENTATION_MODES={
+    'newline': iter_sentence_offsets,
+    'rules': iter_sentence_offsets_rules,
+    'sentencizer': iter_sentence_offsets_sentencizer,
+}
+
+
+def iter_sentence_offsets_mode( text:str, mode:str='newline' )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    :param text: String.
+    :param mode: String. Sentence segmentation mode, one of SENTENCE_SEGMENTATION_MODES ('newline', 'rules' or 'sentencizer').
+    :return: Iterator of ( begin, end ) Tuples.
+    '''
+
+    if mode not in SENTENCE_SEGMENTATION_MODES:
+        raise ValueError( f"Sentence segmentation mode should be one of {list( SENTENCE_SEGMENTATION_MODES )}, but received '{mode}'." )
+
+    return SENTENCE_SEGMENTATION_MODES[ mode ]( text )
+
+
+@lru_cache( maxsize=None )
+def load_sentencizer():
+
+    '''
+    Loads a blank multi-language spaCy pipeline with a sentencizer, once per process.
+    '''
+
+    import spacy
+
+    nlp=spacy.blank( 'xx' )
+    try:
+        #spaCy >= 3
+        nlp.add_pipe( 'sentencizer' )
+    except ValueError:
+        nlp.add_pipe( nlp.create_pipe( 'sentencizer' ) )
+    return nlp
+
+
+def _ends_with_abbreviation( text:str, begin:int, end:int )->bool:
+
+    #the word preceding the sentence-ending punctuation at text[ end ]
+    word_begin=end
+    while word_begin > begin and not text[ word_begin-1 ].isspace():
+        word_begin-=1
+    word=text[ word_begin:end ].lower().lstrip( "([\"'‘“«" )
+    #initials ("J."), abbreviations containing periods ("e.g.") and known abbreviations
+    return len( word ) == 1 and word.isalpha() or "." in word or word in ABBREVIATIONS
+
+
+def iter_paragraph_offsets( text:str )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of the paragraphs: consecutive lines that are not empty or whitespace only. A paragraph starts at the beginning of its first line and ends at the end of its last line (i.e. leading whitespace of the first line and trailing whitespace of the last line are included).
+
+    :param text: String. String, for instance results of tika parser.
+    :return: Iterator of ( begin, end ) Tuples.
+    '''
+
+    for match in PARAGRAPH_PATTERN.finditer( text ):
+        yield match.span()
+
+
+def iter_paragraph_offsets_trafilatura( text:str )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of the paragraphs in the json['text'] generated by trafilatura library. Every non-empty line is a paragraph, except consecutive lines starting with "- " (a list in trafilatura), which form one paragraph. As in get_paragraphs_index_trafilatura, empty lines do not end a list, and a list followed by another line ends at the "\n" preceding that line.
+
+    :param text: String. Text extracted by trafilatura.
+    :return: Iterator of ( begin, end ) Tuples.
+    '''
+
+    #trailing newlines are ignored (instead of copying text.rstrip( "\n" ))
+    endpos=len( text )
+    while endpos > 0 and text[ endpos-1 ] == "\n":
+        endpos-=1
+
+    for match in TRAFILATURA_PARAGRAPH_PATTERN.finditer( text, 0, endpos ):
+        yield match.span()
+
+
+def iter_chunk_offsets( text:str, max_chunk_chars:int=100000 )->Iterator[ Tuple[ int, int ] ]:
+
+    '''
+    Offsets of paragraph-aligned chunks of the text, for windowed processing of very long documents. Consecutive paragraphs (see iter_paragraph_offsets) are grouped in chunks of at most max_chunk_chars characters. A paragraph longer than max_chunk_chars is split at line breaks (a single line longer than max_chunk_chars is a chunk on its own). Chunks start and end at line boundaries, so every sentence (in all sentence segmentation modes) falls in exactly one chunk.
+
+    :param text: String.
+    :param max_chunk_chars: int. Maximum number of characters of a chunk.
+    :return: Iterator of ( begin, end ) Tuples.
+    '''
+
+    if max_chunk_chars < 1:
+        raise ValueError( f"max_chunk_chars should be >=1, but received {max_chunk_chars}." )
+
+    chunk_begin=None
+    chunk_end=None
+    for begin, end in iter_paragraph_offsets( text ):
+        if chunk_begin is not None and end-chunk_begin <= max_chunk_chars:
+            chunk_end=end
+            continue
+        if chunk_begin is not None:
+            yield ( chunk_begin, chunk_end )
+            chunk_begin=None
+        #split paragraphs that are too long at line breaks
+        while end-begin > max_chunk_chars:
+            split=text.rfind( "\n", begin, begin+max_chunk_chars+1 )
+            if split <= begin:
+                split=text.find( "\n", begin+max_chunk_chars, end )
+                if split == -1:
+                    break
+            yield ( begin, split )
+            begin=split+1
+        chunk_begin, chunk_end=begin, end
+
+    if chunk_begin is not None:
+        yield ( chunk_begin, chunk_end )
+
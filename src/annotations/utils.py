@@ -1,4 +1,6 @@
-from typing import List
+from typing import Iterator, List, Tuple
+
+import ahocorasick as ahc
 
 def is_token(start_index:int, end_index:int, text:str, special_characters:List[str]=[ "-","_","+"]) -> bool:
     
@@ -48,4 +50,38 @@ def is_token(start_index:int, end_index:int, text:str, special_characters:List[s
         or (text[end_index+1].isalpha() or text[end_index+1] in special_characters ):
             return False
         
-    return True
\ No newline at end of file
+    return True
+
+def make_term_automaton( terms:List[str] )->ahc.Automaton:
+
+    '''
+    Builds an Aho-Corasick automaton for the (lowercased) terms. The value of a term in the automaton is ( index of the term in terms, term ).
+
+    :param terms: List of str. Unique, lowercased terms.
+    :return: ahocorasick.Automaton.
+    '''
+
+    A=ahc.Automaton()
+    for index, term in enumerate( terms ):
+        A.add_word( term, ( index, term ) )
+    A.make_automaton()
+    return A
+
+
+def find_terms( automaton:ahc.Automaton, text:str )->Iterator[ Tuple[ int, int, int ] ]:
+
+    '''
+    Finds the occurrences of the terms of the automaton (see make_term_automaton) in the (lowercased) text, that are not part of other tokens (see is_token).
+
+    :param automaton: ahocorasick.Automaton.
+    :param text: str. Lowercased text.
+    :return: Iterator of ( start_index, end_index, index of the term ) Tuples. end_index is inclusive.
+    '''
+
+    for end_index, ( index, term ) in automaton.iter( text ):
+        if not term:
+            continue
+        start_index = end_index - (len(term) - 1)
+        #check if detected term in text is not part of other token via is_token
+        if is_token( start_index, end_index, text ):
+            yield start_index, end_index, index
@@ -1,11 +1,24 @@
 import tempfile
+from functools import lru_cache
 
 from pathlib import Path
-import tika
 
-tika.initVM()
-
-from tika import parser
+@lru_cache( maxsize=None )
+def get_tika_parser():
+    
+    '''
+    Initializes tika (tika.initVM) and imports its parser on first use, instead of at import of this module.
+    
+    :return: tika.parser module.
+    '''
+    
+    import tika
+    
+    tika.initVM()
+    
+    from tika import parser
+    
+    return parser
 
 def get_text_tika( html:str )->str:
 
@@ -27,7 +40,7 @@ def get_text_tika( html:str )->str:
     return text
 
 def tikaToText(path_file ):
-    parsed = parser.from_file(path_file)
+    parsed = get_tika_parser().from_file(path_file)
     content = parsed["content"]
     if content:
         return content.strip()
\ No newline at end of file
@@ -0,0 +1,162 @@
+'''
+Registry of the heavy components of the service (spaCy models, classifiers, question generator...). A component is imported and loaded on first use, or by a warm-up (optionally in a background thread), so the service can start serving the endpoints that do not need it right away. The import and load time of every component is recorded for the startup report.
+'''
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import asyncio
+import importlib
+import threading
+import time
+import traceback
+
+
+class _Component():
+
+    __slots__=( 'name', 'loader', 'imports', 'value', 'status', 'import_seconds', 'load_seconds', 'error', 'lock' )
+
+    def __init__( self, name:str, loader:Callable[ [], Any ], imports:Sequence[ str ] ):
+
+        self.name=name
+        self.loader=loader
+        self.imports=list( imports )
+        self.value=None
+        #'pending', 'loading', 'loaded' or 'failed'
+        self.status='pending'
+        self.import_seconds=None
+        self.load_seconds=None
+        self.error=None
+        self.lock=threading.Lock()
+
+
+class ComponentRegistry():
+
+    '''
+    Components are registered with a loader (a function without arguments returning the component) and the modules it imports. get( name ) imports the modules, calls the loader once (thread-safe) and returns the component.
+    '''
+
+    def __init__( self ):
+
+        self._components={}
+
+    def register( self, name:str, loader:Callable[ [], Any ], imports:Sequence[ str ]=() ):
+
+        '''
+        :param name: str. Name of the component.
+        :param loader: Callable. Function without arguments returning the component. It can get other components via self.get.
+        :param imports: Sequence of str. Modules imported before the loader is called (their import time is reported separately).
+        '''
+
+        if name in self._components:
+            raise ValueError( f"Component '{name}' is already registered." )
+        self._components[ name ]=_Component( name, loader, imports )
+
+    @property
+    def names( self )->List[ str ]:
+
+        return list( self._components )
+
+    def is_loaded( self, name:str )->bool:
+
+        return self._get_component( name ).status == 'loaded'
+
+    def get( self, name:str )->Any:
+
+        '''
+        Returns the component, importing and loading it first if needed. If the component is being loaded by another thread (e.g. the warm-up), waits until it is loaded. If loading failed, loading is tried again.
+
+        :param name: str.
+        :return: The component.
+        '''
+
+        component=self._get_component( name )
+        if component.status == 'loaded':
+            return component.value
+
+        with component.lock:
+            if component.status == 'loaded':
+                return component.value
+
+            component.status='loading'
+            component.error=None
+            try:
+                start=time.perf_counter()
+                for module in component.imports:
+                    importlib.import_module( module )
+                component.import_seconds=time.perf_counter()-start
+
+                start=time.perf_counter()
+                component.value=component.loader()
+                component.load_seconds=time.perf_counter()-start
+            except Exception as e:
+                component.status='failed'
+                component.error=f"{type( e ).__name__}: {e}"
+                raise
+            component.status='loaded'
+            return component.value
+
+    async def get_async( self, name:str )->Any:
+
+        '''
+        Awaitable version of self.get, for the (async) endpoints: a component that is not loaded yet is loaded (or waited for) in a thread of the default executor, so the event loop keeps serving other requests.
+        '''
+
+        component=self._get_component( name )
+        if component.status == 'loaded':
+            return component.value
+        return await asyncio.get_event_loop().run_in_executor( None, self.get, name )
+
+    def warm_up( self, names:Optional[ Sequence[ str ] ]=None, background:bool=True, on_done:Optional[ Callable[ [], None ] ]=None )->Optional[ threading.Thread ]:
+
+        '''
+        Loads components in the given order. A component that fails to load is reported (see self.report), the warm-up continues with the next one.
+
+        :param names: Sequence of str or None. Components to load, None loads all registered components.
+        :param background: bool. Whether to load the components in a (daemon) background thread.
+        :param on_done: Callable or None. Called when all components are loaded, e.g. to print the startup report.
+        :return: threading.Thread or None. The background thread.
+        '''
+
+        names=list( self._components ) if names is None else list( names )
+        for name in names:
+            self._get_component( name )
+
+        def run():
+            for name in names:
+                try:
+                    self.get( name )
+                except Exception:
+                    print( f"Could not load component '{name}':\n{traceback.format_exc()}" )
+            if on_done is not None:
+                on_done()
+
+        if not background:
+            run()
+            return None
+
+        thread=threading.Thread( target=run, name='component-warm-up', daemon=True )
+        thread.start()
+        return thread
+
+    def report( self )->List[ Dict[ str, Any ] ]:
+
+        '''
+        :return: List of Dict. Status, import time and load time (seconds) of every component.
+        '''
+
+        return [ { 'name': component.name, 'status': component.status, 'import_seconds': component.import_seconds,
+                   'load_seconds': component.load_seconds, 'error': component.error } for component in self._components.values() ]
+
+    def format_report( self )->str:
+
+        lines=[ f"{'component':<24}{'status':<10}{'import (s)':>12}{'load (s)':>12}" ]
+        for record in self.report():
+            import_seconds='' if record[ 'import_seconds' ] is None else f"{record[ 'import_seconds' ]:.2f}"
+            load_seconds='' if record[ 'load_seconds' ] is None else f"{record[ 'load_seconds' ]:.2f}"
+            lines.append( f"{record[ 'name' ]:<24}{record[ 'status' ]:<10}{import_seconds:>12}{load_seconds:>12}" )
+        return "\n".join( lines )
+
+    def _get_component( self, name:str )->_Component:
+
+        if name not in self._components:
+            raise KeyError( f"Unknown component '{name}'. Registered components are {list( self._components )}." )
+        return self._components[ name ]
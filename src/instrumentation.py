@@ -0,0 +1,280 @@
+'''
+Lightweight instrumentation of the pipelines: stage timers, counters and per-request records.
+
+with stage( 'spacy_parse' ):
+    ...
+
+The duration of every stage is added to a histogram (stage_duration_seconds) and to the record of the current request (see instrumented), which is logged as one JSON line per request. Counters (documents, sentences, terms, bytes in/out) are increased via count. render_metrics returns the histograms and counters in the Prometheus text format (served by the /metrics endpoint of app.py).
+
+Instrumentation is disabled by default (see configure_instrumentation): stage then returns a shared no-op context manager, and count and the instrumented endpoints return immediately, so the overhead is one function call and one check per stage.
+
+The metrics are kept per process, i.e. every uvicorn worker exports its own metrics.
+'''
+
+from typing import Callable, Dict, Mapping, Optional, Tuple, Union
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+
+#upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS=( 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0 )
+
+_ENABLED=False
+_LOG_REQUESTS=True
+_BUCKETS=DEFAULT_BUCKETS
+
+logger=logging.getLogger( 'instrumentation' )
+
+#record of the request handled by the current task (see instrumented), None outside requests
+_REQUEST=contextvars.ContextVar( 'instrumentation_request', default=None )
+
+_LOCK=threading.Lock()
+#( name, labels ) -> [ bucket counts, sum, count ]
+_HISTOGRAMS={}
+#( name, labels ) -> value
+_COUNTERS={}
+
+Labels=Tuple[ Tuple[ str, str ], ... ]
+
+
+def configure_instrumentation( settings:Mapping[ str, str ] ):
+
+    '''
+    :param settings: Mapping (e.g. the 'Instrumentation' section of the config file) with keys ENABLED (bool), LOG_REQUESTS (bool, log one JSON line with the stage timings per request) and BUCKETS (comma separated upper bounds of the histogram buckets in seconds, empty for DEFAULT_BUCKETS).
+    '''
+
+    global _ENABLED, _LOG_REQUESTS, _BUCKETS
+
+    _ENABLED=_parse_bool( settings.get( 'ENABLED', 'false' ) )
+    _LOG_REQUESTS=_parse_bool( settings.get( 'LOG_REQUESTS', 'true' ) )
+
+    buckets=settings.get( 'BUCKETS', '' ).strip()
+    if buckets:
+        buckets=tuple( sorted( float( bucket ) for bucket in buckets.split( ',' ) ) )
+        if any( bucket <= 0 for bucket in buckets ):
+            raise ValueError( f"BUCKETS should be > 0, but received {settings.get( 'BUCKETS' )}." )
+        _BUCKETS=buckets
+    else:
+        _BUCKETS=DEFAULT_BUCKETS
+
+    if _ENABLED and _LOG_REQUESTS and not logger.handlers:
+        handler=logging.StreamHandler()
+        handler.setFormatter( logging.Formatter( '%(message)s' ) )
+        logger.addHandler( handler )
+        logger.setLevel( logging.INFO )
+        logger.propagate=False
+
+
+def is_enabled()->bool:
+
+    return _ENABLED
+
+
+class _NullStage():
+
+    __slots__=()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc_info ):
+        return False
+
+
+_NULL_STAGE=_NullStage()
+
+
+class _Stage():
+
+    __slots__=( 'name', 'start' )
+
+    def __init__( self, name:str ):
+        self.name=name
+
+    def __enter__( self ):
+        self.start=time.perf_counter()
+        return self
+
+    def __exit__( self, *exc_info ):
+        seconds=time.perf_counter()-self.start
+        observe( 'stage_duration_seconds', seconds, stage=self.name )
+        record=_REQUEST.get()
+        if record is not None:
+            record[ 'stages_ms' ][ self.name ]=record[ 'stages_ms' ].get( self.name, 0.0 )+seconds*1000
+        return False
+
+
+def stage( name:str )->Union[ _Stage, _NullStage ]:
+
+    '''
+    Context manager timing a stage of a pipeline.
+
+    :param name: str. Name of the stage.
+    '''
+
+    if not _ENABLED:
+        return _NULL_STAGE
+    return _Stage( name )
+
+
+def count( name:str, value:Union[ int, float ]=1, **labels:str ):
+
+    '''
+    Increases a counter. Within a request (see instrumented), the count is added to the record of the request, and to the counter labeled with the endpoint of the request when the request ends.
+
+    :param name: str. Name of the counter, e.g. 'sentences_total'.
+    :param value: int or float.
+    :param labels: str. Labels of the counter (outside requests).
+    '''
+
+    if not _ENABLED:
+        return
+
+    record=_REQUEST.get()
+    if record is not None:
+        record[ 'counts' ][ name ]=record[ 'counts' ].get( name, 0 )+value
+    else:
+        _increase( name, value, labels )
+
+
+def _increase( name:str, value:Union[ int, float ], labels:Mapping[ str, str ] ):
+
+    key=( name, tuple( sorted( labels.items() ) ) )
+    with _LOCK:
+        _COUNTERS[ key ]=_COUNTERS.get( key, 0 )+value
+
+
+def observe( name:str, seconds:float, **labels:str ):
+
+    '''
+    Adds a duration to a histogram.
+
+    :param name: str. Name of the histogram, e.g. 'request_duration_seconds'.
+    :param seconds: float.
+    :param labels: str. Labels of the histogram.
+    '''
+
+    if not _ENABLED:
+        return
+
+    key=( name, tuple( sorted( labels.items() ) ) )
+    with _LOCK:
+        histogram=_HISTOGRAMS.get( key )
+        if histogram is None:
+            histogram=_HISTOGRAMS[ key ]=[ [ 0 ]*len( _BUCKETS ), 0.0, 0 ]
+        for i, bucket in enumerate( _BUCKETS ):
+            if seconds <= bucket:
+                histogram[ 0 ][ i ]+=1
+        histogram[ 1 ]+=seconds
+        histogram[ 2 ]+=1
+
+
+def instrumented( endpoint:str )->Callable:
+
+    '''
+    Decorator of an (async) endpoint: times the request (request_duration_seconds), counts it (requests_total, labeled with the endpoint and the status 'ok' or 'error') and collects the stage timings and counts of the request, logged as one JSON line.
+
+    :param endpoint: str. Label of the endpoint, e.g. '/extract_terms'.
+    '''
+
+    def decorator( function ):
+
+        @functools.wraps( function )
+        async def wrapper( *args, **kwargs ):
+            if not _ENABLED:
+                return await function( *args, **kwargs )
+
+            record={ 'endpoint': endpoint, 'stages_ms': {}, 'counts': {} }
+            token=_REQUEST.set( record )
+            start=time.perf_counter()
+            status='ok'
+            try:
+                return await function( *args, **kwargs )
+            except Exception:
+                status='error'
+                raise
+            finally:
+                seconds=time.perf_counter()-start
+                _REQUEST.reset( token )
+                observe( 'request_duration_seconds', seconds, endpoint=endpoint )
+                _increase( 'requests_total', 1, { 'endpoint': endpoint, 'status': status } )
+                for name, value in record[ 'counts' ].items():
+                    _increase( name, value, { 'endpoint': endpoint } )
+                if _LOG_REQUESTS:
+                    record[ 'status' ]=status
+                    record[ 'duration_ms' ]=seconds*1000
+                    logger.info( json.dumps( record ) )
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics()->str:
+
+    '''
+    :return: str. Histograms and counters in the Prometheus text exposition format.
+    '''
+
+    lines=[]
+    with _LOCK:
+        histograms={ key: ( list( buckets ), total, n ) for key, ( buckets, total, n ) in _HISTOGRAMS.items() }
+        counters=dict( _COUNTERS )
+
+    previous=None
+    for ( name, labels ), ( buckets, total, n ) in sorted( histograms.items() ):
+        if name != previous:
+            lines.append( f"# TYPE {name} histogram" )
+            previous=name
+        for bucket, bucket_count in zip( _BUCKETS, buckets ):
+            lines.append( f"{name}_bucket{_format_labels( labels+( ( 'le', repr( bucket ) ), ) )} {bucket_count}" )
+        lines.append( f"{name}_bucket{_format_labels( labels+( ( 'le', '+Inf' ), ) )} {n}" )
+        lines.append( f"{name}_sum{_format_labels( labels )} {total}" )
+        lines.append( f"{name}_count{_format_labels( labels )} {n}" )
+
+    previous=None
+    for ( name, labels ), value in sorted( counters.items() ):
+        if name != previous:
+            lines.append( f"# TYPE {name} counter" )
+            previous=name
+        lines.append( f"{name}{_format_labels( labels )} {value}" )
+
+    return "\n".join( lines )+"\n"
+
+
+def get_request_record()->Optional[ Dict ]:
+
+    '''
+    :return: Dict or None. Record ( stage timings and counts ) of the request handled by the current task.
+    '''
+
+    return _REQUEST.get()
+
+
+def reset_metrics():
+
+    with _LOCK:
+        _HISTOGRAMS.clear()
+        _COUNTERS.clear()
+
+
+def _format_labels( labels:Labels )->str:
+
+    if not labels:
+        return ''
+    escaped=[ ( key, value.replace( '\\', '\\\\' ).replace( '"', '\\"' ).replace( '\n', '\\n' ) ) for key, value in labels ]
+    return "{"+",".join( f'{key}="{value}"' for key, value in escaped )+"}"
+
+
+def _parse_bool( value:Union[ str, bool ] )->bool:
+
+    if isinstance( value, bool ):
+        return value
+    if value.strip().lower() in ( '1', 'true', 'yes', 'on' ):
+        return True
+    if value.strip().lower() in ( '0', 'false', 'no', 'off', '' ):
+        return False
+    raise ValueError( f"Expected a boolean, but received '{value}'." )
@@ -0,0 +1,112 @@
+from typing import Any, Callable, Dict, Optional
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .store import JobStore
+
+
+class JobQueueFullError( Exception ):
+
+    '''
+    Raised when a job is submitted while the JobQueue already holds max_pending unfinished jobs.
+    '''
+
+
+class JobQueue():
+
+    '''
+    Runs long-running jobs (e.g. question generation) on a bounded background executor. Status and results of the jobs are written to a JobStore, where they can be polled with the job id returned by self.submit.
+
+    A job record is a dictionary with keys 'job_id', 'status' ('pending', 'running', 'done' or 'failed'), 'submitted_at', 'finished_at', 'result' and 'error'.
+    '''
+
+    def __init__( self, store:JobStore, max_workers:int=1, max_pending:int=100 ):
+
+        '''
+        :param store: JobStore. Store for the job records.
+        :param max_workers: int. Number of jobs that run concurrently.
+        :param max_pending: int. Maximum number of unfinished (pending or running) jobs. Submitting more jobs raises a JobQueueFullError.
+        '''
+
+        if max_workers < 1:
+            raise ValueError( f"max_workers should be >=1, but received {max_workers}." )
+
+        if max_pending < max_workers:
+            raise ValueError( f"max_pending should be >=max_workers, but received max_pending={max_pending} and max_workers={max_workers}." )
+
+        self._store=store
+        self._max_workers=max_workers
+        self._max_pending=max_pending
+
+        self._lock=threading.Lock()
+        self._n_unfinished=0
+        self._executor=None
+        self._pid=None
+
+    def submit( self, function:Callable[ ..., Any ], *args, **kwargs )->str:
+
+        '''
+        Submit a job. The result of function(*args, **kwargs) should be JSON serializable.
+
+        :param function: Callable. The job.
+        :return: str. Id of the job.
+        '''
+
+        with self._lock:
+            if self._n_unfinished >= self._max_pending:
+                raise JobQueueFullError( f"Job queue is full ({self._max_pending} unfinished jobs). Please try again later." )
+            self._n_unfinished+=1
+            executor=self._get_executor()
+
+        job_id=uuid.uuid4().hex
+        record={ 'job_id': job_id, 'status': 'pending', 'submitted_at': time.time(), 'finished_at': None, 'result': None, 'error': None }
+        self._store.put( job_id, record )
+
+        executor.submit( self._run, record, function, args, kwargs )
+
+        return job_id
+
+    def get( self, job_id:str )->Optional[ Dict[ str, Any ] ]:
+
+        '''
+        :param job_id: str. Id of the job.
+        :return: Dict or None. Record of the job, None if the job is unknown or expired.
+        '''
+
+        return self._store.get( job_id )
+
+    def _get_executor( self )->ThreadPoolExecutor:
+
+        #the executor is created on first use in every process, so a JobQueue created before forking works in the child processes.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor=ThreadPoolExecutor( max_workers=self._max_workers, thread_name_prefix='job_queue' )
+            self._pid=os.getpid()
+            #jobs counted in the parent process do not run in this process, only the job being submitted does
+            self._n_unfinished=1
+        return self._executor
+
+    def _run( self, record:Dict[ str, Any ], function:Callable[ ..., Any ], args, kwargs ):
+
+        try:
+            self._store.put( record[ 'job_id' ], dict( record, status='running' ) )
+            result=function( *args, **kwargs )
+            record=dict( record, status='done', result=result, finished_at=time.time() )
+        except Exception as e:
+            traceback.print_exc()
+            record=dict( record, status='failed', error=f"{type( e ).__name__}: {e}", finished_at=time.time() )
+        finally:
+            #free the slot before the final record is written, so a client that sees the job finished can submit a new one
+            with self._lock:
+                self._n_unfinished-=1
+
+        try:
+            self._store.put( record[ 'job_id' ], record )
+        except Exception as e:
+            #e.g. a result that is not JSON serializable
+            traceback.print_exc()
+            self._store.put( record[ 'job_id' ], dict( record, status='failed', result=None, error=f"Could not store result: {type( e ).__name__}: {e}" ) )
+        self._store.purge_expired()
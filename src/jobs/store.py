@@ -0,0 +1,147 @@
+from typing import Any, Dict, Optional
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class JobStore( ABC ):
+
+    '''
+    Abstract base class for stores of job records (status and results of the jobs of a JobQueue). Records expire ttl_seconds after they were last written.
+    '''
+
+    def __init__( self, ttl_seconds:float=3600 ):
+
+        '''
+        :param ttl_seconds: float. Number of seconds a record is kept after it was last written.
+        '''
+
+        if ttl_seconds <= 0:
+            raise ValueError( f"ttl_seconds should be >0, but received {ttl_seconds}." )
+
+        self._ttl_seconds=ttl_seconds
+
+    @abstractmethod
+    def put( self, job_id:str, record:Dict[ str, Any ] ):
+
+        '''
+        Store (or overwrite) the record of a job.
+
+        :param job_id: str. Id of the job.
+        :param record: Dict. JSON serializable record of the job.
+        '''
+
+    @abstractmethod
+    def get( self, job_id:str )->Optional[ Dict[ str, Any ] ]:
+
+        '''
+        :param job_id: str. Id of the job.
+        :return: Dict or None. Record of the job, None if the job is unknown or its record expired.
+        '''
+
+    @abstractmethod
+    def purge_expired( self ):
+
+        '''
+        Remove all expired records.
+        '''
+
+
+class InMemoryJobStore( JobStore ):
+
+    '''
+    JobStore keeping the records in memory. Records are only visible to the process that created them, so use a DiskJobStore when running several workers.
+    '''
+
+    def __init__( self, ttl_seconds:float=3600 ):
+
+        super().__init__( ttl_seconds )
+        self._records={}
+        self._lock=threading.Lock()
+
+    def put( self, job_id:str, record:Dict[ str, Any ] ):
+
+        with self._lock:
+            self._records[ job_id ]=( time.time()+self._ttl_seconds, record )
+
+    def get( self, job_id:str )->Optional[ Dict[ str, Any ] ]:
+
+        with self._lock:
+            if job_id not in self._records:
+                return None
+            expires_at, record=self._records[ job_id ]
+            if expires_at < time.time():
+                del self._records[ job_id ]
+                return None
+            return record
+
+    def purge_expired( self ):
+
+        now=time.time()
+        with self._lock:
+            for job_id in [ job_id for job_id, ( expires_at, _ ) in self._records.items() if expires_at < now ]:
+                del self._records[ job_id ]
+
+
+class DiskJobStore( JobStore ):
+
+    '''
+    JobStore keeping every record as a JSON file in a directory, so all worker processes (sharing the directory) see the same jobs. The modification time of a file is used for expiry.
+    '''
+
+    JOB_ID_PATTERN=re.compile( "^[A-Za-z0-9_-]+$" )
+
+    def __init__( self, directory:str, ttl_seconds:float=3600 ):
+
+        '''
+        :param directory: str. Directory in which the records are stored. Will be created if it does not exist.
+        :param ttl_seconds: float. Number of seconds a record is kept after it was last written.
+        '''
+
+        super().__init__( ttl_seconds )
+        os.makedirs( directory, exist_ok=True )
+        self._directory=directory
+
+    def put( self, job_id:str, record:Dict[ str, Any ] ):
+
+        #write to a temporary file first and rename it, so readers never see a partially written record
+        with tempfile.NamedTemporaryFile( mode='w', dir=self._directory, suffix='.tmp', delete=False ) as f:
+            json.dump( record, f )
+        os.replace( f.name, self._get_path( job_id ) )
+
+    def get( self, job_id:str )->Optional[ Dict[ str, Any ] ]:
+
+        if not self.JOB_ID_PATTERN.match( job_id ):
+            return None
+
+        path=self._get_path( job_id )
+        try:
+            if os.path.getmtime( path )+self._ttl_seconds < time.time():
+                os.remove( path )
+                return None
+            with open( path ) as f:
+                return json.load( f )
+        except FileNotFoundError:
+            return None
+
+    def purge_expired( self ):
+
+        now=time.time()
+        for filename in os.listdir( self._directory ):
+            path=os.path.join( self._directory, filename )
+            try:
+                if os.path.getmtime( path )+self._ttl_seconds < now:
+                    os.remove( path )
+            except FileNotFoundError:
+                continue
+
+    def _get_path( self, job_id:str )->str:
+
+        #job ids end up in a file path, so only allow safe characters
+        if not self.JOB_ID_PATTERN.match( job_id ):
+            raise KeyError( f"Invalid job id '{job_id}'." )
+        return os.path.join( self._directory, f"{job_id}.json" )
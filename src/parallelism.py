@@ -0,0 +1,98 @@
+from typing import Dict, Mapping, Union
+import os
+import sys
+
+#settings configured via configure_parallelism(), 0 means: keep the library default.
+_SETTINGS={ 'TORCH_NUM_THREADS': 0, 'TORCH_NUM_INTEROP_THREADS': 0, 'OMP_NUM_THREADS': 0, 'MKL_NUM_THREADS': 0, 'SPACY_N_PROCESS': 1 }
+
+#pid of the process in which the torch settings were applied (set_num_interop_threads can only be called once per process)
+_APPLIED_PID=None
+
+
+def configure_parallelism( settings:Mapping[ str, Union[ str, int ] ] ):
+
+    '''
+    Configure the number of threads used by PyTorch, OpenMP and MKL, and the number of processes used by spaCy. Settings equal to 0 are left to the library defaults. OMP_NUM_THREADS and MKL_NUM_THREADS are exported to the environment, so this function should be called before torch (or numpy) is imported. If torch is already imported, the torch settings are applied immediately.
+
+    :param settings: Mapping (e.g. the 'Parallelism' section of the config file) with keys TORCH_NUM_THREADS, TORCH_NUM_INTEROP_THREADS, OMP_NUM_THREADS, MKL_NUM_THREADS and SPACY_N_PROCESS.
+    '''
+
+    for key in _SETTINGS:
+        if key in settings:
+            value=int( settings[ key ] )
+            if value < 0:
+                raise ValueError( f"{key} should be >=0, but received {value}." )
+            _SETTINGS[ key ]=value
+
+    if _SETTINGS[ 'SPACY_N_PROCESS' ] < 1:
+        raise ValueError( f"SPACY_N_PROCESS should be >=1, but received {_SETTINGS[ 'SPACY_N_PROCESS' ]}." )
+
+    for key in [ 'OMP_NUM_THREADS', 'MKL_NUM_THREADS' ]:
+        if _SETTINGS[ key ]:
+            os.environ[ key ]=str( _SETTINGS[ key ] )
+
+    if 'torch' in sys.modules:
+        apply_torch_parallelism()
+
+
+def apply_torch_parallelism()->Dict[ str, Union[ str, int ] ]:
+
+    '''
+    Apply the configured thread settings to PyTorch. Should be called when a model is loaded. The effective settings are printed the first time they are applied in a process.
+
+    :return: Dict. The effective settings.
+    '''
+
+    global _APPLIED_PID
+
+    import torch
+
+    first_time=_APPLIED_PID != os.getpid()
+
+    if _SETTINGS[ 'TORCH_NUM_THREADS' ]:
+        torch.set_num_threads( _SETTINGS[ 'TORCH_NUM_THREADS' ] )
+
+    if _SETTINGS[ 'TORCH_NUM_INTEROP_THREADS' ] and first_time:
+        try:
+            torch.set_num_interop_threads( _SETTINGS[ 'TORCH_NUM_INTEROP_THREADS' ] )
+        except RuntimeError:
+            #raised when inter-op parallel work has already started in this process
+            print( f"Could not set the number of inter-op threads of PyTorch to {_SETTINGS[ 'TORCH_NUM_INTEROP_THREADS' ]}, because PyTorch already started inter-op parallel work." )
+
+    effective_settings=get_effective_settings()
+
+    if first_time:
+        _APPLIED_PID=os.getpid()
+        print( "Parallelism settings (pid {}): {}".format( os.getpid(), ", ".join( f"{key}={value}" for key, value in effective_settings.items() ) ) )
+
+    return effective_settings
+
+
+def get_effective_settings()->Dict[ str, Union[ str, int ] ]:
+
+    '''
+    :return: Dict. Number of threads effectively used by PyTorch (if imported), OpenMP, MKL, and the number of spaCy processes.
+    '''
+
+    effective_settings={}
+
+    if 'torch' in sys.modules:
+        torch=sys.modules[ 'torch' ]
+        effective_settings[ 'torch_num_threads' ]=torch.get_num_threads()
+        effective_settings[ 'torch_num_interop_threads' ]=torch.get_num_interop_threads()
+
+    effective_settings[ 'OMP_NUM_THREADS' ]=os.environ.get( 'OMP_NUM_THREADS', 'default' )
+    effective_settings[ 'MKL_NUM_THREADS' ]=os.environ.get( 'MKL_NUM_THREADS', 'default' )
+    effective_settings[ 'spacy_n_process' ]=_SETTINGS[ 'SPACY_N_PROCESS' ]
+    effective_settings[ 'cpu_count' ]=os.cpu_count()
+
+    return effective_settings
+
+
+def get_spacy_n_process()->int:
+
+    '''
+    :return: int. Number of processes to use for spaCy's nlp.pipe.
+    '''
+
+    return _SETTINGS[ 'SPACY_N_PROCESS' ]
@@ -0,0 +1,275 @@
+'''
+Pre-forking server: the models are loaded once in a master process, which then forks the workers. The workers share the memory pages of the models with the master (copy-on-write) as long as these pages are not written, so every extra worker only costs its unique memory (USS) instead of a full copy of the models.
+
+Pages are written (and copied) when Python objects of the master are touched: reference counts and the garbage collector. gc.freeze is called before forking, so the garbage collector of the workers leaves the objects of the master alone. The weights of the models (torch tensors, numpy arrays of the spaCy vectors) are not Python objects, their pages stay shared. The torch weights can also be moved to shared memory (share_torch_modules), so they stay shared even if they are written.
+
+The workers listen on a socket created by the master (see serve.py for the uvicorn workers).
+'''
+
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+#fields of /proc/<pid>/smaps_rollup (or /proc/<pid>/smaps) in kB
+_MEMORY_FIELDS=( 'Rss', 'Pss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean', 'Shared_Dirty' )
+
+
+def parse_smaps( text:str )->Dict[ str, float ]:
+
+    '''
+    :param text: str. Content of /proc/<pid>/smaps_rollup, or of /proc/<pid>/smaps (the fields of all mappings are summed).
+    :return: Dict. RSS, PSS, USS (private pages) and shared pages, in MB.
+    '''
+
+    kilobytes=dict.fromkeys( _MEMORY_FIELDS, 0 )
+    for line in text.splitlines():
+        field, _, value=line.partition( ':' )
+        if field in kilobytes:
+            kilobytes[ field ]+=int( value.split()[ 0 ] )
+
+    return { 'rss_mb': kilobytes[ 'Rss' ]/1024, 'pss_mb': kilobytes[ 'Pss' ]/1024,
+             'uss_mb': ( kilobytes[ 'Private_Clean' ]+kilobytes[ 'Private_Dirty' ] )/1024,
+             'shared_mb': ( kilobytes[ 'Shared_Clean' ]+kilobytes[ 'Shared_Dirty' ] )/1024 }
+
+
+def get_memory_usage( pid:int )->Optional[ Dict[ str, float ] ]:
+
+    '''
+    :param pid: int.
+    :return: Dict or None. Memory usage of the process (see parse_smaps), None if it is not available (no such process, not Linux).
+    '''
+
+    for name in ( 'smaps_rollup', 'smaps' ):
+        try:
+            with open( f"/proc/{pid}/{name}" ) as f:
+                return parse_smaps( f.read() )
+        except OSError:
+            continue
+    return None
+
+
+def format_memory_report( processes:Mapping[ str, int ] )->str:
+
+    '''
+    :param processes: Mapping of names (e.g. 'master', 'worker 1') to pids.
+    :return: str. Table with the RSS, PSS, USS and shared memory of every process, and the total of the PSS (the memory used by all processes together).
+    '''
+
+    lines=[ f"{'process':<12}{'pid':>8}{'rss (MB)':>12}{'pss (MB)':>12}{'uss (MB)':>12}{'shared (MB)':>14}" ]
+    total_pss=0.0
+    for name, pid in processes.items():
+        usage=get_memory_usage( pid )
+        if usage is None:
+            lines.append( f"{name:<12}{pid:>8}{'n/a':>12}" )
+            continue
+        total_pss+=usage[ 'pss_mb' ]
+        lines.append( f"{name:<12}{pid:>8}{usage[ 'rss_mb' ]:>12.1f}{usage[ 'pss_mb' ]:>12.1f}{usage[ 'uss_mb' ]:>12.1f}{usage[ 'shared_mb' ]:>14.1f}" )
+    lines.append( f"total pss: {total_pss:.1f} MB" )
+    return "\n".join( lines )
+
+
+def share_torch_modules()->int:
+
+    '''
+    Moves the parameters and buffers of all loaded torch modules (on the CPU) to shared memory, so they stay shared by the forked workers even if their pages are written. Needs a /dev/shm large enough for the weights (e.g. docker run --shm-size).
+
+    :return: int. Number of modules, 0 if torch is not imported.
+    '''
+
+    if 'torch' not in sys.modules:
+        return 0
+    torch=sys.modules[ 'torch' ]
+
+    modules=[ obj for obj in gc.get_objects() if isinstance( obj, torch.nn.Module ) ]
+    for module in modules:
+        module.share_memory()
+    return len( modules )
+
+
+def check_fork_safety():
+
+    '''
+    CUDA can not be used in a process forked after CUDA was initialized. Components using the GPU should be loaded by the workers.
+    '''
+
+    torch=sys.modules.get( 'torch' )
+    if torch is not None and torch.cuda.is_initialized():
+        raise RuntimeError( "CUDA was initialized before forking the workers. Do not preload the components that use the GPU, they are then loaded by every worker." )
+
+
+def check_preloaded( components, names:Sequence[ str ] ):
+
+    '''
+    Raises when a preloaded component failed to load, or did not load its model (components with an is_loaded attribute, e.g. BatchedSequenceClassifier): the model would then be loaded, and copied, by every worker instead of being shared.
+
+    :param components: ComponentRegistry.
+    :param names: Sequence of str. Components loaded in the master.
+    '''
+
+    records={ record[ 'name' ]: record for record in components.report() }
+    for name in names:
+        if records[ name ][ 'status' ] != 'loaded':
+            raise RuntimeError( f"Component '{name}' could not be preloaded ({records[ name ][ 'error' ]})." )
+        if not getattr( components.get( name ), 'is_loaded', True ):
+            raise RuntimeError( f"Component '{name}' was preloaded without its model, every worker would load its own copy." )
+
+
+def create_socket( host:str, port:int, backlog:int=2048 )->socket.socket:
+
+    '''
+    :return: socket.socket. Listening socket, shared by the workers.
+    '''
+
+    family=socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock=socket.socket( family, socket.SOCK_STREAM )
+    sock.setsockopt( socket.SOL_SOCKET, socket.SO_REUSEADDR, 1 )
+    sock.bind( ( host, port ) )
+    sock.listen( backlog )
+    sock.set_inheritable( True )
+    return sock
+
+
+class PreforkServer():
+
+    '''
+    Forks the workers, restarts the workers that exit, and stops them on SIGINT or SIGTERM. The memory report (see format_memory_report) of the master and the workers is printed report_delay seconds after the start, and on SIGUSR1.
+    '''
+
+    def __init__( self, target:Callable[ [ socket.socket ], None ], sock:socket.socket, workers:int=2, report_delay:Optional[ float ]=30.0, timeout:float=30.0 ):
+
+        '''
+        :param target: Callable. Run by every worker with the listening socket, e.g. a uvicorn server.
+        :param sock: socket.socket. Listening socket (see create_socket).
+        :param workers: int. Number of workers.
+        :param report_delay: float or None. Seconds after the start of the workers when the memory report is printed, None to only print it on SIGUSR1.
+        :param timeout: float. Seconds the workers get to stop before they are killed.
+        '''
+
+        if workers < 1:
+            raise ValueError( f"workers should be >= 1, but received {workers}." )
+
+        self._target=target
+        self._sock=sock
+        self._workers=workers
+        self._report_delay=report_delay
+        self._timeout=timeout
+        #pid -> number of the worker
+        self._pids={}
+        self._stopping=False
+        self._report_requested=False
+
+    @property
+    def pids( self )->List[ int ]:
+
+        return list( self._pids )
+
+    def run( self ):
+
+        '''
+        Forks the workers and supervises them until SIGINT or SIGTERM.
+        '''
+
+        #the garbage collector of the workers should not touch (and copy) the objects loaded by the master
+        gc.freeze()
+
+        previous_handlers={ signum: signal.signal( signum, self._handle_signal ) for signum in ( signal.SIGINT, signal.SIGTERM, signal.SIGUSR1 ) }
+        try:
+            for number in range( 1, self._workers+1 ):
+                self._spawn( number )
+
+            start=time.monotonic()
+            report_pending=self._report_delay is not None
+            while not self._stopping:
+                self._reap( restart=True )
+                if self._report_requested or ( report_pending and time.monotonic()-start >= self._report_delay ):
+                    self._report_requested=False
+                    report_pending=False
+                    print( self.format_report(), flush=True )
+                time.sleep( 0.2 )
+        finally:
+            self.stop()
+            for signum, handler in previous_handlers.items():
+                signal.signal( signum, handler )
+
+    def stop( self ):
+
+        '''
+        Sends SIGTERM to the workers, and kills the workers that are still running after self._timeout seconds.
+        '''
+
+        self._stopping=True
+        for pid in self._pids:
+            self._kill( pid, signal.SIGTERM )
+
+        deadline=time.monotonic()+self._timeout
+        while self._pids and time.monotonic() < deadline:
+            self._reap( restart=False )
+            time.sleep( 0.05 )
+        for pid in list( self._pids ):
+            self._kill( pid, signal.SIGKILL )
+            os.waitpid( pid, 0 )
+            del self._pids[ pid ]
+
+    def format_report( self )->str:
+
+        processes={ 'master': os.getpid() }
+        processes.update( ( f"worker {number}", pid ) for pid, number in sorted( self._pids.items(), key=lambda item: item[ 1 ] ) )
+        return f"Memory report ({len( self._pids )} workers):\n{format_memory_report( processes )}"
+
+    def _spawn( self, number:int ):
+
+        pid=os.fork()
+        if pid == 0:
+            #worker: default signal handlers (the target, e.g. uvicorn, installs its own), never returns to the caller
+            for signum in ( signal.SIGINT, signal.SIGTERM, signal.SIGUSR1 ):
+                signal.signal( signum, signal.SIG_DFL )
+            exit_code=0
+            try:
+                self._target( self._sock )
+            except BaseException:
+                traceback.print_exc()
+                exit_code=1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit( exit_code )
+
+        self._pids[ pid ]=number
+
+    def _reap( self, restart:bool ):
+
+        while self._pids:
+            try:
+                pid, status=os.waitpid( -1, os.WNOHANG )
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            number=self._pids.pop( pid, None )
+            if number is None:
+                continue
+            if restart and not self._stopping:
+                print( f"Worker {number} (pid {pid}) exited with status {status}, restarting it.", flush=True )
+                #avoid a tight restart loop when the workers fail at startup
+                time.sleep( 1.0 )
+                self._spawn( number )
+
+    def _handle_signal( self, signum, frame ):
+
+        if signum == signal.SIGUSR1:
+            self._report_requested=True
+        else:
+            self._stopping=True
+
+    @staticmethod
+    def _kill( pid:int, signum:int ):
+
+        try:
+            os.kill( pid, signum )
+        except ProcessLookupError:
+            pass
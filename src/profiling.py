@@ -0,0 +1,221 @@
+'''
+On-demand profiling of single requests with cProfile (see the profiling middleware and the /profiles endpoints of app.py).
+
+A request is profiled when it carries the profiling header with the configured token. The profile is stored server-side, as a pstats dump (<id>.prof, e.g. for snakeviz) and a text summary (<id>.txt) with the functions with the highest cumulative time and the hot functions of the repository code (TermExtractor, AnnotationAdder, cleaning...). Only one request is profiled at a time, and only the most recent profiles are kept.
+
+cProfile is deterministic and profiles the thread of the event loop only: work done in other threads (e.g. the batched sentence classifier, run_in_executor) is not captured and shows up as time spent waiting. Work of other requests on the event loop is captured as well, so in exclusive mode (the default) the other requests wait while a request is profiled: new requests are held, and the requests in flight are drained (up to drain_timeout seconds) before profiling starts.
+'''
+
+from typing import AsyncIterator, Dict, List, Mapping, Optional
+import asyncio
+import cProfile
+import contextlib
+import glob
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+#profile ids are generated by RequestProfiler.save, other ids are refused (no paths)
+PROFILE_ID_PATTERN=re.compile( r"^[0-9]{8}-[0-9]{9}-[0-9a-f]{8}$" )
+
+#the hot functions of the repository code are the ones in these directories
+REPOSITORY_PATTERN=r"(src|question_generator)[/\\]"
+
+
+class RequestProfiler():
+
+    '''
+    Profiles single requests and stores the profiles in a directory.
+    '''
+
+    def __init__( self, directory:str, token:str, max_profiles:int=20, top_n:int=40, exclusive:bool=True, drain_timeout:float=30.0 ):
+
+        '''
+        :param directory: str. Directory of the profiles.
+        :param token: str. Secret that a request should send in the profiling header to be profiled.
+        :param max_profiles: int. Number of profiles kept, older profiles are removed.
+        :param top_n: int. Number of functions listed in the text summaries.
+        :param exclusive: bool. Whether the other requests wait while a request is profiled (see track_request and start_exclusive).
+        :param drain_timeout: float. Maximum number of seconds to wait for the requests in flight before profiling starts (exclusive mode).
+        '''
+
+        if not token:
+            raise ValueError( "A non-empty token is required to enable profiling." )
+        if max_profiles < 1 or top_n < 1:
+            raise ValueError( f"max_profiles and top_n should be >=1, but received max_profiles={max_profiles} and top_n={top_n}." )
+        if drain_timeout < 0:
+            raise ValueError( f"drain_timeout should be >=0, but received drain_timeout={drain_timeout}." )
+
+        self._directory=directory
+        self._token=token
+        self._max_profiles=max_profiles
+        self._top_n=top_n
+        #one profiled request at a time (cProfile can not be nested, and concurrent requests would pollute the profile)
+        self._lock=threading.Lock()
+        self._exclusive=exclusive
+        self._drain_timeout=drain_timeout
+        #requests that are not profiled, in flight (only used on the thread of the event loop)
+        self._in_flight=0
+        #the events are created in the event loop, when first needed
+        self._exclusive_done:Optional[ asyncio.Event ]=None
+        self._drained:Optional[ asyncio.Event ]=None
+
+        os.makedirs( directory, exist_ok=True )
+
+    @classmethod
+    def from_config( cls, settings:Mapping[ str, str ] )->Optional[ 'RequestProfiler' ]:
+
+        '''
+        :param settings: Mapping (e.g. the 'Profiling' section of the config file) with keys ENABLED, TOKEN, DIR, MAX_PROFILES and TOP_N.
+        :return: RequestProfiler, or None when profiling is not enabled.
+        '''
+
+        if settings.get( 'ENABLED', 'false' ).strip().lower() not in ( '1', 'true', 'yes', 'on' ):
+            return None
+
+        return cls( settings.get( 'DIR', '/tmp/c4c_profiles' ), settings.get( 'TOKEN', '' ).strip(),
+                    max_profiles=int( settings.get( 'MAX_PROFILES', '20' ) ), top_n=int( settings.get( 'TOP_N', '40' ) ),
+                    exclusive=settings.get( 'EXCLUSIVE', 'true' ).strip().lower() in ( '1', 'true', 'yes', 'on' ),
+                    drain_timeout=float( settings.get( 'DRAIN_TIMEOUT', '30' ) ) )
+
+    def is_authorized( self, token:Optional[ str ] )->bool:
+
+        return token is not None and hmac.compare_digest( token.encode( 'utf-8' ), self._token.encode( 'utf-8' ) )
+
+    def acquire( self )->bool:
+
+        '''
+        :return: bool. False if another request is being profiled.
+        '''
+
+        return self._lock.acquire( blocking=False )
+
+    def release( self ):
+
+        self._lock.release()
+
+    @contextlib.asynccontextmanager
+    async def track_request( self )->AsyncIterator[ None ]:
+
+        '''
+        Context of a request that is not profiled: in exclusive mode, waits while a request is profiled.
+        '''
+
+        while self._exclusive_done is not None and not self._exclusive_done.is_set():
+            await self._exclusive_done.wait()
+
+        self._in_flight+=1
+        try:
+            yield
+        finally:
+            self._in_flight-=1
+            if self._in_flight == 0 and self._drained is not None:
+                self._drained.set()
+
+    async def start_exclusive( self )->int:
+
+        '''
+        Called (with the lock acquired) before a request is profiled. In exclusive mode, new requests wait until end_exclusive is called, and the requests in flight are drained (up to drain_timeout seconds).
+
+        :return: int. Number of other requests in flight, their work on the event loop is included in the profile.
+        '''
+
+        if not self._exclusive:
+            return self._in_flight
+
+        self._exclusive_done=asyncio.Event()
+        if self._in_flight:
+            self._drained=asyncio.Event()
+            try:
+                await asyncio.wait_for( self._drained.wait(), self._drain_timeout )
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._drained=None
+        return self._in_flight
+
+    def end_exclusive( self ):
+
+        if self._exclusive_done is not None:
+            self._exclusive_done.set()
+            self._exclusive_done=None
+
+    def save( self, profile:cProfile.Profile, name:str, seconds:float, concurrent_requests:int=0 )->str:
+
+        '''
+        Stores a profile and its text summary, and removes the oldest profiles.
+
+        :param profile: cProfile.Profile. Disabled profile of a request.
+        :param name: str. Name of the request (e.g. method and path), written in the summary.
+        :param seconds: float. Wall time of the request.
+        :param concurrent_requests: int. Number of other requests in flight when profiling started, written in the summary.
+        :return: str. Id of the profile.
+        '''
+
+        #ids sort chronologically (up to the millisecond)
+        now=time.time()
+        profile_id=f"{time.strftime( '%Y%m%d-%H%M%S', time.localtime( now ) )}{int( now*1000 )%1000:03d}-{uuid.uuid4().hex[ :8 ]}"
+        profile.dump_stats( os.path.join( self._directory, f"{profile_id}.prof" ) )
+
+        with open( os.path.join( self._directory, f"{profile_id}.txt" ), 'w', encoding='utf-8' ) as f:
+            f.write( f"{name}\nwall time: {seconds*1000:.1f} ms\n" )
+            if concurrent_requests:
+                f.write( f"concurrent requests: {concurrent_requests} (their work on the event loop is included in the profile)\n" )
+            f.write( "\n" )
+            f.write( self.summarize( profile ) )
+
+        self._prune()
+        return profile_id
+
+    def summarize( self, profile:cProfile.Profile )->str:
+
+        '''
+        :return: str. The top_n functions by cumulative time, and the top_n functions of the repository code by internal time.
+        '''
+
+        stream=io.StringIO()
+        stats=pstats.Stats( profile, stream=stream )
+        stats.sort_stats( 'cumulative' ).print_stats( self._top_n )
+        stream.write( f"\nRepository code ({REPOSITORY_PATTERN}) by internal time:\n" )
+        stats.sort_stats( 'tottime' ).print_stats( REPOSITORY_PATTERN, self._top_n )
+        return stream.getvalue()
+
+    def list_profiles( self )->List[ Dict[ str, str ] ]:
+
+        '''
+        :return: List of Dict. Id and name (first line of the summary) of the stored profiles, most recent first.
+        '''
+
+        profiles=[]
+        for path in sorted( glob.glob( os.path.join( self._directory, '*.txt' ) ), reverse=True ):
+            with open( path, encoding='utf-8' ) as f:
+                profiles.append( { 'id': os.path.basename( path )[ :-len( '.txt' ) ], 'name': f.readline().strip() } )
+        return profiles
+
+    def get_path( self, profile_id:str, extension:str='.prof' )->Optional[ str ]:
+
+        '''
+        :param profile_id: str.
+        :param extension: str. '.prof' (pstats dump) or '.txt' (text summary).
+        :return: str or None. Path of the profile, None for unknown (or invalid) ids.
+        '''
+
+        if not PROFILE_ID_PATTERN.match( profile_id ) or extension not in ( '.prof', '.txt' ):
+            return None
+        path=os.path.join( self._directory, f"{profile_id}{extension}" )
+        return path if os.path.isfile( path ) else None
+
+    def _prune( self ):
+
+        profile_ids=sorted( os.path.basename( path )[ :-len( '.prof' ) ] for path in glob.glob( os.path.join( self._directory, '*.prof' ) ) )
+        for profile_id in profile_ids[ :-self._max_profiles ]:
+            for extension in ( '.prof', '.txt' ):
+                try:
+                    os.remove( os.path.join( self._directory, f"{profile_id}{extension}" ) )
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,194 @@
+from typing import Any, Callable, List, Sequence, Tuple
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .. import instrumentation
+
+
+class DynamicBatcher():
+
+    '''
+    Collects items submitted by concurrent callers into a single batch, runs one call of predict_function on that batch, and dispatches the results back to the future of each caller. A batch is closed when it contains at least max_batch_size items, or when max_latency_ms milliseconds have passed since the first item of the batch was submitted.
+    '''
+
+    def __init__( self, predict_function:Callable[ [List[Any]], Sequence[Any] ], max_batch_size:int=32, max_latency_ms:float=5.0 ):
+
+        '''
+        :param predict_function: Callable. Function that takes a list of items and returns a sequence with one result per item (in the same order).
+        :param max_batch_size: int. Maximum number of items collected before the batch is processed.
+        :param max_latency_ms: float. Maximum time (in milliseconds) to wait for other callers before the batch is processed.
+        '''
+
+        if max_batch_size < 1:
+            raise ValueError( f"max_batch_size should be >=1, but received {max_batch_size}." )
+
+        if max_latency_ms < 0:
+            raise ValueError( f"max_latency_ms should be >=0, but received {max_latency_ms}." )
+
+        self._predict_function=predict_function
+        self._max_batch_size=max_batch_size
+        self._max_latency=max_latency_ms/1000
+
+        self._lock=threading.Lock()
+        self._queue=None
+        self._worker=None
+        self._pid=None
+
+    def submit( self, items:List[Any] )->Future:
+
+        '''
+        Submit a list of items. The items will be processed together with items submitted by other callers.
+
+        :param items: List. Items to process.
+        :return: Future. Future that resolves to a list with the results for the submitted items.
+        '''
+
+        future=Future()
+
+        if not items:
+            future.set_result( [] )
+            return future
+
+        self._get_queue().put( ( list( items ), future ) )
+
+        return future
+
+    async def submit_async( self, items:List[Any] )->List[Any]:
+
+        '''
+        Awaitable version of self.submit(items), for use from a running event loop.
+
+        :param items: List. Items to process.
+        :return: List. Results for the submitted items.
+        '''
+
+        return await asyncio.wrap_future( self.submit( items ) )
+
+    def _get_queue( self )->queue.Queue:
+
+        '''
+        Start the worker thread on first use. The worker is (re)started in every process, so a batcher created before forking keeps working in the child processes.
+        '''
+
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+                self._queue=queue.Queue()
+                self._worker=threading.Thread( target=self._run, args=( self._queue, ), daemon=True )
+                self._pid=os.getpid()
+                self._worker.start()
+            return self._queue
+
+    def _run( self, request_queue:queue.Queue ):
+
+        while True:
+            requests=[ request_queue.get() ]
+            n_items=len( requests[0][0] )
+            deadline=time.monotonic()+self._max_latency
+
+            #keep collecting requests from other callers until the batch is full or the deadline has passed
+            while n_items < self._max_batch_size:
+                timeout=deadline-time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request=request_queue.get( timeout=timeout )
+                except queue.Empty:
+                    break
+                requests.append( request )
+                n_items+=len( request[0] )
+
+            self._process_batch( requests )
+
+    def _process_batch( self, requests:List[ Tuple[ List[Any], Future ] ] ):
+
+        #skip requests that were cancelled by the caller while waiting in the queue
+        requests=[ ( items, future ) for items, future in requests if future.set_running_or_notify_cancel() ]
+        if not requests:
+            return
+
+        batch=[ item for items, _ in requests for item in items ]
+
+        try:
+            results=self._predict_function( batch )
+            if len( results ) != len( batch ):
+                raise ValueError( f"predict_function returned {len( results )} results for a batch of {len( batch )} items." )
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception( e )
+            return
+
+        position=0
+        for items, future in requests:
+            future.set_result( list( results[ position:position+len( items ) ] ) )
+            position+=len( items )
+
+
+class BatchedSequenceClassifier():
+
+    '''
+    Wraps a TrainerBertSequenceClassifier in a DynamicBatcher, so documents sent by concurrent requests are classified in a single forward pass.
+    '''
+
+    def __init__( self, classifier, max_batch_size:int=32, max_latency_ms:float=5.0 ):
+
+        '''
+        :param classifier: TrainerBertSequenceClassifier. Trained classifier.
+        :param max_batch_size: int. Maximum number of documents in a batch.
+        :param max_latency_ms: float. Maximum time (in milliseconds) a document waits for other documents before the batch is processed.
+        '''
+
+        self._classifier=classifier
+        self._max_batch_size=max_batch_size
+        self._batcher=DynamicBatcher( self._predict_batch, max_batch_size=max_batch_size, max_latency_ms=max_latency_ms )
+
+    @property
+    def classifier( self ):
+
+        return self._classifier
+
+    @property
+    def is_loaded( self )->bool:
+
+        '''
+        Whether the model of the classifier is loaded (TrainerBertSequenceClassifier.predict loads it on first use otherwise).
+        '''
+
+        return hasattr( self._classifier, 'model' ) and hasattr( self._classifier, 'tokenizer' )
+
+    def predict( self, documents:List[str] )->Tuple[ np.ndarray, np.ndarray ]:
+
+        '''
+        Same output as TrainerBertSequenceClassifier.predict(documents), i.e. the predicted labels and probabilities.
+        '''
+
+        return self._to_arrays( self._batcher.submit( documents ).result() )
+
+    async def predict_async( self, documents:List[str] )->Tuple[ np.ndarray, np.ndarray ]:
+
+        '''
+        Awaitable version of self.predict(documents), for use in the (async) FastAPI endpoints.
+        '''
+
+        return self._to_arrays( await self._batcher.submit_async( documents ) )
+
+    def _predict_batch( self, documents:List[str] )->List[ Tuple[ Any, Any ] ]:
+
+        #runs in the thread of the batcher, so the batches are counted outside of the requests
+        instrumentation.count( 'classifier_batches_total' )
+        instrumentation.count( 'classifier_documents_total', len( documents ) )
+        with instrumentation.stage( 'classifier_batch' ):
+            preds_labels, preds_proba=self._classifier.predict( documents, batch_size=self._max_batch_size )
+        return list( zip( preds_labels, preds_proba ) )
+
+    @staticmethod
+    def _to_arrays( results:List[ Tuple[ Any, Any ] ] )->Tuple[ np.ndarray, np.ndarray ]:
+
+        preds_labels=[ label for label, _ in results ]
+        preds_proba=[ proba for _, proba in results ]
+        return np.array( preds_labels ), np.array( preds_proba )
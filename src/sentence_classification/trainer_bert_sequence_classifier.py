@@ -22,6 +22,7 @@ from sklearn.model_selection import train_test_split
 from skmultilearn.model_selection import iterative_train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 
+from ..parallelism import apply_torch_parallelism
 from .read_data import read_split, read_base64_multi_class_tsv, read_base64_multi_label_tsv
 from .utils import clean_text, get_sample_weights_multi_class, get_sample_weights_multi_label
 
@@ -77,6 +78,9 @@ class TrainerBertSequenceClassifier( ):
         :param num_labels. Number of classes/labels for multi_class or multi_label classification problem.
         '''
         
+        #apply the configured torch thread settings (see src/parallelism.py) before loading the model
+        apply_torch_parallelism()
+
         kwargs = dict( pretrained_model_name_or_path = self._pretrained_model_name_or_path ,\
                       num_labels=num_labels)
         kwargs={k: v for k, v in kwargs.items() if v is not None}
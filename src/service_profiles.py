@@ -0,0 +1,91 @@
+'''
+Service profiles: a replica of the service can serve a subset of the endpoints (e.g. only /chunking), in which case only the components (models) needed by these endpoints are loaded. The profiles are defined in the [ServiceProfiles] section of the config file, the profile of a replica is selected in the [Service] section (or via the SERVICE_PROFILE environment variable, see app.py).
+'''
+
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+#endpoints served by every profile (home, monitoring and API documentation)
+ALWAYS_SERVED=( '/', '/metrics', '/profiles', '/startup', '/docs', '/redoc', '/openapi.json' )
+
+#endpoints of a profile that serves all endpoints
+ALL_ENDPOINTS='*'
+
+
+def _matches( path:str, endpoint:str )->bool:
+
+    #an endpoint also covers the paths below it, e.g. /question_generator covers /question_generator/jobs/{job_id}
+    return path == endpoint or ( endpoint != '/' and path.startswith( endpoint+'/' ) )
+
+
+class ServiceProfile():
+
+    '''
+    Endpoints served by a replica, and the components they need.
+    '''
+
+    def __init__( self, name:str, endpoints:Sequence[ str ], endpoint_components:Mapping[ str, Sequence[ str ] ] ):
+
+        '''
+        :param name: str. Name of the profile.
+        :param endpoints: Sequence of str. Endpoints of the profile (keys of endpoint_components), or [ ALL_ENDPOINTS ].
+        :param endpoint_components: Mapping. Components (see ComponentRegistry) needed by every endpoint. An endpoint covers the paths below it.
+        '''
+
+        endpoints=list( endpoint_components ) if ALL_ENDPOINTS in endpoints else list( endpoints )
+        if not endpoints:
+            raise ValueError( f"Service profile '{name}' has no endpoints." )
+        for endpoint in endpoints:
+            if endpoint not in endpoint_components:
+                raise ValueError( f"Unknown endpoint '{endpoint}' in service profile '{name}', endpoints are {list( endpoint_components )}." )
+
+        self.name=name
+        self.endpoints=endpoints
+        #components of the endpoints, without duplicates, in the order of the endpoints
+        self.components=list( dict.fromkeys( component for endpoint in endpoints for component in endpoint_components[ endpoint ] ) )
+
+    @classmethod
+    def from_config( cls, name:str, profiles:Mapping[ str, str ], endpoint_components:Mapping[ str, Sequence[ str ] ] )->'ServiceProfile':
+
+        '''
+        :param name: str. Name of the profile.
+        :param profiles: Mapping (e.g. the 'ServiceProfiles' section of the config file) of profile names to comma separated endpoints.
+        :param endpoint_components: Mapping. See __init__.
+        :return: ServiceProfile.
+        '''
+
+        if name not in profiles:
+            raise ValueError( f"Unknown service profile '{name}', profiles are {list( profiles )}." )
+
+        return cls( name, parse_list( profiles[ name ] ), endpoint_components )
+
+    def serves( self, path:str )->bool:
+
+        '''
+        :param path: str. Path of a route, e.g. '/question_generator/jobs/{job_id}'.
+        :return: bool. Whether the route is served by the profile.
+        '''
+
+        return any( _matches( path, endpoint ) for endpoint in ALWAYS_SERVED+tuple( self.endpoints ) )
+
+    def filter_routes( self, routes:Iterable )->List:
+
+        '''
+        :param routes: Iterable of routes (e.g. app.router.routes of a FastAPI app).
+        :return: List. The routes served by the profile (routes without a path, e.g. mounts, are kept).
+        '''
+
+        return [ route for route in routes if not hasattr( route, 'path' ) or self.serves( route.path ) ]
+
+    def report( self )->Dict[ str, List[ str ] ]:
+
+        return { 'profile': self.name, 'endpoints': list( self.endpoints ), 'profile_components': list( self.components ) }
+
+
+def parse_list( value:str )->List[ str ]:
+
+    '''
+    :param value: str. Comma separated values, e.g. '/chunking, /extract_terms'.
+    :return: List of str. The non-empty values, stripped.
+    '''
+
+    return [ item.strip() for item in value.split( ',' ) if item.strip() ]
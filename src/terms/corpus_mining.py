@@ -0,0 +1,203 @@
+'''
+Corpus-level term mining: the documents of a corpus (crawl JSONL files) are sharded across worker processes. Every worker extracts the terms of its documents with a TermExtractor (i.e. with the cleaning rules of TermExtractor.get_terms_ner) and builds a partial table with the frequency and document frequency of every term. The partial tables are merged into a ranked glossary.
+
+Usage:
+
+python -m src.terms.corpus_mining --input crawl.jsonl --output glossary.tsv --language en --n_workers 4
+'''
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import multiprocessing
+import time
+from collections import Counter
+
+from .document_frequency import iter_jsonl_texts
+from ..aliases import Term_lemma
+from ..annotations.utils import find_terms, make_term_automaton
+
+#term (lowercased) -> [ frequency, document frequency, Counter of the lemmas (number of documents) ]
+Term_table=Dict[ str, list ]
+
+
+def get_sentences( text:str )->List[ str ]:
+
+    '''
+    Splits a text in sentences (non-empty lines), as the SENTENCE_TYPE annotations of the /extract_terms endpoint.
+
+    :param text: str.
+    :return: List of str.
+    '''
+
+    return [ sentence.strip() for sentence in text.split( "\n" ) if sentence.strip() ]
+
+
+def add_document_terms( table:Term_table, sentences:List[ str ], terms_lemmas:List[ Term_lemma ] ):
+
+    '''
+    Adds the terms of a document to a term table. The frequency of a term is its number of occurrences in the sentences (found with the Aho-Corasick helpers used by AnnotationAdder.add_token_annotation), its document frequency is increased by one.
+
+    :param table: Term_table. Table to update inplace.
+    :param sentences: List of str. Sentences of the document.
+    :param terms_lemmas: List of (term,lemma) Tuples. Terms extracted from the sentences.
+    '''
+
+    lemmas={}
+    for term, lemma in terms_lemmas:
+        lemmas.setdefault( term.lower(), lemma.lower() )
+    if not lemmas:
+        return
+
+    terms=list( lemmas )
+    A=make_term_automaton( terms )
+    frequencies=Counter( index for sentence in sentences for _, _, index in find_terms( A, sentence.lower() ) )
+
+    for index, term in enumerate( terms ):
+        entry=table.get( term )
+        if entry is None:
+            entry=table[ term ]=[ 0, 0, Counter() ]
+        #an extracted term occurs at least once, even if it was modified by the cleaning rules
+        entry[ 0 ]+=max( frequencies[ index ], 1 )
+        entry[ 1 ]+=1
+        entry[ 2 ][ lemmas[ term ] ]+=1
+
+
+def merge_tables( tables:Iterable[ Term_table ] )->Term_table:
+
+    '''
+    Reduce step: merges partial term tables by summing the (document) frequencies and lemma counts.
+
+    :param tables: Iterable of Term_table.
+    :return: Term_table.
+    '''
+
+    merged={}
+    for table in tables:
+        for term, ( frequency, document_frequency, lemmas ) in table.items():
+            entry=merged.get( term )
+            if entry is None:
+                merged[ term ]=[ frequency, document_frequency, Counter( lemmas ) ]
+            else:
+                entry[ 0 ]+=frequency
+                entry[ 1 ]+=document_frequency
+                entry[ 2 ].update( lemmas )
+    return merged
+
+
+def rank_terms( table:Term_table, min_document_frequency:int=1 )->List[ Tuple[ str, str, int, int ] ]:
+
+    '''
+    :param table: Term_table.
+    :param min_document_frequency: int. Terms occurring in fewer documents are left out.
+    :return: List of ( term, lemma, frequency, document frequency ) Tuples, ranked by document frequency, then frequency. The lemma is the most frequent lemma of the term.
+    '''
+
+    glossary=[ ( term, lemmas.most_common( 1 )[ 0 ][ 0 ], frequency, document_frequency ) \
+              for term, ( frequency, document_frequency, lemmas ) in table.items() if document_frequency >= min_document_frequency ]
+    glossary.sort( key=lambda entry: ( -entry[ 3 ], -entry[ 2 ], entry[ 0 ] ) )
+    return glossary
+
+
+def write_glossary( path:str, glossary:List[ Tuple[ str, str, int, int ] ] ):
+
+    '''
+    :param path: str. Path of the tab separated glossary file.
+    :param glossary: List of ( term, lemma, frequency, document frequency ) Tuples (see rank_terms).
+    '''
+
+    with open( path, 'w', encoding='utf-8' ) as f:
+        f.write( "term\tlemma\tfrequency\tdocument_frequency\n" )
+        for term, lemma, frequency, document_frequency in glossary:
+            f.write( f"{term}\t{lemma}\t{frequency}\t{document_frequency}\n" )
+
+
+#TermExtractor of the worker process, loaded once per worker by init_worker
+_TERMEXTRACTOR=None
+
+
+def init_worker( language:str, max_ngram:int ):
+
+    global _TERMEXTRACTOR
+
+    from .terms import TermExtractor
+
+    _TERMEXTRACTOR=TermExtractor( [ language ], max_ngram=max_ngram, remove_stopwords=True, use_spellcheck_tool=False )
+
+
+def mine_shard( paths:List[ str ], language:str, shard:int, n_shards:int, text_field:str='text' )->Tuple[ Term_table, Dict[ str, float ] ]:
+
+    '''
+    Map step: builds the term table of one shard of the corpus.
+
+    :return: Tuple. Term table of the shard, and statistics of the shard (number of documents, seconds, documents per second).
+    '''
+
+    start=time.time()
+    table={}
+    n_documents=0
+    for text in iter_jsonl_texts( paths, text_field=text_field, language=language, shard=shard, n_shards=n_shards ):
+        sentences=get_sentences( text )
+        #spacy runs in this (worker) process, parallelism comes from the shards
+        terms_lemmas, _=_TERMEXTRACTOR.get_terms_ner( sentences, n_jobs=1, language=language )
+        add_document_terms( table, sentences, terms_lemmas )
+        n_documents+=1
+
+    seconds=time.time()-start
+    stats={ 'shard': shard, 'n_documents': n_documents, 'n_terms': len( table ), 'seconds': seconds, 'documents_per_second': n_documents/seconds if seconds else 0.0 }
+    return table, stats
+
+
+def _mine_shard( arguments ):
+
+    return mine_shard( *arguments )
+
+
+def mine_corpus( paths:List[ str ], language:str, n_workers:int=1, n_shards:Optional[ int ]=None, max_ngram:int=10, text_field:str='text' )->Term_table:
+
+    '''
+    Mines the terms of a corpus of crawl JSONL files, sharded across n_workers worker processes.
+
+    :param paths: List of str. Crawl JSONL files.
+    :param language: str. Language of the documents.
+    :param n_workers: int. Number of worker processes.
+    :param n_shards: int or None. Number of shards, None uses one shard per worker. More shards than workers balances the load when documents differ in length.
+    :param max_ngram: int. Maximum length of the terms.
+    :param text_field: str. Field of the JSON documents containing the text.
+    :return: Term_table. Merged term table.
+    '''
+
+    n_shards=n_shards if n_shards is not None else n_workers
+    if n_workers < 1 or n_shards < 1:
+        raise ValueError( f"n_workers and n_shards should be >=1, but received n_workers={n_workers} and n_shards={n_shards}." )
+
+    start=time.time()
+    tables=[]
+    n_documents=0
+    with multiprocessing.Pool( n_workers, initializer=init_worker, initargs=( language, max_ngram ) ) as pool:
+        for table, stats in pool.imap_unordered( _mine_shard, [ ( paths, language, shard, n_shards, text_field ) for shard in range( n_shards ) ] ):
+            print( f"Shard {stats[ 'shard' ]}: {stats[ 'n_documents' ]} documents, {stats[ 'n_terms' ]} terms in {stats[ 'seconds' ]:.1f}s ({stats[ 'documents_per_second' ]:.1f} documents/s)." )
+            tables.append( table )
+            n_documents+=stats[ 'n_documents' ]
+
+    merged=merge_tables( tables )
+    seconds=time.time()-start
+    print( f"Mined {n_documents} documents in {seconds:.1f}s ({n_documents/seconds if seconds else 0.0:.1f} documents/s) with {n_workers} workers: {len( merged )} terms." )
+    return merged
+
+
+if __name__ == '__main__':
+
+    parser=argparse.ArgumentParser( description="Mine a ranked glossary (term, lemma, frequency, document frequency) from crawl JSONL files." )
+    parser.add_argument( '--input', nargs='+', required=True, help="Crawl JSONL files (one JSON document per line)." )
+    parser.add_argument( '--output', required=True, help="Path of the tab separated glossary file." )
+    parser.add_argument( '--language', required=True, help="Language of the documents. Documents with another 'language' field are skipped." )
+    parser.add_argument( '--n_workers', type=int, default=multiprocessing.cpu_count(), help="Number of worker processes." )
+    parser.add_argument( '--n_shards', type=int, default=None, help="Number of shards (default: one per worker)." )
+    parser.add_argument( '--max_ngram', type=int, default=10, help="Maximum length of the terms." )
+    parser.add_argument( '--min_document_frequency', type=int, default=1, help="Leave out terms occurring in fewer documents." )
+    parser.add_argument( '--text_field', default='text', help="Field of the JSON documents containing the text." )
+    args=parser.parse_args()
+
+    table=mine_corpus( args.input, args.language, n_workers=args.n_workers, n_shards=args.n_shards, max_ngram=args.max_ngram, text_field=args.text_field )
+    write_glossary( args.output, rank_terms( table, min_document_frequency=args.min_document_frequency ) )
+    print( f"Glossary written to {args.output}." )
@@ -0,0 +1,419 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+
+class DocumentFrequencyTable():
+
+    '''
+    Precomputed document frequencies of terms (lowercased), for one language. Used to compute the idf of the terms detected in a document.
+
+    The table is stored as a tab separated file: the first line is "#n_documents\t<number of documents>", the other lines are "<term>\t<document frequency>".
+    '''
+
+    def __init__( self, document_frequencies:Dict[ str, int ], n_documents:int ):
+
+        '''
+        :param document_frequencies: Dict. Number of documents containing the term, for every term.
+        :param n_documents: int. Number of documents of the corpus.
+        '''
+
+        if n_documents < 0:
+            raise ValueError( f"n_documents should be >=0, but received {n_documents}." )
+
+        self._document_frequencies=document_frequencies
+        self.n_documents=n_documents
+
+    def __len__( self )->int:
+
+        return len( self._document_frequencies )
+
+    def get_document_frequencies( self, terms:Iterable[ str ] )->np.ndarray:
+
+        '''
+        :param terms: Iterable of str. Lowercased terms.
+        :return: np.ndarray. Document frequency of every term (0 for unknown terms).
+        '''
+
+        return np.array( [ self._document_frequencies.get( term, 0 ) for term in terms ], dtype=np.float64 )
+
+    def get_idf( self, terms:Iterable[ str ] )->np.ndarray:
+
+        '''
+        Smoothed inverse document frequency ( log( (1+n_documents)/(1+df) ) + 1, as in sklearn's TfidfVectorizer ). Unknown terms get the highest idf.
+
+        :param terms: Iterable of str. Lowercased terms.
+        :return: np.ndarray. Idf of every term.
+        '''
+
+        return self._get_idf( self.get_document_frequencies( terms ) )
+
+    def get_grouped_idf( self, terms:List[ str ], groups:np.ndarray, n_groups:int )->np.ndarray:
+
+        '''
+        Idf of groups of terms, e.g. the inflected variants of a lemma. The tables count (lowercased) surface forms, so the document frequency of a group is the highest document frequency of its terms (a lower bound of the number of documents containing any of them).
+
+        :param terms: List of str. Lowercased terms.
+        :param groups: np.ndarray. Index of the group of every term.
+        :param n_groups: int. Number of groups.
+        :return: np.ndarray. Idf of every group.
+        '''
+
+        document_frequencies=np.zeros( n_groups, dtype=np.float64 )
+        np.maximum.at( document_frequencies, np.asarray( groups, dtype=np.int64 ), self.get_document_frequencies( terms ) )
+        return self._get_idf( document_frequencies )
+
+    def _get_idf( self, document_frequencies:np.ndarray )->np.ndarray:
+
+        return np.log( ( 1+self.n_documents )/( 1+document_frequencies ) ) + 1
+
+    @classmethod
+    def load( cls, path:str )->'DocumentFrequencyTable':
+
+        '''
+        :param path: str. Path to the tab separated document frequency file.
+        :return: DocumentFrequencyTable.
+        '''
+
+        document_frequencies={}
+        n_documents=None
+        with open( path, encoding='utf-8' ) as f:
+            for line in f:
+                line=line.rstrip( "\n" )
+                if not line:
+                    continue
+                term, frequency=line.rsplit( "\t", 1 )
+                if term == '#n_documents':
+                    n_documents=int( frequency )
+                else:
+                    document_frequencies[ term ]=int( frequency )
+
+        if n_documents is None:
+            raise ValueError( f"Document frequency file {path} should start with a '#n_documents' line." )
+
+        return cls( document_frequencies, n_documents )
+
+    def save( self, path:str ):
+
+        '''
+        :param path: str. Path of the tab separated document frequency file.
+        '''
+
+        with open( path, 'w', encoding='utf-8' ) as f:
+            f.write( f"#n_documents\t{self.n_documents}\n" )
+            for term, frequency in sorted( self._document_frequencies.items() ):
+                f.write( f"{term}\t{frequency}\n" )
+
+
+class DocumentFrequencyIndex( DocumentFrequencyTable ):
+
+    '''
+    Persistent, incrementally updatable document frequencies of terms (lowercased), for one language. Every processed document adds its set of terms via self.add_document.
+
+    The index is stored in a directory: vocabulary-<version>.npy (the UTF-8 encoded terms, sorted, as a fixed width bytes array), counts-<version>.npy (document frequency of every term, int64) and meta.json (number of documents and terms, and the version of the arrays). Both arrays are memory-mapped when loading, so all worker processes share the same pages, and no per-process dict of the vocabulary is built: terms are looked up with a binary search (np.searchsorted), in O(log n) instead of the O(1) of a dict, which would have to be built (and held) by every process.
+    '''
+
+    META_FILE='meta.json'
+    VOCABULARY_FILE='vocabulary-{version}.npy'
+    COUNTS_FILE='counts-{version}.npy'
+
+    def __init__( self, vocabulary:Optional[ np.ndarray ]=None, counts:Optional[ np.ndarray ]=None, n_documents:int=0 ):
+
+        '''
+        :param vocabulary: np.ndarray or None. UTF-8 encoded terms of the index (bytes dtype), sorted and unique.
+        :param counts: np.ndarray or None. Document frequency of every term of the vocabulary.
+        :param n_documents: int. Number of documents added to the index.
+        '''
+
+        vocabulary=vocabulary if vocabulary is not None else np.zeros( 0, dtype='S1' )
+        counts=counts if counts is not None else np.zeros( 0, dtype=np.int64 )
+
+        if len( vocabulary ) != len( counts ):
+            raise ValueError( f"Length of the vocabulary ({len( vocabulary )}) should be equal to the number of counts ({len( counts )})." )
+        if n_documents < 0:
+            raise ValueError( f"n_documents should be >=0, but received {n_documents}." )
+
+        #the terms are not stored in a dict (see DocumentFrequencyTable), but in the sorted self._vocabulary
+        self._vocabulary=vocabulary
+        self._counts=counts
+        self.n_documents=n_documents
+        #document frequencies added since the index was loaded or saved
+        self._pending=Counter()
+
+    def __len__( self )->int:
+
+        return len( self._vocabulary ) + int( np.sum( self._lookup( list( self._pending ) ) < 0 ) )
+
+    def add_document( self, terms:Iterable[ str ] ):
+
+        '''
+        Add a document to the index. Every (lowercased) term is counted once per document.
+
+        :param terms: Iterable of str. Terms of the document.
+        '''
+
+        #the bytes arrays can not hold trailing null characters
+        self._pending.update( { term.lower() for term in terms if not term.endswith( "\0" ) } )
+        self.n_documents+=1
+
+    def get_document_frequencies( self, terms:Iterable[ str ] )->np.ndarray:
+
+        terms=list( terms )
+        indices=self._lookup( terms )
+        known=indices >= 0
+        document_frequencies=np.zeros( len( terms ), dtype=np.float64 )
+        document_frequencies[ known ]=self._counts[ indices[ known ] ]
+        if self._pending:
+            document_frequencies+=np.array( [ self._pending.get( term, 0 ) for term in terms ], dtype=np.float64 )
+        return document_frequencies
+
+    def _lookup( self, terms:List[ str ] )->np.ndarray:
+
+        '''
+        :param terms: List of str.
+        :return: np.ndarray. Index of every term in self._vocabulary, -1 for unknown terms.
+        '''
+
+        indices=np.full( len( terms ), -1, dtype=np.int64 )
+        if not terms or not len( self._vocabulary ):
+            return indices
+
+        encoded=[ term.encode( 'utf-8' ) for term in terms ]
+        width=self._vocabulary.dtype.itemsize
+        #terms longer than the longest term of the vocabulary would be truncated by the conversion, they are unknown
+        fits=np.array( [ len( term ) <= width for term in encoded ] )
+        queries=np.array( encoded, dtype=self._vocabulary.dtype )
+        positions=np.minimum( np.searchsorted( self._vocabulary, queries ), len( self._vocabulary )-1 )
+        found=fits & ( self._vocabulary[ positions ] == queries )
+        indices[ found ]=positions[ found ]
+        return indices
+
+    def save( self, directory:str ):
+
+        '''
+        Save the index (including the documents added since it was loaded) to a directory. The arrays are written to new files (of a new version) and meta.json, which refers to them, is replaced last, so readers never see a partially written index.
+
+        :param directory: str. Directory of the index. Will be created if it does not exist.
+        '''
+
+        os.makedirs( directory, exist_ok=True )
+
+        pending_terms=list( self._pending )
+        pending_counts=np.array( [ self._pending[ term ] for term in pending_terms ], dtype=np.int64 )
+        indices=self._lookup( pending_terms )
+        known=indices >= 0
+
+        counts=np.array( self._counts, dtype=np.int64 )
+        np.add.at( counts, indices[ known ], pending_counts[ known ] )
+        new_terms=np.array( [ term.encode( 'utf-8' ) for term, is_known in zip( pending_terms, known ) if not is_known ], dtype=bytes )
+        if len( new_terms ):
+            vocabulary=np.concatenate( [ np.asarray( self._vocabulary ), new_terms ] )
+            counts=np.concatenate( [ counts, pending_counts[ ~known ] ] )
+            order=np.argsort( vocabulary, kind='stable' )
+            vocabulary=vocabulary[ order ]
+            counts=counts[ order ]
+        else:
+            vocabulary=np.array( self._vocabulary )
+
+        meta_path=os.path.join( directory, self.META_FILE )
+        version=0
+        if os.path.isfile( meta_path ):
+            with open( meta_path, encoding='utf-8' ) as f:
+                version=json.load( f )[ 'version' ]+1
+
+        def write_atomic( filename, write ):
+            with tempfile.NamedTemporaryFile( mode='wb', dir=directory, suffix='.tmp', delete=False ) as f:
+                write( f )
+            os.replace( f.name, os.path.join( directory, filename ) )
+
+        write_atomic( self.VOCABULARY_FILE.format( version=version ), lambda f: np.save( f, vocabulary ) )
+        write_atomic( self.COUNTS_FILE.format( version=version ), lambda f: np.save( f, counts ) )
+        write_atomic( self.META_FILE, lambda f: f.write( json.dumps( { 'n_documents': self.n_documents, 'n_terms': len( vocabulary ), 'version': version } ).encode( 'utf-8' ) ) )
+
+        #older versions are removed (processes that memory-mapped them keep their pages until they unmap them)
+        current={ self.VOCABULARY_FILE.format( version=version ), self.COUNTS_FILE.format( version=version ) }
+        for path in glob.glob( os.path.join( directory, 'vocabulary*' ) )+glob.glob( os.path.join( directory, 'counts*' ) ):
+            if os.path.basename( path ) not in current:
+                os.remove( path )
+
+        self._vocabulary=vocabulary
+        self._counts=counts
+        self._pending=Counter()
+
+    @classmethod
+    def load( cls, directory:str, mmap:bool=True )->'DocumentFrequencyIndex':
+
+        '''
+        :param directory: str. Directory of the index.
+        :param mmap: bool. Whether to memory-map the vocabulary and the counts (read-only) instead of reading them in memory.
+        :return: DocumentFrequencyIndex.
+        '''
+
+        #the files of the version in meta.json can be removed by a concurrent save before they are opened, then meta.json is read again
+        for attempt in range( 3 ):
+            with open( os.path.join( directory, cls.META_FILE ), encoding='utf-8' ) as f:
+                meta=json.load( f )
+
+            mmap_mode='r' if mmap and meta[ 'n_terms' ] else None
+            try:
+                vocabulary=np.load( os.path.join( directory, cls.VOCABULARY_FILE.format( version=meta[ 'version' ] ) ), mmap_mode=mmap_mode )
+                counts=np.load( os.path.join( directory, cls.COUNTS_FILE.format( version=meta[ 'version' ] ) ), mmap_mode=mmap_mode )
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue
+            return cls( vocabulary, counts, meta[ 'n_documents' ] )
+
+    @classmethod
+    def is_index( cls, directory:str )->bool:
+
+        return os.path.isfile( os.path.join( directory, cls.META_FILE ) )
+
+
+@lru_cache( maxsize=None )
+def load_document_frequency_table( directory:str, language:str )->Optional[ DocumentFrequencyTable ]:
+
+    '''
+    Loads the document frequency table of a language once per process: a DocumentFrequencyIndex ( directory <directory>/<language> ), or a tab separated DocumentFrequencyTable ( <directory>/<language>.tsv ).
+
+    :param directory: str. Directory with the document frequency tables.
+    :param language: str. Language.
+    :return: DocumentFrequencyTable, or None if there is no table for the language.
+    '''
+
+    if DocumentFrequencyIndex.is_index( os.path.join( directory, language ) ):
+        return DocumentFrequencyIndex.load( os.path.join( directory, language ) )
+
+    path=os.path.join( directory, f"{language}.tsv" )
+    if not os.path.isfile( path ):
+        print( f"No document frequency table found for language '{language}' ({path}). Terms will be scored by their frequency only." )
+        return None
+
+    return DocumentFrequencyTable.load( path )
+
+
+def iter_jsonl_texts( paths:List[ str ], text_field:str='text', language:Optional[ str ]=None, shard:int=0, n_shards:int=1 )->Iterator[ str ]:
+
+    '''
+    Streams the texts of crawl JSONL files (one JSON document per line, e.g. the output of trafilatura), without reading the files in memory.
+
+    :param paths: List of str. Paths to the JSONL files.
+    :param text_field: str. Field containing the text.
+    :param language: str or None. If not None, documents with a 'language' field different from language are skipped.
+    :param shard: int. The files are split in n_shards byte ranges of (about) equal size, only the lines starting in the byte range of the shard are read, so n_shards processes can each stream a shard of the corpus without reading the other shards.
+    :param n_shards: int. Number of shards.
+    :return: Iterator of str.
+    '''
+
+    if not 0 <= shard < n_shards:
+        raise ValueError( f"shard should be >=0 and <n_shards, but received shard={shard} and n_shards={n_shards}." )
+
+    sizes=[ os.path.getsize( path ) for path in paths ]
+    total_size=sum( sizes )
+    #byte range of the shard, over the concatenated files
+    shard_begin=total_size*shard//n_shards
+    shard_end=total_size*( shard+1 )//n_shards
+
+    file_begin=0
+    for path, size in zip( paths, sizes ):
+        file_end=file_begin+size
+        begin=max( shard_begin, file_begin )-file_begin
+        end=min( shard_end, file_end )-file_begin
+        file_begin=file_end
+        if begin >= end:
+            continue
+
+        with open( path, 'rb' ) as f:
+            #a line belongs to the shard of its first byte: skip the line started in the previous shard
+            if begin > 0:
+                f.seek( begin-1 )
+                f.readline()
+            while f.tell() < end:
+                offset=f.tell()
+                line=f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    document=json.loads( line )
+                except ( json.JSONDecodeError, UnicodeDecodeError ):
+                    print( f"Skipping invalid JSON at {path} (byte {offset})." )
+                    continue
+                #valid JSON that is not a document (e.g. a list or a string)
+                if not isinstance( document, dict ):
+                    continue
+                if language is not None and document.get( 'language', language ) != language:
+                    continue
+                text=document.get( text_field )
+                if text:
+                    yield text
+
+
+def build_index( args ):
+
+    if DocumentFrequencyIndex.is_index( args.output ):
+        print( f"Updating existing index {args.output}." )
+        index=DocumentFrequencyIndex.load( args.output, mmap=False )
+    else:
+        index=DocumentFrequencyIndex()
+
+    if args.vocabulary:
+        #count the occurrences of a fixed vocabulary with an Aho-Corasick automaton
+        from ..annotations.utils import find_terms, make_term_automaton
+
+        with open( args.vocabulary, encoding='utf-8' ) as f:
+            terms=list( dict.fromkeys( line.strip().lower() for line in f if line.strip() ) )
+        automaton=make_term_automaton( terms )
+
+        def get_terms( text ):
+            return { terms[ term_index ] for _, _, term_index in find_terms( automaton, text.lower() ) }
+    else:
+        #extract the terms of every document with a TermExtractor (as the /extract_terms endpoint does)
+        from .terms import TermExtractor
+
+        termextractor=TermExtractor( [ args.language ], max_ngram=args.max_ngram, remove_stopwords=True, use_spellcheck_tool=False )
+
+        def get_terms( text ):
+            sentences=[ sentence.strip() for sentence in text.split( "\n" ) if sentence.strip() ]
+            terms_lemmas, _=termextractor.get_terms_ner( sentences, language=args.language )
+            return { term for term, _ in terms_lemmas }
+
+    start=time.time()
+    n_documents=0
+    for text in iter_jsonl_texts( args.input, text_field=args.text_field, language=args.language ):
+        index.add_document( get_terms( text ) )
+        n_documents+=1
+        if n_documents % args.save_every == 0:
+            index.save( args.output )
+            print( f"{n_documents} documents processed ({n_documents/( time.time()-start ):.1f} documents/s), {len( index )} terms." )
+
+    index.save( args.output )
+    print( f"Done: {n_documents} documents added, index {args.output} contains {index.n_documents} documents and {len( index )} terms." )
+
+
+if __name__ == '__main__':
+
+    parser=argparse.ArgumentParser( description="Document frequency index of terms, used for the idf of the term scores (see [TermScoring] section of the config file)." )
+    subparsers=parser.add_subparsers( dest='command', required=True )
+
+    build_parser=subparsers.add_parser( 'build', help="Build (or update) a document frequency index from crawl JSONL files, streaming the documents." )
+    build_parser.add_argument( '--input', nargs='+', required=True, help="Crawl JSONL files (one JSON document per line)." )
+    build_parser.add_argument( '--output', required=True, help="Directory of the index, e.g. media/document_frequency/en. An existing index is updated." )
+    build_parser.add_argument( '--language', required=True, help="Language of the documents. Documents with another 'language' field are skipped." )
+    build_parser.add_argument( '--text_field', default='text', help="Field of the JSON documents containing the text." )
+    build_parser.add_argument( '--vocabulary', default=None, help="File with one term per line. If given, the occurrences of these terms are counted instead of extracting the terms with a TermExtractor." )
+    build_parser.add_argument( '--max_ngram', type=int, default=10, help="Maximum length of the extracted terms (TermExtractor only)." )
+    build_parser.add_argument( '--save_every', type=int, default=10000, help="Save the index every save_every documents." )
+
+    args=parser.parse_args()
+    if args.command == 'build':
+        build_index( args )
@@ -1,37 +1,113 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.feature_extraction.text import CountVectorizer
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Tuple
+from itertools import islice
 import operator
 
-def calculate_frequency(corpus: List, list_of_terms: List, max_ngram_len: int) -> List:
+import numpy as np
+
+#number of sentences transformed at once. Memory use is bounded by the sparse count matrix of one batch.
+BATCH_SIZE = 10000
+
+
+def iter_batches(corpus: Iterable[str], batch_size: int = BATCH_SIZE) -> Iterator[List[str]]:
+    """
+    :param corpus: iterable of sentences, e.g. a generator streaming a crawl
+    :param batch_size: number of sentences per batch
+    :return: iterator of lists of sentences
+    """
+
+    if batch_size < 1:
+        raise ValueError(f"batch_size should be >= 1, but received {batch_size}")
+
+    iterator = iter(corpus)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_feature_names(vectorizer: CountVectorizer) -> List[str]:
+    """
+    :param vectorizer: fitted (or fixed vocabulary) vectorizer
+    :return: the feature names, using get_feature_names_out when available (get_feature_names is deprecated)
+    """
+
+    if hasattr(vectorizer, "get_feature_names_out"):
+        return list(vectorizer.get_feature_names_out())
+    return vectorizer.get_feature_names()
+
+
+def calculate_term_and_document_frequencies(corpus: Iterable[str], list_of_terms: List, max_ngram_len: int,
+                                            lowercase: bool = False,
+                                            batch_size: int = BATCH_SIZE) -> Tuple[List[str], np.ndarray, np.ndarray, int]:
     """
-    :param corpus: list of sentences
+    Counts the terms in a corpus streamed in batches. Only column sums of the sparse count matrix of every batch are
+    kept, so memory use does not grow with the size of the corpus.
+
+    :param corpus: iterable of sentences (documents)
+    :param list_of_terms: list of ngrams (vocabulary)
+    :param max_ngram_len: maximal ngram length
+    :param lowercase: whether to lowercase the sentences before counting
+    :param batch_size: number of sentences counted at once
+    :return: (terms, term frequencies, document frequencies, number of documents). The arrays are aligned to terms,
+        which has the order of list_of_terms.
+    """
+
+    vectorizer = CountVectorizer(vocabulary=list_of_terms, ngram_range=(1, max_ngram_len), lowercase=lowercase)
+    term_frequencies = np.zeros(len(list_of_terms), dtype=np.int64)
+    document_frequencies = np.zeros(len(list_of_terms), dtype=np.int64)
+    n_documents = 0
+
+    for batch in iter_batches(corpus, batch_size):
+        tf = vectorizer.transform(batch).tocsc()
+        term_frequencies += np.asarray(tf.sum(axis=0), dtype=np.int64).ravel()
+        # number of non zero entries per column, i.e. number of sentences containing the term
+        document_frequencies += np.diff(tf.indptr)
+        n_documents += len(batch)
+
+    return get_feature_names(vectorizer), term_frequencies, document_frequencies, n_documents
+
+
+def calculate_frequency(corpus: Iterable[str], list_of_terms: List, max_ngram_len: int,
+                        batch_size: int = BATCH_SIZE) -> List:
+    """
+    :param corpus: iterable of sentences
     :param list_of_terms: list of ngrams
     :param max_ngram_len: maximal ngram length
-    :return:
+    :param batch_size: number of sentences counted at once
+    :return: list of (term, count) tuples, in the order of list_of_terms
     """
 
-    vectorizer = CountVectorizer(vocabulary=list_of_terms, ngram_range=(1, max_ngram_len), lowercase=False)
-    tf = vectorizer.transform(corpus)
-    word_list = vectorizer.get_feature_names()
-    count_list = tf.toarray().sum(axis=0)
+    word_list, count_list, _, _ = calculate_term_and_document_frequencies(corpus, list_of_terms, max_ngram_len,
+                                                                          batch_size=batch_size)
     terms_and_counts = list(zip(word_list, count_list))
     return terms_and_counts
 
 
-def calculate_tf_idf(corpus: List, list_of_terms: List, max_ngram_len: int) -> Dict:
+def calculate_idf(document_frequencies: np.ndarray, n_documents: int) -> np.ndarray:
+    """
+    :param document_frequencies: number of documents containing each term
+    :param n_documents: number of documents
+    :return: smoothed idf of each term, as computed by sklearn's TfidfVectorizer ( ln((1+n)/(1+df)) + 1 )
+    """
+
+    return np.log((1 + n_documents) / (1 + np.asarray(document_frequencies, dtype=np.float64))) + 1
+
+
+def calculate_tf_idf(corpus: Iterable[str], list_of_terms: List, max_ngram_len: int,
+                     batch_size: int = BATCH_SIZE) -> Dict:
     """
     :param max_ngram_len: maximal ngram length
-    :param corpus: a list of text segments
+    :param corpus: an iterable of text segments
     :param list_of_terms: a list of terms
+    :param batch_size: number of text segments counted at once
     :return: {term : tf-idf}
     """
 
-    vectorizer = TfidfVectorizer(vocabulary=list_of_terms, ngram_range=(1, max_ngram_len + 1), sublinear_tf=True)
-    vectorizer.fit_transform(corpus)
-    terms_n_tfidf = {}
-    for term, score in zip(vectorizer.get_feature_names(), vectorizer.idf_):
-        terms_n_tfidf.update({term: score})
+    terms, _, document_frequencies, n_documents = calculate_term_and_document_frequencies(
+        corpus, list_of_terms, max_ngram_len + 1, lowercase=True, batch_size=batch_size)
+    terms_n_tfidf = dict(zip(terms, calculate_idf(document_frequencies, n_documents)))
 
     terms_n_tfidf = dict(sorted(terms_n_tfidf.items(), key=operator.itemgetter(1), reverse=True))
 
@@ -0,0 +1,97 @@
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from ..aliases import Term_lemma
+
+#( sentence index, begin, end, term, lemma )
+Term_occurrence=Tuple[ int, int, int, str, str ]
+
+
+class TermOccurrences():
+
+    '''
+    Compact result of TermExtractor.get_term_occurrences_ner: every occurrence of an extracted term is stored as ( sentence index, begin, end, index of the term ) in four int arrays, the (term, lemma) strings are stored once per unique term. Offsets are relative to the sentence. No spacy Doc or Span objects are referenced, so the parsed sentences can be freed as soon as the terms are extracted.
+    '''
+
+    __slots__=( 'sentences', 'begins', 'ends', 'term_indices', 'terms', 'lemmas', '_term_indices' )
+
+    def __init__( self ):
+
+        self.sentences=array( 'l' )
+        self.begins=array( 'l' )
+        self.ends=array( 'l' )
+        self.term_indices=array( 'l' )
+        #unique terms, the lemma of every term (lemma of its first occurrence) and the index of every term
+        self.terms=[]
+        self.lemmas=[]
+        self._term_indices={}
+
+    def __len__( self )->int:
+
+        return len( self.term_indices )
+
+    def __iter__( self )->Iterator[ Term_occurrence ]:
+
+        for sentence, begin, end, index in zip( self.sentences, self.begins, self.ends, self.term_indices ):
+            yield ( sentence, begin, end, self.terms[ index ], self.lemmas[ index ] )
+
+    def get_index( self, term:str )->Optional[ int ]:
+
+        '''
+        :param term: str.
+        :return: int or None. Index of the term, None if it was not added yet.
+        '''
+
+        return self._term_indices.get( term )
+
+    def add_term( self, term:str, lemma:str )->int:
+
+        '''
+        :param term: str.
+        :param lemma: str. Ignored if the term was already added.
+        :return: int. Index of the term.
+        '''
+
+        index=self._term_indices.get( term )
+        if index is None:
+            index=self._term_indices[ term ]=len( self.terms )
+            self.terms.append( term )
+            self.lemmas.append( lemma )
+        return index
+
+    def append( self, sentence:int, begin:int, end:int, index:int ):
+
+        '''
+        :param sentence: int. Index of the sentence.
+        :param begin: int. Offset of the occurrence in the sentence.
+        :param end: int.
+        :param index: int. Index of the term ( see self.add_term ).
+        '''
+
+        self.sentences.append( sentence )
+        self.begins.append( begin )
+        self.ends.append( end )
+        self.term_indices.append( index )
+
+    def extend( self, other:'TermOccurrences', sentence_offset:int=0 ):
+
+        '''
+        Adds the occurrences of other (e.g. of the next chunk of a document), whose sentence indices start at sentence_offset.
+
+        :param other: TermOccurrences.
+        :param sentence_offset: int. Number of sentences preceding the sentences of other.
+        '''
+
+        mapping=[ self.add_term( term, lemma ) for term, lemma in zip( other.terms, other.lemmas ) ]
+        self.sentences.extend( sentence+sentence_offset for sentence in other.sentences )
+        self.begins.extend( other.begins )
+        self.ends.extend( other.ends )
+        self.term_indices.extend( mapping[ index ] for index in other.term_indices )
+
+    def get_terms_lemmas( self )->List[ Term_lemma ]:
+
+        '''
+        :return: List of (term,lemma) Tuples, unique on the term (as returned by TermExtractor.get_terms_ner).
+        '''
+
+        return list( zip( self.terms, self.lemmas ) )
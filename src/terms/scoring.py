@@ -0,0 +1,49 @@
+from typing import List, Optional
+
+import numpy as np
+
+from .document_frequency import DocumentFrequencyTable
+
+
+class TermScorer():
+
+    '''
+    Scores the terms detected in a document with a sublinear tf-idf: ( 1+log( tf ) )*idf. The term frequencies are the number of occurrences of the terms in the document, the idf comes from a precomputed DocumentFrequencyTable. Without a DocumentFrequencyTable the idf is 1, i.e. terms are scored by their frequency only (a term occurring once has score 1.0).
+    '''
+
+    def __init__( self, document_frequency_table:Optional[ DocumentFrequencyTable ]=None ):
+
+        '''
+        :param document_frequency_table: DocumentFrequencyTable or None. Document frequencies of the language of the documents.
+        '''
+
+        self._document_frequency_table=document_frequency_table
+
+    def score( self, terms:List[ str ], term_frequencies:np.ndarray, variants:Optional[ List[ str ] ]=None, variant_terms:Optional[ np.ndarray ]=None )->np.ndarray:
+
+        '''
+        Scores all terms at once.
+
+        :param terms: List of str. Lowercased terms.
+        :param term_frequencies: np.ndarray. Number of occurrences of every term in the document.
+        :param variants: List of str or None. Surface forms of the terms, e.g. the inflected variants of the terms when the terms are lemmas (see TermIndex). If given, the idf of a term is computed from the document frequencies of its variants (see DocumentFrequencyTable.get_grouped_idf) instead of the document frequency of the term itself.
+        :param variant_terms: np.ndarray or None. Index of the term of every variant.
+        :return: np.ndarray. Score of every term (0.0 for terms that do not occur).
+        '''
+
+        term_frequencies=np.asarray( term_frequencies, dtype=np.float64 )
+
+        if len( terms ) != len( term_frequencies ):
+            raise ValueError( f"Number of terms ({len( terms )}) should be equal to the number of term frequencies ({len( term_frequencies )})." )
+
+        scores=np.zeros( len( terms ), dtype=np.float64 )
+        occurring=term_frequencies > 0
+        scores[ occurring ]=1+np.log( term_frequencies[ occurring ] )
+
+        if self._document_frequency_table is not None:
+            if variants is None:
+                scores*=self._document_frequency_table.get_idf( terms )
+            else:
+                scores*=self._document_frequency_table.get_grouped_idf( variants, variant_terms, len( terms ) )
+
+        return scores
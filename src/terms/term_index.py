@@ -0,0 +1,88 @@
+from typing import Dict, List, Union
+
+import ahocorasick as ahc
+import numpy as np
+
+from ..aliases import Term_lemma
+from ..annotations.utils import make_term_automaton
+
+
+class TermIndex():
+
+    '''
+    Index of the terms detected in a document. Every unique (lowercased) surface form of a term is a variant, with one entry in the Aho-Corasick automaton. Variants are grouped under a key: the variant itself, or, when aggregating lemmas, the (lowercased) lemma, so inflected variants ("permit", "permits", "Permits") share one record and one count.
+    '''
+
+    def __init__( self, terms_lemmas:List[ Term_lemma ], aggregate_lemmas:bool=False ):
+
+        '''
+        :param terms_lemmas: List of (term,lemma) Tuples, e.g. obtained via a TermExtractor.
+        :param aggregate_lemmas: bool. Whether to group the variants under their lemma.
+        '''
+
+        self.aggregate_lemmas=aggregate_lemmas
+
+        #unique variants (lowercased terms), lemma of every variant (the lemma of its first occurrence) and index of the key of every variant
+        self.variants=[]
+        self.variant_lemmas=[]
+        self.variant_keys=[]
+        #unique keys (variants, or lemmas when aggregating) and the index of every key
+        self.keys=[]
+        key_indices={}
+        variants_unique=set()
+
+        for term, lemma in terms_lemmas:
+            term=term.lower()
+            if term in variants_unique:
+                continue
+            variants_unique.add( term )
+            lemma=lemma.lower()
+
+            #terms without lemma are their own key
+            key=lemma if ( aggregate_lemmas and lemma ) else term
+            if key not in key_indices:
+                key_indices[ key ]=len( self.keys )
+                self.keys.append( key )
+
+            self.variants.append( term )
+            self.variant_lemmas.append( lemma )
+            self.variant_keys.append( key_indices[ key ] )
+
+        self.variant_keys=np.array( self.variant_keys, dtype=np.int64 )
+
+    def __len__( self )->int:
+
+        return len( self.keys )
+
+    def make_automaton( self )->ahc.Automaton:
+
+        '''
+        :return: ahocorasick.Automaton with one entry per variant (see make_term_automaton). The value of a variant is ( index of the variant, variant ).
+        '''
+
+        return make_term_automaton( self.variants )
+
+    def count( self, variant_indices:List[ int ] )->np.ndarray:
+
+        '''
+        :param variant_indices: List of int. Index of the variant of every occurrence found in a document.
+        :return: np.ndarray. Number of occurrences of every key.
+        '''
+
+        variant_indices=np.asarray( variant_indices, dtype=np.int64 )
+        return np.bincount( self.variant_keys[ variant_indices ], minlength=len( self.keys ) )
+
+    def get_records( self, counts:np.ndarray, scores:np.ndarray )->List[ Dict[ str, Union[ str, List[ str ], int, float ] ] ]:
+
+        '''
+        :param counts: np.ndarray. Number of occurrences of every key (see self.count).
+        :param scores: np.ndarray. Score of every key.
+        :return: List of Dict. One record ( 'term', 'variants', 'count', 'score' ) per key that occurs in the document. 'term' is the key (the lemma when aggregating).
+        '''
+
+        variants=[ [] for _ in self.keys ]
+        for variant, key in zip( self.variants, self.variant_keys ):
+            variants[ key ].append( variant )
+
+        return [ { 'term': key, 'variants': variants[ i ], 'count': int( counts[ i ] ), 'score': float( scores[ i ] ) } \
+                for i, key in enumerate( self.keys ) if counts[ i ] > 0 ]
@@ -1,15 +1,8 @@
+import importlib
 import string
-from typing import List, Dict, Union, Set, Tuple
+from typing import Iterator, List, Dict, Union, Set, Tuple
 
 import spacy
-import spacy_udpipe
-
-import de_core_news_lg
-import en_core_web_lg
-import nl_core_news_lg
-import fr_core_news_lg
-import nb_core_news_lg
-import it_core_news_lg
 
 from nltk.corpus import stopwords as NLTK_STOPWORDS
 from spacy.lang.de.stop_words import STOP_WORDS as STOP_WORDS_DE
@@ -21,22 +14,15 @@ from spacy.lang.sl.stop_words import STOP_WORDS as STOP_WORDS_SL
 from spacy.lang.hr.stop_words import STOP_WORDS as STOP_WORDS_HR
 from spacy.lang.nb.stop_words import STOP_WORDS as STOP_WORDS_NB
 
-from spacy.lang.de import German
-from spacy.lang.en import English
-from spacy.lang.nl import Dutch
-from spacy.lang.fr import French
-from spacy.lang.it import Italian
-from spacy.lang.nb import Norwegian
-from spacy_udpipe.language import UDPipeLanguage
-
+from spacy.language import Language
 from spacy.tokens.span import Span
 from spacy.tokens.doc import Doc
 
-import language_tool_python
-from language_tool_python.server import LanguageTool
-
 #type aliasing named entity, term_lemma
+from .. import instrumentation
 from ..aliases import Named_entity, Term_lemma
+from ..annotations.segmentation import iter_chunk_offsets, iter_sentence_offsets_mode
+from .occurrences import TermOccurrences
 
 
 class TermExtractor():
@@ -49,6 +35,9 @@ class TermExtractor():
     INVALID_POS_TAGS = ['DET', 'PUNCT', 'ADP', 'CCONJ', 'SYM', 'NUM', 'PRON', 'SCONJ', 'ADV' ] # , 'VERB', 'AUX' ]
     
     PUNCTUATION_AND_DIGITS = string.punctuation.replace('-', '0123456789').replace('\'', '')+"\t" 
+    
+    #spacy model package of every language, imported when the language is loaded ( 'sl' and 'hr' use spacy_udpipe models ).
+    SPACY_MODEL_PACKAGES={ 'en': 'en_core_web_lg', 'de': 'de_core_news_lg', 'nl': 'nl_core_news_lg', 'fr': 'fr_core_news_lg', 'it': 'it_core_news_lg', 'nb': 'nb_core_news_lg' }
 
     def __init__( self, languages:List[str], max_ngram:int=10, remove_stopwords:bool=True , use_spellcheck_tool:bool=False ):
         '''
@@ -92,54 +81,166 @@ class TermExtractor():
         
         term_list=[]
         ner_list=[]
-        for doc in self._nlp_dict[ language ].pipe( sentences, n_process=n_jobs, batch_size=batch_size ):
-            #get the NER's
-            ner_list.append( self._ner_doc( doc ) )
+        with instrumentation.stage( 'spacy_parse' ):
+            for doc in self._nlp_dict[ language ].pipe( sentences, n_process=n_jobs, batch_size=batch_size ):
+                #get the NER's
+                ner_list.append( self._ner_doc( doc ) )
+                
+                #for each sentence, self._parse_doc returns a list of terms (List of spacy Span objects)
+                term_list.extend( self._parse_doc( doc ) )
+        
+        with instrumentation.stage( 'term_cleaning' ):
+            #remove duplicates from the list of spacy Span objects
+            term_list=self._make_term_list_unique( term_list )
+            
+            cleaned_term_list=[]
             
-            #for each sentence, self._parse_doc returns a list of terms (List of spacy Span objects)
-            term_list.extend( self._parse_doc( doc ) )
-        
-        #remove duplicates from the list of spacy Span objects
-        term_list=self._make_term_list_unique( term_list )
-        
-        cleaned_term_list=[]
-        
-        for term in term_list:
-            #if not clean, continue
-            if not self._term_text_is_clean( term.text ):
-                continue
-            term=self._front_cleaning( term )
-            if not term:
-                continue
-            term=self._back_cleaning( term )
-            if not term:
-                continue
-            if not self._length_is_conform( term ):
-                continue
-            if self._remove_stopwords:
-                if not self._term_is_not_stopword( term, language ):
+            for term in term_list:
+                term=self._clean_term( term, language )
+                if term is None:
                     continue
-        
-            #append valid terms to the cleaned term list.
-            cleaned_term_list.append( term )
-        
-        #remove duplicates from the list of spacy Span objects. Note we need to remove this a second time because we did front and back cleaning
-        #which could have mapped different spacy Span objects to the same spacy Span object.
-        cleaned_term_list=self._make_term_list_unique( cleaned_term_list )
+            
+                #append valid terms to the cleaned term list.
+                cleaned_term_list.append( term )
+            
+            #remove duplicates from the list of spacy Span objects. Note we need to remove this a second time because we did front and back cleaning
+            #which could have mapped different spacy Span objects to the same spacy Span object.
+            cleaned_term_list=self._make_term_list_unique( cleaned_term_list )
         
         #spellcheck the list of terms (Spacy Span objects)
         if self._use_spellcheck_tool:
-            cleaned_term_list=self._spellcheck( cleaned_term_list, language )
+            with instrumentation.stage( 'spellcheck' ):
+                cleaned_term_list=self._spellcheck( cleaned_term_list, language )
             
         #get the lemma of each term (terms can be multi-words)
-        for i,term in enumerate( cleaned_term_list ):
-            lemma=self._lemmatize( term )
-            cleaned_term_list[i]=( term.text.strip(), lemma )
+        with instrumentation.stage( 'lemmatization' ):
+            for i,term in enumerate( cleaned_term_list ):
+                lemma=self._lemmatize( term )
+                cleaned_term_list[i]=( term.text.strip(), lemma )
           
         return cleaned_term_list, ner_list
 
 
-    def _load_nlp_models( self )->Dict[ str, Union[ German, English, Dutch, French, Italian, Norwegian, UDPipeLanguage ] ]:
+    def get_term_occurrences_ner( self, sentences: List[str], n_jobs:int=1, batch_size:int=32, language:str='en' )->Tuple[ TermOccurrences, List[List[Named_entity]] ]:
+        '''
+        Variant of self.get_terms_ner that keeps the offsets spacy found for every term. Every noun phrase of a sentence (see self._parse_doc) is cleaned as in self.get_terms_ner, and stored as an occurrence ( sentence index, begin, end, term ) in a TermOccurrences object, so the spacy Doc of a sentence can be freed as soon as the sentence is parsed. The occurrences can be annotated directly via AnnotationAdder.add_token_annotation_occurrences, without searching the terms in the document again.
+        
+        Unlike the terms returned by self.get_terms_ner (which are searched in the whole document by AnnotationAdder.add_token_annotation), a term is only annotated where it was extracted by spacy.
+        
+        :param sentences: List of strings. Sentences to process.
+        :param n_jobs:int. Number of processers to use for Spacy.
+        :param batch_size: int. Batch size used by the Spacy model.
+        :param language: str. Language of the sentences.
+        :return Tuple. TermOccurrences of the extracted terms, with offsets relative to the sentence. List with a list of named entities (Named_entity) for each sentence.
+        '''
+        
+        if language not in self._languages:
+            raise ValueError( f"Language '{language}' not in list of loaded languages {self._languages}. Please initialize TermExtractor object with language '{language}'. Also please make sure language '{language}' is in the list of supported languages {self.SUPPORTED_LANGUAGES}." )
+        
+        occurrences=TermOccurrences()
+        ner_list=[]
+        #spellcheck every unique term once
+        spellchecked={}
+        #parsing and cleaning are interleaved (the Doc of a sentence is cleaned before the next sentence is parsed), so they are timed as one stage
+        with instrumentation.stage( 'spacy_parse_term_cleaning' ):
+            for i, doc in enumerate( self._nlp_dict[ language ].pipe( sentences, n_process=n_jobs, batch_size=batch_size ) ):
+                ner_list.append( self._ner_doc( doc ) )
+                
+                #the same span can be found for several roots of the dependency tree
+                spans=set()
+                for term in self._parse_doc( doc ):
+                    term=self._clean_term( term, language )
+                    if term is None or ( term.start_char, term.end_char ) in spans:
+                        continue
+                    spans.add( ( term.start_char, term.end_char ) )
+                    
+                    text=term.text.strip()
+                    if self._use_spellcheck_tool:
+                        if text not in spellchecked:
+                            spellchecked[ text ]=bool( self._spellcheck( [ term ], language ) )
+                        if not spellchecked[ text ]:
+                            continue
+                        
+                    #every unique term is lemmatized once
+                    index=occurrences.get_index( text )
+                    if index is None:
+                        index=occurrences.add_term( text, self._lemmatize( term ) )
+                    occurrences.append( i, term.start_char, term.end_char, index )
+                
+        return occurrences, ner_list
+
+
+    def get_terms_ner_chunked( self, text:str, sentence_segmentation:str='newline', max_chunk_chars:int=100000, n_jobs:int=1, batch_size:int=32, language:str='en' )->Tuple[ List[Term_lemma], List[List[Named_entity]] ]:
+        '''
+        Windowed version of self.get_terms_ner for very long documents. The text is processed in paragraph-aligned chunks (see iter_chunk_offsets): the sentences of a chunk are passed to self.get_terms_ner, so the spacy Doc and Span objects of a chunk are freed before the next chunk is processed. Only the extracted (term, lemma) tuples and named entities are kept, so peak memory does not grow with the length of the document.
+        
+        :param text: String. Text to process (e.g. the sofa string of a cas).
+        :param sentence_segmentation: String. Sentence segmentation mode (see iter_sentence_offsets_mode). Should be the mode used to add the SENTENCE_TYPE annotations, so the returned named entities are aligned with them.
+        :param max_chunk_chars: int. Maximum number of characters of a chunk.
+        :param n_jobs:int. Number of processers to use for Spacy.
+        :param batch_size: int. Batch size used by the Spacy model.
+        :param language: str. Language of the text.
+        :return Tuple of Lists. First List contains the extracted terms and the corresponding lemma (Term_lemma), unique on the term. Second List contains a list of named entities (Named_entity) for each sentence of the text, with offsets relative to the sentence (as returned by self.get_terms_ner).
+        '''
+        
+        term_list=[]
+        unique_terms=set()
+        ner_list=[]
+        for sentences in self._iter_chunk_sentences( text, sentence_segmentation, max_chunk_chars ):
+            chunk_terms, chunk_ners=self.get_terms_ner( sentences, n_jobs=n_jobs, batch_size=batch_size, language=language )
+            
+            #terms found in previous chunks are not added again
+            for term in chunk_terms:
+                if term[0] not in unique_terms:
+                    term_list.append( term )
+                    unique_terms.add( term[0] )
+            ner_list.extend( chunk_ners )
+            
+        return term_list, ner_list
+
+
+    def get_term_occurrences_ner_chunked( self, text:str, sentence_segmentation:str='newline', max_chunk_chars:int=100000, n_jobs:int=1, batch_size:int=32, language:str='en' )->Tuple[ TermOccurrences, List[List[Named_entity]] ]:
+        '''
+        Windowed version of self.get_term_occurrences_ner for very long documents (see self.get_terms_ner_chunked).
+        
+        :return Tuple. TermOccurrences of the extracted terms, with sentence indices over the whole text and offsets relative to the sentence. List with a list of named entities (Named_entity) for each sentence of the text.
+        '''
+        
+        occurrences=TermOccurrences()
+        ner_list=[]
+        for sentences in self._iter_chunk_sentences( text, sentence_segmentation, max_chunk_chars ):
+            chunk_occurrences, chunk_ners=self.get_term_occurrences_ner( sentences, n_jobs=n_jobs, batch_size=batch_size, language=language )
+            occurrences.extend( chunk_occurrences, sentence_offset=len( ner_list ) )
+            ner_list.extend( chunk_ners )
+            
+        return occurrences, ner_list
+
+
+    def _iter_chunk_sentences( self, text:str, sentence_segmentation:str, max_chunk_chars:int )->Iterator[ List[str] ]:
+        '''
+        Sentences of every paragraph-aligned chunk of the text (see iter_chunk_offsets).
+        '''
+        
+        for chunk_begin, chunk_end in iter_chunk_offsets( text, max_chunk_chars ):
+            chunk=text[ chunk_begin:chunk_end ]
+            yield [ chunk[ begin:end ] for begin, end in iter_sentence_offsets_mode( chunk, sentence_segmentation ) ]
+
+
+    def get_nlp( self, language:str )->Language:
+        '''
+        Get the loaded spacy model of a language, e.g. to share it with other components instead of loading it a second time.
+        
+        :param language: str. Language of the spacy model.
+        :return: Loaded spacy model.
+        '''
+        
+        if language not in self._languages:
+            raise ValueError( f"Language '{language}' not in list of loaded languages {self._languages}." )
+        
+        return self._nlp_dict[ language ]
+
+
+    def _load_nlp_models( self )->Dict[ str, Language ]:
 
         print( f"Loading nlp models for the languages { self._languages}..." )
         
@@ -148,19 +249,11 @@ class TermExtractor():
             if language not in self.SUPPORTED_LANGUAGES:
                 raise ValueError( f"Language '{language}' not supported. Supported languages are {supported_languages}." )
 
-            if language=='en': 
-                nlp_dict[ language ]=en_core_web_lg.load()
-            elif language=='de':
-                nlp_dict[ language ]=de_core_news_lg.load()
-            elif language=='nl':
-                nlp_dict[ language ]=nl_core_news_lg.load()
-            elif language=='fr':
-                nlp_dict[ language ]=fr_core_news_lg.load()
-            elif language=='it':
-                nlp_dict[ language ]=it_core_news_lg.load()
-            elif language=='nb':
-                nlp_dict[ language ]=nb_core_news_lg.load()
+            #the model packages are only imported for the loaded languages
+            if language in self.SPACY_MODEL_PACKAGES:
+                nlp_dict[ language ]=importlib.import_module( self.SPACY_MODEL_PACKAGES[ language ] ).load()
             elif language=='sl':
+                import spacy_udpipe
                 try:
                     #this throws generic Exception when 'sl' model is not downloaded first
                     nlp_dict[ 'sl' ] = spacy_udpipe.load("sl")
@@ -168,6 +261,7 @@ class TermExtractor():
                     spacy_udpipe.download( 'sl' )
                     nlp_dict[ 'sl' ] = spacy_udpipe.load( 'sl' )
             elif language=='hr':    
+                import spacy_udpipe
                 try:
                     #this throws generic Exception when 'hr' model is not downloaded first
                     nlp_dict[ 'hr' ] = spacy_udpipe.load( 'hr' )
@@ -211,7 +305,9 @@ class TermExtractor():
         return stopwords_dict
     
     
-    def _load_spellcheckers( self )->Dict[ str, LanguageTool ]:
+    def _load_spellcheckers( self )->Dict[ str, 'language_tool_python.LanguageTool' ]:
+        
+        import language_tool_python
         
         print( f"Loading spellcheckers for the languages { self._languages}..." )
 
@@ -358,6 +454,30 @@ class TermExtractor():
 
         return unique_terms
     
+    def _clean_term( self, term:Span, language:str )->Union[ type(None), Span ]:
+        '''
+        Cleaning rules of self.get_terms_ner applied to a single term.
+        
+        :param term: Span.
+        :param language: String. Language, for stopword list.
+        :return: Span, or None if the term is not valid.
+        '''
+        
+        if not self._term_text_is_clean( term.text ):
+            return None
+        term=self._front_cleaning( term )
+        if not term:
+            return None
+        term=self._back_cleaning( term )
+        if not term:
+            return None
+        if not self._length_is_conform( term ):
+            return None
+        if self._remove_stopwords:
+            if not self._term_is_not_stopword( term, language ):
+                return None
+        return term
+    
     def _length_is_conform( self, term:Span )->bool:
         '''
         Check length of the Span object ( the ngram ) (i.e. max numer of tokens in the ngram, should be smaller than self._max_ngram).
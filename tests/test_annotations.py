@@ -2,11 +2,16 @@ import os
 
 import configparser
 
+import numpy as np
+
 from cassis.typesystem import load_typesystem
 
 import pytest
 from src.annotations.annotations import AnnotationAdder, get_sentences_index, get_paragraphs_index
 from src.annotations.utils import is_token
+from src.terms.document_frequency import DocumentFrequencyTable
+from src.terms.occurrences import TermOccurrences
+from src.terms.scoring import TermScorer
 
 MEDIA_ROOT='tests/test_files'
                         
@@ -158,6 +163,120 @@ def test_add_token_annotation( text, tokens, offsets, this_annotation_adder, req
     assert offsets_pred == offsets
     
     
+def test_add_sentence_annotation_rules():
+    
+    '''
+    With SENTENCE_SEGMENTATION=rules, lines are split at sentence ends.
+    '''
+    
+    rules_config=configparser.ConfigParser()
+    rules_config.read_dict( config )
+    rules_config[ 'Annotation' ][ 'SENTENCE_SEGMENTATION' ]='rules'
+    annotation_adder=AnnotationAdder( TYPESYSTEM, rules_config )
+    
+    annotation_adder.create_cas_from_text( " First sentence. Second one!\nThird" )
+    annotation_adder.add_sentence_annotation()
+    sentences=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID'] ).select( config[ 'Annotation' ]['SENTENCE_TYPE'] )
+    assert [ sentence.get_covered_text() for sentence in sentences ] == [ "First sentence.", "Second one!", "Third" ]
+    
+    #the mode can be overridden per call
+    annotation_adder.add_sentence_annotation( sentence_segmentation='newline' )
+    sentences=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID'] ).select( config[ 'Annotation' ]['SENTENCE_TYPE'] )
+    assert [ sentence.get_covered_text() for sentence in sentences ] == [ "First sentence. Second one!", "Third" ]
+    
+    rules_config[ 'Annotation' ][ 'SENTENCE_SEGMENTATION' ]='unknown'
+    with pytest.raises( ValueError ):
+        AnnotationAdder( TYPESYSTEM, rules_config )
+    
+    
+def test_add_token_annotation_score( annotation_adder ):
+    
+    '''
+    The score of a token is the score of its term, computed from the number of occurrences of the term in the document.
+    '''
+    
+    annotation_adder.create_cas_from_text( "Livestock and more livestock.\nOther livestock, other farm." )
+    annotation_adder.add_token_annotation( [ ( 'livestock', 'livestock' ), ( 'farm', 'farm' ), ( 'cow', 'cow' ) ] )
+    token_pred=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID']  ).select( config[ 'Annotation' ]['TOKEN_TYPE'] )
+    scores={ token.term: token.score for token in token_pred }
+    assert [ token.term for token in token_pred ] == [ 'livestock', 'livestock', 'livestock', 'farm' ]
+    assert scores[ 'farm' ] == pytest.approx( 1.0 )
+    assert scores[ 'livestock' ] == pytest.approx( 1+np.log( 3 ) )
+    
+    
+def test_add_token_annotation_aggregate_lemmas( annotation_adder ):
+    
+    '''
+    With aggregate_lemmas, inflected variants of a term share one count, score and record.
+    '''
+    
+    terms_lemmas=[ ( 'permit', 'permit' ), ( 'Permits', 'permit' ), ( 'permits', 'permit' ), ( 'farm', 'farm' ) ]
+    
+    annotation_adder.create_cas_from_text( "A permit.\nTwo permits for the farm." )
+    annotation_adder.add_token_annotation( terms_lemmas, aggregate_lemmas=True )
+    token_pred=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID']  ).select( config[ 'Annotation' ]['TOKEN_TYPE'] )
+    assert [ ( token.term, token.lemma ) for token in token_pred ] == [ ( 'permit', 'permit' ), ( 'permits', 'permit' ), ( 'farm', 'farm' ) ]
+    assert token_pred[ 0 ].score == pytest.approx( 1+np.log( 2 ) )
+    assert token_pred[ 1 ].score == pytest.approx( 1+np.log( 2 ) )
+    assert annotation_adder.term_records == [ 
+        { 'term': 'permit', 'variants': [ 'permit', 'permits' ], 'count': 2, 'score': pytest.approx( 1+np.log( 2 ) ) },
+        { 'term': 'farm', 'variants': [ 'farm' ], 'count': 1, 'score': pytest.approx( 1.0 ) } ]
+    
+    #without aggregation, every variant is its own term
+    annotation_adder.add_token_annotation( terms_lemmas )
+    assert [ record[ 'term' ] for record in annotation_adder.term_records ] == [ 'permit', 'permits', 'farm' ]
+    
+    
+def test_add_token_annotation_aggregate_lemmas_document_frequencies( annotation_adder ):
+    
+    '''
+    The document frequency tables count surface forms: an aggregated lemma gets the idf of its most frequent variant (or of the lemma itself), not the highest idf of an unknown term.
+    '''
+    
+    terms_lemmas=[ ( 'permits', 'permit' ), ( 'farms', 'farm' ) ]
+    table=DocumentFrequencyTable( { 'permits': 9, 'permit': 3, 'farm': 4 }, n_documents=10 )
+    
+    annotation_adder.create_cas_from_text( "Two permits for the farms." )
+    annotation_adder.add_token_annotation( terms_lemmas, term_scorer=TermScorer( table ), aggregate_lemmas=True )
+    scores={ record[ 'term' ]: record[ 'score' ] for record in annotation_adder.term_records }
+    assert scores[ 'permit' ] == pytest.approx( np.log( 11/10 )+1 )
+    assert scores[ 'farm' ] == pytest.approx( np.log( 11/5 )+1 )
+    
+    
+def test_add_token_annotation_occurrences( annotation_adder ):
+    
+    '''
+    Term occurrences found by the TermExtractor are annotated at their offsets, with the same scores as the annotations found via the automaton.
+    '''
+    
+    text="Livestock and more livestock.\nOther livestock, other farm."
+    
+    #occurrences of two chunks ( one sentence each )
+    occurrences=TermOccurrences()
+    occurrences.append( 0, 0, 9, occurrences.add_term( 'Livestock', 'livestock' ) )
+    occurrences.append( 0, 19, 28, occurrences.add_term( 'livestock', 'livestock' ) )
+    assert occurrences.get_index( 'livestock' ) == 1 and occurrences.get_index( 'farm' ) is None
+    chunk_occurrences=TermOccurrences()
+    chunk_occurrences.append( 0, 6, 15, chunk_occurrences.add_term( 'livestock', 'livestock' ) )
+    chunk_occurrences.append( 0, 23, 27, chunk_occurrences.add_term( 'farm', 'farm' ) )
+    occurrences.extend( chunk_occurrences, sentence_offset=1 )
+    assert len( occurrences ) == 4
+    assert occurrences.get_terms_lemmas() == [ ( 'Livestock', 'livestock' ), ( 'livestock', 'livestock' ), ( 'farm', 'farm' ) ]
+    assert list( occurrences )[ 2: ] == [ ( 1, 6, 15, 'livestock', 'livestock' ), ( 1, 23, 27, 'farm', 'farm' ) ]
+    
+    annotation_adder.create_cas_from_text( text )
+    annotation_adder.add_token_annotation_occurrences( occurrences )
+    token_pred=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID']  ).select( config[ 'Annotation' ]['TOKEN_TYPE'] )
+    tokens_occurrences=[ ( token.begin, token.end, token.term, token.score ) for token in token_pred ]
+    records_occurrences=annotation_adder.term_records
+    
+    annotation_adder.create_cas_from_text( text )
+    annotation_adder.add_token_annotation( [ ( 'livestock', 'livestock' ), ( 'farm', 'farm' ) ] )
+    token_pred=annotation_adder.cas.get_view( config[ 'Annotation' ]['SOFA_ID']  ).select( config[ 'Annotation' ]['TOKEN_TYPE'] )
+    assert tokens_occurrences == [ ( token.begin, token.end, token.term, token.score ) for token in token_pred ]
+    assert records_occurrences == annotation_adder.term_records
+    
+    
 @pytest.mark.parametrize(
     "text, values, labels, offsets,this_annotation_adder",
     [
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip( 'fastapi' )
+pytest.importorskip( 'cassis' )
+pytest.importorskip( 'torch' )
+pytest.importorskip( 'transformers' )
+
+import app  # noqa: E402
+from src.sentence_classification.trainer_bert_sequence_classifier import TrainerBertSequenceClassifier  # noqa: E402
+
+
+def test_sentence_classifier_is_loaded_by_registry( monkeypatch ):
+
+    '''
+    The sentence classifier component holds its model once loaded (by the warm-up or the master of serve.py), it is not loaded on the first request.
+    '''
+
+    def load_model( self, num_labels=None ):
+        self.model=object()
+        self.tokenizer=object()
+
+    #the trained model (app.PATH_MODEL) is not needed, only that the loader loads it
+    monkeypatch.setattr( TrainerBertSequenceClassifier, 'load_model', load_model )
+
+    classifier=app.components.get( 'sentence_classifier' )
+    assert classifier.is_loaded
+    assert hasattr( classifier.classifier, 'model' )
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from benchmarks.benchmark_pipelines import StageTimer
+
+
+class Extractor():
+
+    def get_terms_ner( self, chunk ):
+        time.sleep( 0.01 )
+        return chunk
+
+    def get_terms_ner_chunked( self, chunks ):
+        return [ self.get_terms_ner( chunk ) for chunk in chunks ]
+
+    async def predict_async( self, documents ):
+        await asyncio.sleep( 0.01 )
+        return documents
+
+
+def test_stage_timer_counts_nested_calls_once():
+
+    '''
+    A call nested in a call of the same stage is not timed again, the wrapped functions are restored.
+    '''
+
+    timer=StageTimer()
+    extractor=Extractor()
+    for name in [ 'get_terms_ner', 'get_terms_ner_chunked' ]:
+        timer.wrap( Extractor, name, 'spacy_terms_ner' )
+    timer.wrap( extractor, 'predict_async', 'sequence_classification' )
+
+    assert extractor.get_terms_ner_chunked( [ 'a', 'b', 'c' ] ) == [ 'a', 'b', 'c' ]
+    extractor.get_terms_ner( 'd' )
+    assert asyncio.run( extractor.predict_async( [ 'e' ] ) ) == [ 'e' ]
+
+    summary=timer.summary()
+    #the chunked call is counted once (its 3 chunks are not counted as well), and the direct call once
+    assert summary[ 'spacy_terms_ner' ][ 'n' ] == 2
+    assert summary[ 'sequence_classification' ][ 'n' ] == 1
+
+    timer.restore()
+    assert 'predict_async' not in extractor.__dict__
+    assert not hasattr( Extractor.get_terms_ner, '__wrapped__' )
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.components import ComponentRegistry
+
+
+def test_component_registry():
+    
+    '''
+    Components are loaded once, on first use or by the warm-up, and their import and load times are reported.
+    '''
+    
+    calls=[]
+    registry=ComponentRegistry()
+    registry.register( 'a', lambda: calls.append( 'a' ) or 'A', imports=[ 'json' ] )
+    registry.register( 'b', lambda: calls.append( 'b' ) or registry.get( 'a' )+'B' )
+    with pytest.raises( ValueError ):
+        registry.register( 'a', lambda: None )
+    
+    assert [ record[ 'status' ] for record in registry.report() ] == [ 'pending', 'pending' ]
+    assert registry.get( 'b' ) == 'AB'
+    assert asyncio.run( registry.get_async( 'a' ) ) == 'A'
+    assert calls == [ 'b', 'a' ]
+    assert all( record[ 'status' ] == 'loaded' and record[ 'load_seconds' ] is not None for record in registry.report() )
+    
+    with pytest.raises( KeyError ):
+        registry.get( 'c' )
+
+
+def test_component_registry_warm_up():
+    
+    '''
+    The warm-up loads components in a background thread, a failing component does not stop the warm-up and is retried on next use.
+    '''
+    
+    release=threading.Event()
+    attempts=[]
+    
+    def load_slow():
+        release.wait( 5 )
+        return 'slow'
+    
+    def load_failing():
+        attempts.append( 1 )
+        if len( attempts ) == 1:
+            raise RuntimeError( "model not found" )
+        return 'ok'
+    
+    registry=ComponentRegistry()
+    registry.register( 'slow', load_slow )
+    registry.register( 'failing', load_failing )
+    
+    done=threading.Event()
+    thread=registry.warm_up( [ 'slow', 'failing' ], background=True, on_done=done.set )
+    assert not registry.is_loaded( 'slow' )
+    release.set()
+    thread.join( 5 )
+    assert done.is_set()
+    
+    report={ record[ 'name' ]: record for record in registry.report() }
+    assert report[ 'slow' ][ 'status' ] == 'loaded'
+    assert report[ 'failing' ][ 'status' ] == 'failed'
+    assert "model not found" in report[ 'failing' ][ 'error' ]
+    assert registry.get( 'failing' ) == 'ok'
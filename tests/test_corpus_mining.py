@@ -0,0 +1,31 @@
+from src.terms.corpus_mining import add_document_terms, get_sentences, merge_tables, rank_terms, write_glossary
+
+
+def test_corpus_mining_tables( tmp_path ):
+    
+    '''
+    Unit test for the map (add_document_terms) and reduce (merge_tables) steps of the corpus mining, and the ranking of the glossary.
+    '''
+    
+    shard_1={}
+    sentences=get_sentences( "Livestock on the farm.\n\n  More livestock. \n" )
+    assert sentences == [ "Livestock on the farm.", "More livestock." ]
+    add_document_terms( shard_1, sentences, [ ( 'Livestock', 'livestock' ), ( 'farm', 'farm' ) ] )
+    
+    shard_2={}
+    add_document_terms( shard_2, get_sentences( "Farms and a farm." ), [ ( 'farms', 'farm' ), ( 'farm', 'farm' ) ] )
+    add_document_terms( shard_2, get_sentences( "Nothing here." ), [] )
+    
+    merged=merge_tables( [ shard_1, shard_2 ] )
+    assert merged[ 'livestock' ][ :2 ] == [ 2, 1 ]
+    assert merged[ 'farm' ][ :2 ] == [ 2, 2 ]
+    assert merged[ 'farms' ][ :2 ] == [ 1, 1 ]
+    
+    glossary=rank_terms( merged )
+    assert glossary == [ ( 'farm', 'farm', 2, 2 ), ( 'livestock', 'livestock', 2, 1 ), ( 'farms', 'farm', 1, 1 ) ]
+    assert rank_terms( merged, min_document_frequency=2 ) == [ ( 'farm', 'farm', 2, 2 ) ]
+    
+    write_glossary( str( tmp_path / 'glossary.tsv' ), glossary )
+    lines=( tmp_path / 'glossary.tsv' ).read_text().splitlines()
+    assert lines[ 0 ] == "term\tlemma\tfrequency\tdocument_frequency"
+    assert lines[ 1 ] == "farm\tfarm\t2\t2"
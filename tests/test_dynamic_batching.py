@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from src.sentence_classification.dynamic_batching import DynamicBatcher
+
+
+def test_dynamic_batcher_dispatches_results():
+
+    '''
+    Unit test for DynamicBatcher.submit. Every caller should receive the results for its own items, in order.
+    '''
+
+    batcher=DynamicBatcher( lambda items: [ item*2 for item in items ], max_batch_size=8, max_latency_ms=5 )
+
+    futures=[ batcher.submit( list( range( i, i+3 ) ) ) for i in range( 5 ) ]
+
+    assert [ future.result( timeout=5 ) for future in futures ] == [ [ 2*i, 2*i+2, 2*i+4 ] for i in range( 5 ) ]
+    assert batcher.submit( [] ).result( timeout=5 ) == []
+
+
+def test_dynamic_batcher_merges_concurrent_requests():
+
+    '''
+    Items submitted by concurrent callers within max_latency_ms should be processed in a single call of the predict function.
+    '''
+
+    batch_sizes=[]
+    release=threading.Event()
+
+    def predict_function( items ):
+        #block the first batch, so the other requests queue up behind it
+        release.wait( timeout=5 )
+        batch_sizes.append( len( items ) )
+        return items
+
+    batcher=DynamicBatcher( predict_function, max_batch_size=100, max_latency_ms=50 )
+
+    first=batcher.submit( [ 0 ] )
+    others=[ batcher.submit( [ i ] ) for i in range( 1, 11 ) ]
+    release.set()
+
+    assert first.result( timeout=5 ) == [ 0 ]
+    assert [ future.result( timeout=5 ) for future in others ] == [ [ i ] for i in range( 1, 11 ) ]
+    assert sum( batch_sizes ) == 11
+    assert len( batch_sizes ) < 11
+
+
+def test_dynamic_batcher_propagates_exceptions():
+
+    '''
+    An exception raised by the predict function should be set on the futures of all callers in the batch.
+    '''
+
+    def predict_function( items ):
+        raise RuntimeError( "model failure" )
+
+    batcher=DynamicBatcher( predict_function, max_batch_size=8, max_latency_ms=1 )
+
+    with pytest.raises( RuntimeError ):
+        batcher.submit( [ 1, 2 ] ).result( timeout=5 )
+
+    with pytest.raises( ValueError ):
+        DynamicBatcher( predict_function, max_batch_size=0 )
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from src import instrumentation
+
+
+@pytest.fixture()
+def enabled():
+    instrumentation.reset_metrics()
+    instrumentation.configure_instrumentation( { 'ENABLED': 'true', 'LOG_REQUESTS': 'false', 'BUCKETS': '0.5,10' } )
+    yield
+    instrumentation.configure_instrumentation( { 'ENABLED': 'false' } )
+    instrumentation.reset_metrics()
+
+
+def test_disabled():
+    
+    '''
+    When disabled, stages are a shared no-op context manager and nothing is recorded.
+    '''
+    
+    instrumentation.configure_instrumentation( {} )
+    assert instrumentation.stage( 'a' ) is instrumentation.stage( 'b' )
+    with instrumentation.stage( 'a' ):
+        instrumentation.count( 'documents_total' )
+    assert instrumentation.render_metrics() == "\n"
+    
+
+def test_instrumented( enabled ):
+    
+    '''
+    Stage timings and counts are collected per request, and exported as histograms and counters labeled with the endpoint.
+    '''
+    
+    records=[]
+    
+    @instrumentation.instrumented( '/endpoint' )
+    async def endpoint( n:int ):
+        with instrumentation.stage( 'parse' ):
+            instrumentation.count( 'sentences_total', n )
+        with instrumentation.stage( 'parse' ):
+            pass
+        records.append( instrumentation.get_request_record() )
+        if n < 0:
+            raise ValueError()
+        return n
+    
+    assert asyncio.run( endpoint( 3 ) ) == 3
+    assert asyncio.run( endpoint( n=2 ) ) == 2
+    with pytest.raises( ValueError ):
+        asyncio.run( endpoint( -1 ) )
+    assert instrumentation.get_request_record() is None
+    
+    assert records[ 0 ][ 'endpoint' ] == '/endpoint'
+    assert list( records[ 0 ][ 'stages_ms' ] ) == [ 'parse' ]
+    assert records[ 0 ][ 'counts' ] == { 'sentences_total': 3 }
+    
+    #outside requests, counts are not labeled with an endpoint
+    instrumentation.count( 'classifier_batches_total' )
+    
+    metrics=instrumentation.render_metrics().splitlines()
+    assert '# TYPE request_duration_seconds histogram' in metrics
+    assert 'request_duration_seconds_bucket{endpoint="/endpoint",le="10.0"} 3' in metrics
+    assert 'request_duration_seconds_bucket{endpoint="/endpoint",le="+Inf"} 3' in metrics
+    assert 'stage_duration_seconds_count{stage="parse"} 6' in metrics
+    assert 'sentences_total{endpoint="/endpoint"} 4' in metrics
+    assert 'requests_total{endpoint="/endpoint",status="ok"} 2' in metrics
+    assert 'requests_total{endpoint="/endpoint",status="error"} 1' in metrics
+    assert 'classifier_batches_total 1' in metrics
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from src.jobs.job_queue import JobQueue, JobQueueFullError
+from src.jobs.store import DiskJobStore, InMemoryJobStore, JobStore
+
+
+def wait_for_job( job_queue, job_id, timeout=5 ):
+
+    start=time.time()
+    while time.time()-start < timeout:
+        record=job_queue.get( job_id )
+        if record[ 'status' ] in [ 'done', 'failed' ]:
+            return record
+        time.sleep( 0.01 )
+    raise TimeoutError( f"Job {job_id} did not finish within {timeout} seconds." )
+
+
+@pytest.fixture( params=[ 'memory', 'disk' ] )
+def job_store( request, tmp_path ):
+    if request.param == 'memory':
+        return InMemoryJobStore( ttl_seconds=60 )
+    return DiskJobStore( str( tmp_path ), ttl_seconds=60 )
+
+
+def test_job_queue_results( job_store ):
+
+    '''
+    Unit test for JobQueue.submit and JobQueue.get. Results (or errors) of the jobs should be available via the job id.
+    '''
+
+    job_queue=JobQueue( job_store, max_workers=2, max_pending=10 )
+
+    job_id=job_queue.submit( lambda segments: [ segment.upper() for segment in segments ], [ 'a', 'b' ] )
+    record=wait_for_job( job_queue, job_id )
+    assert record[ 'status' ] == 'done'
+    assert record[ 'result' ] == [ 'A', 'B' ]
+
+    def failing_job():
+        raise ValueError( "invalid segment" )
+
+    job_id=job_queue.submit( failing_job )
+    record=wait_for_job( job_queue, job_id )
+    assert record[ 'status' ] == 'failed'
+    assert record[ 'error' ] == "ValueError: invalid segment"
+
+    assert job_queue.get( 'unknown' ) is None
+
+
+def test_job_queue_is_bounded():
+
+    '''
+    Submitting more than max_pending unfinished jobs should raise a JobQueueFullError.
+    '''
+
+    release=threading.Event()
+    job_queue=JobQueue( InMemoryJobStore(), max_workers=1, max_pending=2 )
+
+    job_ids=[ job_queue.submit( release.wait, 5 ) for _ in range( 2 ) ]
+    with pytest.raises( JobQueueFullError ):
+        job_queue.submit( release.wait, 5 )
+
+    release.set()
+    for job_id in job_ids:
+        assert wait_for_job( job_queue, job_id )[ 'status' ] == 'done'
+
+    #the queue accepts new jobs once the previous ones are finished
+    assert wait_for_job( job_queue, job_queue.submit( lambda: 1 ) )[ 'result' ] == 1
+
+
+@pytest.mark.parametrize( "store_type", [ 'memory', 'disk' ] )
+def test_job_store_expiry( store_type, tmp_path ):
+
+    '''
+    Expired records should no longer be returned by the store.
+    '''
+
+    if store_type == 'memory':
+        job_store=InMemoryJobStore( ttl_seconds=0.05 )
+    else:
+        job_store=DiskJobStore( str( tmp_path ), ttl_seconds=0.05 )
+
+    job_store.put( 'job', { 'status': 'done' } )
+    assert job_store.get( 'job' ) == { 'status': 'done' }
+
+    time.sleep( 0.1 )
+    assert job_store.get( 'job' ) is None
+
+
+def test_incomplete_job_store():
+
+    '''
+    A store that does not implement all methods of JobStore can not be instantiated.
+    '''
+
+    class IncompleteJobStore( JobStore ):
+
+        def put( self, job_id, record ):
+            pass
+
+    with pytest.raises( TypeError ):
+        IncompleteJobStore()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from src.terms.metrics import calculate_frequency, calculate_term_and_document_frequencies, calculate_tf_idf, iter_batches
+
+CORPUS=[ "The farm has livestock .", "Livestock and more livestock", "A farm", "", "the Farm animal farm" ]
+TERMS=[ 'livestock', 'farm', 'farm animal', 'cow' ]
+
+
+@pytest.mark.parametrize( "batch_size", [ 1, 2, 100 ] )
+def test_calculate_frequency( batch_size ):
+    
+    '''
+    Counts should not depend on the batch size and should equal the column sums of the (dense) count matrix.
+    '''
+    
+    vectorizer=CountVectorizer( vocabulary=TERMS, ngram_range=( 1, 2 ), lowercase=False )
+    expected=vectorizer.transform( CORPUS ).toarray()
+    
+    #the corpus can be a generator
+    terms, term_frequencies, document_frequencies, n_documents=calculate_term_and_document_frequencies( ( sentence for sentence in CORPUS ), TERMS, 2, batch_size=batch_size )
+    assert terms == TERMS
+    assert list( term_frequencies ) == list( expected.sum( axis=0 ) )
+    assert list( document_frequencies ) == list( ( expected > 0 ).sum( axis=0 ) )
+    assert n_documents == len( CORPUS )
+    
+    assert calculate_frequency( CORPUS, TERMS, 2, batch_size=batch_size ) == list( zip( TERMS, expected.sum( axis=0 ) ) )
+
+
+def test_calculate_tf_idf():
+    
+    '''
+    calculate_tf_idf should return the idf of sklearn's TfidfVectorizer, sorted from high to low.
+    '''
+    
+    vectorizer=TfidfVectorizer( vocabulary=TERMS, ngram_range=( 1, 3 ), sublinear_tf=True )
+    vectorizer.fit_transform( CORPUS )
+    
+    terms_n_tfidf=calculate_tf_idf( CORPUS, TERMS, 2, batch_size=2 )
+    assert list( terms_n_tfidf.values() ) == sorted( terms_n_tfidf.values(), reverse=True )
+    for term, idf in zip( TERMS, vectorizer.idf_ ):
+        assert terms_n_tfidf[ term ] == pytest.approx( idf )
+
+
+def test_iter_batches():
+    
+    assert list( iter_batches( range( 5 ), 2 ) ) == [ [ 0, 1 ], [ 2, 3 ], [ 4 ] ]
+    with pytest.raises( ValueError ):
+        list( iter_batches( [], 0 ) )
@@ -0,0 +1,122 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+import pytest
+
+from src.components import ComponentRegistry
+from src.prefork import PreforkServer, check_preloaded, create_socket, get_memory_usage, parse_smaps
+
+SMAPS_ROLLUP="""55c4b2981000-7ffc7d643000 ---p 00000000 00:00 0                          [rollup]
+Rss:                2048 kB
+Pss:                1024 kB
+Shared_Clean:       1024 kB
+Shared_Dirty:          0 kB
+Private_Clean:       512 kB
+Private_Dirty:       512 kB
+"""
+
+
+def test_parse_smaps():
+
+    '''
+    USS is the sum of the private pages, the fields of several mappings (smaps) are summed.
+    '''
+
+    assert parse_smaps( SMAPS_ROLLUP ) == { 'rss_mb': 2.0, 'pss_mb': 1.0, 'uss_mb': 1.0, 'shared_mb': 1.0 }
+    assert parse_smaps( SMAPS_ROLLUP*2 )[ 'uss_mb' ] == 2.0
+
+
+@pytest.mark.skipif( not os.path.exists( '/proc/self/smaps' ), reason="requires /proc/<pid>/smaps" )
+def test_get_memory_usage():
+
+    usage=get_memory_usage( os.getpid() )
+    assert usage[ 'rss_mb' ] > 0 and usage[ 'uss_mb' ] <= usage[ 'rss_mb' ]
+
+
+class Classifier():
+
+    def __init__( self, is_loaded:bool ):
+
+        self.is_loaded=is_loaded
+
+
+def test_check_preloaded():
+
+    '''
+    Preloading fails loudly when a component failed to load or did not load its model.
+    '''
+
+    def fail():
+        raise OSError( "no model" )
+
+    components=ComponentRegistry()
+    components.register( 'module', lambda: os )
+    components.register( 'loaded', lambda: Classifier( True ) )
+    components.register( 'lazy', lambda: Classifier( False ) )
+    components.register( 'failed', fail )
+    components.warm_up( background=False )
+
+    check_preloaded( components, [ 'module', 'loaded' ] )
+    with pytest.raises( RuntimeError, match="without its model" ):
+        check_preloaded( components, [ 'lazy' ] )
+    with pytest.raises( RuntimeError, match="no model" ):
+        check_preloaded( components, [ 'failed' ] )
+
+
+def serve_pid( sock:socket.socket ):
+
+    while True:
+        connection, _=sock.accept()
+        with connection:
+            connection.sendall( str( os.getpid() ).encode() )
+
+
+def request_pid( port:int )->int:
+
+    with socket.create_connection( ( '127.0.0.1', port ), timeout=5 ) as connection:
+        return int( connection.recv( 32 ).decode() )
+
+
+def test_prefork_server():
+
+    '''
+    The workers share the socket of the master, a worker that exits is restarted, and the workers are stopped on SIGTERM.
+    '''
+
+    sock=create_socket( '127.0.0.1', 0 )
+    port=sock.getsockname()[ 1 ]
+    server=PreforkServer( serve_pid, sock, workers=2, report_delay=None, timeout=5 )
+    results={}
+
+    def client():
+        try:
+            deadline=time.monotonic()+10
+            while len( server.pids ) < 2 and time.monotonic() < deadline:
+                time.sleep( 0.05 )
+            results[ 'started' ]=set( server.pids )
+            results[ 'pids' ]={ request_pid( port ) for _ in range( 10 ) }
+            killed=server.pids[ 0 ]
+            os.kill( killed, signal.SIGKILL )
+            deadline=time.monotonic()+10
+            while ( killed in server.pids or len( server.pids ) < 2 ) and time.monotonic() < deadline:
+                time.sleep( 0.1 )
+            results[ 'restarted' ]=killed not in server.pids and len( server.pids ) == 2
+            results[ 'workers' ]=server.pids
+        finally:
+            os.kill( os.getpid(), signal.SIGTERM )
+
+    thread=threading.Thread( target=client )
+    thread.start()
+    server.run()
+    thread.join()
+    sock.close()
+
+    assert results[ 'pids' ] and results[ 'pids' ] <= results[ 'started' ]
+    assert results[ 'restarted' ]
+    assert server.pids == []
+    for pid in results[ 'workers' ]:
+        with pytest.raises( ProcessLookupError ):
+            os.kill( pid, 0 )
@@ -0,0 +1,102 @@
+import asyncio
+import cProfile
+import time
+
+import pytest
+
+from src.profiling import RequestProfiler
+
+
+def work():
+    return sum( i*i for i in range( 10000 ) )
+
+
+def test_request_profiler( tmp_path ):
+    
+    '''
+    Profiles are stored with a text summary, only the most recent ones are kept, and only generated ids are served.
+    '''
+    
+    with pytest.raises( ValueError ):
+        RequestProfiler( str( tmp_path ), token='' )
+    
+    assert RequestProfiler.from_config( { 'ENABLED': 'false' } ) is None
+    
+    profiler=RequestProfiler( str( tmp_path ), token='secret', max_profiles=2 )
+    assert profiler.is_authorized( 'secret' )
+    assert not profiler.is_authorized( 'wrong' )
+    assert not profiler.is_authorized( None )
+    
+    assert profiler.acquire()
+    assert not profiler.acquire()
+    profiler.release()
+    
+    profile_ids=[]
+    for i in range( 3 ):
+        profile=cProfile.Profile()
+        profile.enable()
+        work()
+        profile.disable()
+        profile_ids.append( profiler.save( profile, f"POST /extract_terms {i}", 0.01 ) )
+        time.sleep( 0.002 )
+    
+    profiles=profiler.list_profiles()
+    assert len( profiles ) == 2
+    assert [ profile[ 'id' ] for profile in profiles ] == profile_ids[ :0:-1 ]
+    
+    profile_id=profiles[ 0 ][ 'id' ]
+    with open( profiler.get_path( profile_id, '.txt' ), encoding='utf-8' ) as f:
+        summary=f.read()
+    assert summary.startswith( "POST /extract_terms" )
+    assert "work" in summary
+    assert profiler.get_path( profile_id, '.prof' ) is not None
+    
+    assert profiler.get_path( '../secret' ) is None
+    assert profiler.get_path( profile_id, '.py' ) is None
+
+
+def test_request_profiler_exclusive( tmp_path ):
+    
+    '''
+    In exclusive mode, the requests in flight are drained before profiling starts, and new requests wait until profiling ends.
+    '''
+    
+    profiler=RequestProfiler( str( tmp_path ), token='secret', drain_timeout=5 )
+    events=[]
+    
+    async def request( name, seconds ):
+        async with profiler.track_request():
+            events.append( f"start {name}" )
+            await asyncio.sleep( seconds )
+            events.append( f"end {name}" )
+    
+    async def profiled_request():
+        concurrent_requests=await profiler.start_exclusive()
+        events.append( f"profile {concurrent_requests}" )
+        await asyncio.sleep( 0.02 )
+        events.append( "end profile" )
+        profiler.end_exclusive()
+    
+    async def run():
+        in_flight=asyncio.create_task( request( 'in flight', 0.02 ) )
+        await asyncio.sleep( 0 )
+        profiled=asyncio.create_task( profiled_request() )
+        await asyncio.sleep( 0 )
+        new=asyncio.create_task( request( 'new', 0 ) )
+        await asyncio.gather( in_flight, profiled, new )
+    
+    asyncio.run( run() )
+    assert events == [ "start in flight", "end in flight", "profile 0", "end profile", "start new", "end new" ]
+    
+    #the drain times out: the profile reports the request in flight
+    profiler=RequestProfiler( str( tmp_path ), token='secret', drain_timeout=0.01 )
+    events.clear()
+    
+    async def run_timeout():
+        in_flight=asyncio.create_task( request( 'in flight', 0.1 ) )
+        await asyncio.sleep( 0 )
+        await profiled_request()
+        await in_flight
+    
+    asyncio.run( run_timeout() )
+    assert events == [ "start in flight", "profile 1", "end profile", "end in flight" ]
@@ -0,0 +1,119 @@
+import glob
+import json
+import os
+import random
+
+import pytest
+
+from src.annotations.annotations import get_sentences_index, get_paragraphs_index, get_paragraphs_index_trafilatura
+from src.annotations.segmentation import iter_sentence_offsets, iter_sentence_offsets_mode, iter_paragraph_offsets, iter_paragraph_offsets_trafilatura, iter_chunk_offsets
+
+MEDIA_ROOT='tests/test_files'
+
+HELPERS=[ ( get_sentences_index, iter_sentence_offsets ),
+          ( get_paragraphs_index, iter_paragraph_offsets ),
+          ( get_paragraphs_index_trafilatura, iter_paragraph_offsets_trafilatura ) ]
+
+
+def read_test_texts():
+    
+    texts=[]
+    for path in sorted( glob.glob( os.path.join( MEDIA_ROOT, '*' ) ) ):
+        with open( path, encoding='utf-8' ) as f:
+            text=f.read()
+        texts.append( text )
+        if path.endswith( '.json' ):
+            texts.append( json.loads( text )[ 'text' ] )
+    return texts
+
+
+@pytest.mark.parametrize( "split_helper, regex_helper", HELPERS )
+def test_segmentation_parity_test_files( split_helper, regex_helper ):
+    
+    '''
+    The regex based offsets should be identical to the offsets of the split based helpers on the test files.
+    '''
+    
+    for text in read_test_texts():
+        assert list( regex_helper( text ) ) == split_helper( text )
+
+
+@pytest.mark.parametrize( "split_helper, regex_helper", HELPERS )
+@pytest.mark.parametrize(
+    "text",
+    [ "", "\n", "\n\n", " \t \n", "  This is a sentence\n Another one\n\n other\n\n", "a\r\nb\r\n\r\nc",
+      "- a\n- b\nc", "- a\n\n- b\n\nc\n", "x\n- a\n \n- b", "- a\n- b\n\n\n", "-a\n - b\n- c", "\x0c a \n" ]
+)
+def test_segmentation_parity_edge_cases( split_helper, regex_helper, text ):
+    
+    assert list( regex_helper( text ) ) == split_helper( text )
+
+
+@pytest.mark.parametrize( "split_helper, regex_helper", HELPERS )
+def test_segmentation_parity_random( split_helper, regex_helper ):
+    
+    '''
+    Parity on random texts made of words, whitespace, newlines and list markers.
+    '''
+    
+    random.seed( 0 )
+    alphabet=[ "a", "bc", " ", "\t", "\r", "\n", "\n", "- ", "-", "\xa0" ]
+    for _ in range( 2000 ):
+        text="".join( random.choice( alphabet ) for _ in range( random.randint( 0, 40 ) ) )
+        assert list( regex_helper( text ) ) == split_helper( text ), repr( text )
+
+
+@pytest.mark.parametrize(
+    "text, sentences",
+    [ ( "Hello world. This is Dr. Smith!  Is it? yes it is.\n  See e.g. this (J. Doe).  The end.\"  Next", 
+        [ "Hello world.", "This is Dr. Smith!", "Is it? yes it is.", "See e.g. this (J. Doe).", "The end.\"", "Next" ] ),
+      ( "It costs 3.5 euro. Ok\n\n \n", [ "It costs 3.5 euro.", "Ok" ] ),
+      ( "", [] ),
+    ]
+)
+def test_iter_sentence_offsets_rules( text, sentences ):
+    
+    '''
+    Rule based sentence segmentation splits lines at sentence ends, and keeps exact offsets into the text.
+    '''
+    
+    offsets=list( iter_sentence_offsets_mode( text, 'rules' ) )
+    assert [ text[ begin:end ] for begin, end in offsets ] == sentences
+    
+    with pytest.raises( ValueError ):
+        iter_sentence_offsets_mode( text, 'unknown' )
+
+
+def test_iter_sentence_offsets_sentencizer():
+    
+    pytest.importorskip( "spacy" )
+    
+    text="Hello world. This is a test!\n  Second line.  "
+    offsets=list( iter_sentence_offsets_mode( text, 'sentencizer' ) )
+    assert [ text[ begin:end ] for begin, end in offsets ] == [ "Hello world.", "This is a test!", "Second line." ]
+
+
+def test_iter_chunk_offsets():
+    
+    '''
+    Chunks are aligned to line boundaries, are at most max_chunk_chars long (unless a single line is longer), and contain every sentence exactly once.
+    '''
+    
+    random.seed( 0 )
+    alphabet=[ "a", "bc", " ", ". ", "\n", "\n", "\n\n" ]
+    for _ in range( 1000 ):
+        text="".join( random.choice( alphabet ) for _ in range( random.randint( 0, 80 ) ) )
+        max_chunk_chars=random.randint( 1, 30 )
+        chunks=list( iter_chunk_offsets( text, max_chunk_chars ) )
+        
+        sentences=[]
+        for begin, end in chunks:
+            assert begin == 0 or text[ begin-1 ] == "\n"
+            assert end == len( text ) or text[ end ] == "\n"
+            assert end-begin <= max_chunk_chars or "\n" not in text[ begin:end ]
+            sentences+=[ ( begin+sentence_begin, begin+sentence_end ) for sentence_begin, sentence_end in iter_sentence_offsets_mode( text[ begin:end ], 'rules' ) ]
+        assert sentences == list( iter_sentence_offsets_mode( text, 'rules' ) ), repr( text )
+    
+    assert list( iter_chunk_offsets( "a\nb\n\nc", 100 ) ) == [ ( 0, 6 ) ]
+    with pytest.raises( ValueError ):
+        list( iter_chunk_offsets( "a", 0 ) )
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+import pytest
+
+from src.service_profiles import ServiceProfile, parse_list
+
+ENDPOINT_COMPONENTS={ '/chunking': [ 'trafilatura' ], '/extract_terms': [ 'trafilatura', 'term_extractor' ],
+                      '/question_generator': [ 'question_generator' ] }
+
+Route=namedtuple( 'Route', [ 'path' ] )
+
+
+def test_components_of_profile():
+
+    '''
+    Only the components of the endpoints of the profile are needed, without duplicates.
+    '''
+
+    profile=ServiceProfile( 'terms', [ '/chunking', '/extract_terms' ], ENDPOINT_COMPONENTS )
+    assert profile.components == [ 'trafilatura', 'term_extractor' ]
+
+    profile=ServiceProfile( 'full', [ '*' ], ENDPOINT_COMPONENTS )
+    assert profile.endpoints == list( ENDPOINT_COMPONENTS )
+    assert profile.components == [ 'trafilatura', 'term_extractor', 'question_generator' ]
+
+
+def test_filter_routes():
+
+    profile=ServiceProfile( 'question_generation', [ '/question_generator' ], ENDPOINT_COMPONENTS )
+    routes=[ Route( '/' ), Route( '/chunking' ), Route( '/question_generator/jobs/{job_id}' ), Route( '/question_generator_v2' ),
+             Route( '/startup' ), Route( '/docs/oauth2-redirect' ) ]
+
+    assert [ route.path for route in profile.filter_routes( routes ) ] == [ '/', '/question_generator/jobs/{job_id}', '/startup', '/docs/oauth2-redirect' ]
+
+
+def test_from_config():
+
+    profiles={ 'full': '*', 'chunking': ' /chunking, ', 'broken': '/chunking,/unknown', 'empty': '' }
+
+    assert ServiceProfile.from_config( 'chunking', profiles, ENDPOINT_COMPONENTS ).endpoints == [ '/chunking' ]
+    with pytest.raises( ValueError ):
+        ServiceProfile.from_config( 'unknown', profiles, ENDPOINT_COMPONENTS )
+    with pytest.raises( ValueError ):
+        ServiceProfile.from_config( 'broken', profiles, ENDPOINT_COMPONENTS )
+    with pytest.raises( ValueError ):
+        ServiceProfile.from_config( 'empty', profiles, ENDPOINT_COMPONENTS )
+
+
+def test_parse_list():
+
+    assert parse_list( 'en, de,,nl ' ) == [ 'en', 'de', 'nl' ]
+    assert parse_list( '' ) == []
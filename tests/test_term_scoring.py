@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.terms.document_frequency import DocumentFrequencyIndex, DocumentFrequencyTable, iter_jsonl_texts, load_document_frequency_table
+from src.terms.scoring import TermScorer
+
+
+def test_term_scorer_without_document_frequencies():
+    
+    '''
+    Without document frequencies, terms are scored by their sublinear term frequency.
+    '''
+    
+    scores=TermScorer().score( [ 'livestock', 'farm', 'cow' ], np.array( [ 1, 3, 0 ] ) )
+    assert np.allclose( scores, [ 1.0, 1+np.log( 3 ), 0.0 ] )
+    
+    with pytest.raises( ValueError ):
+        TermScorer().score( [ 'livestock' ], np.array( [ 1, 2 ] ) )
+
+
+def test_term_scorer_with_document_frequencies( tmp_path ):
+    
+    '''
+    Unit test for TermScorer.score using a DocumentFrequencyTable (saved and loaded from disk).
+    '''
+    
+    DocumentFrequencyTable( { 'livestock': 1, 'farm': 9 }, n_documents=9 ).save( str( tmp_path / 'en.tsv' ) )
+    table=load_document_frequency_table( str( tmp_path ), 'en' )
+    assert len( table ) == 2 and table.n_documents == 9
+    
+    scores=TermScorer( table ).score( [ 'livestock', 'farm', 'unknown' ], np.array( [ 2, 2, 1 ] ) )
+    idf=np.log( 10/np.array( [ 2, 10, 1 ] ) )+1
+    assert np.allclose( scores, ( 1+np.log( [ 2, 2, 1 ] ) )*idf )
+    #rare terms score higher than common terms with the same frequency
+    assert scores[ 0 ] > scores[ 1 ]
+    
+    assert load_document_frequency_table( str( tmp_path ), 'nl' ) is None
+
+
+def test_document_frequency_index( tmp_path ):
+    
+    '''
+    Unit test for DocumentFrequencyIndex: documents are added incrementally, and the saved index is memory-mapped when loaded.
+    '''
+    
+    index=DocumentFrequencyIndex()
+    index.add_document( [ 'Livestock', 'farm', 'livestock' ] )
+    index.add_document( [ 'farm' ] )
+    assert index.n_documents == 2 and len( index ) == 2
+    assert list( index.get_document_frequencies( [ 'livestock', 'farm', 'cow' ] ) ) == [ 1, 2, 0 ]
+    
+    index.save( str( tmp_path / 'en' ) )
+    loaded_index=load_document_frequency_table( str( tmp_path ), 'en' )
+    assert isinstance( loaded_index, DocumentFrequencyIndex )
+    assert isinstance( loaded_index._counts, np.memmap ) and isinstance( loaded_index._vocabulary, np.memmap )
+    assert list( loaded_index.get_document_frequencies( [ 'livestock', 'farm', 'cow' ] ) ) == [ 1, 2, 0 ]
+    assert np.allclose( loaded_index.get_idf( [ 'livestock' ] ), np.log( 3/2 )+1 )
+    
+    #update the saved index
+    loaded_index=DocumentFrequencyIndex.load( str( tmp_path / 'en' ), mmap=False )
+    loaded_index.add_document( [ 'cow', 'farm' ] )
+    assert list( loaded_index.get_document_frequencies( [ 'livestock', 'farm', 'cow' ] ) ) == [ 1, 3, 1 ]
+    loaded_index.save( str( tmp_path / 'en' ) )
+    
+    updated_index=DocumentFrequencyIndex.load( str( tmp_path / 'en' ) )
+    assert updated_index.n_documents == 3 and len( updated_index ) == 3
+    assert list( updated_index.get_document_frequencies( [ 'livestock', 'farm', 'cow' ] ) ) == [ 1, 3, 1 ]
+    #only the arrays of the current version are kept
+    assert sorted( os.listdir( tmp_path / 'en' ) ) == [ 'counts-1.npy', 'meta.json', 'vocabulary-1.npy' ]
+
+
+def test_document_frequency_index_lookup( tmp_path ):
+
+    '''
+    Terms are looked up in the sorted vocabulary: unknown terms, terms longer than the longest term of the vocabulary and non-ASCII terms.
+    '''
+
+    index=DocumentFrequencyIndex()
+    index.add_document( [ 'café', 'b', 'farm animal' ] )
+    index.add_document( [ 'b' ] )
+    index.save( str( tmp_path / 'en' ) )
+
+    loaded_index=DocumentFrequencyIndex.load( str( tmp_path / 'en' ) )
+    assert list( loaded_index._vocabulary ) == sorted( term.encode( 'utf-8' ) for term in [ 'café', 'b', 'farm animal' ] )
+    terms=[ 'café', 'b', 'farm animal', 'farm', 'farm animals', 'a', 'zzz', '' ]
+    assert list( loaded_index.get_document_frequencies( terms ) ) == [ 1, 2, 1, 0, 0, 0, 0, 0 ]
+
+    empty_index=DocumentFrequencyIndex()
+    empty_index.save( str( tmp_path / 'nl' ) )
+    assert list( DocumentFrequencyIndex.load( str( tmp_path / 'nl' ) ).get_document_frequencies( [ 'b' ] ) ) == [ 0 ]
+
+
+def test_iter_jsonl_texts( tmp_path ):
+    
+    '''
+    Unit test for iter_jsonl_texts. Invalid lines, lines that are not objects, documents without text and documents in another language are skipped.
+    '''
+    
+    path=tmp_path / 'crawl.jsonl'
+    path.write_text( '{"text": "first", "language": "en"}\n\nnot json\n[ "text" ]\n"text"\n3\n{"text": ""}\n{"text": "second"}\n{"text": "derde", "language": "nl"}\n' )
+    
+    assert list( iter_jsonl_texts( [ str( path ) ] ) ) == [ 'first', 'second', 'derde' ]
+    assert list( iter_jsonl_texts( [ str( path ) ], language='en' ) ) == [ 'first', 'second' ]
+    
+    #the shards (byte ranges) partition the lines of the files, whatever the number of shards
+    other_path=tmp_path / 'crawl_2.jsonl'
+    other_path.write_text( "".join( f'{{"text": "document {i}"}}\n' for i in range( 20 ) ) )
+    paths=[ str( path ), str( other_path ) ]
+    texts=list( iter_jsonl_texts( paths ) )
+    for n_shards in [ 1, 2, 3, 7, 50, 1000 ]:
+        shards=[ list( iter_jsonl_texts( paths, shard=shard, n_shards=n_shards ) ) for shard in range( n_shards ) ]
+        assert [ text for shard in shards for text in shard ] == texts
@@ -125,6 +125,58 @@ def test_get_terms_ner_de():
     assert true_ners==pred_ners
     
 
+def test_get_terms_ner_chunked_en():
+    '''
+    test .get_terms_ner_chunked method of TermExtractor class: processing a text in chunks gives the same named entities (one list per sentence) and the same terms as processing all sentences at once. We use pretrained Spacy model (EN, en_core_web_lg ).
+    '''
+    
+    text="This is a test sentence the 12 test sentence 23 27\ntest sentence\n\nCredit and mortgage account holders of the rich must submit their requests\nThey live in the City Of Monaco near Nice\n"
+    sentences=[ sentence.strip() for sentence in text.split( "\n" ) if sentence.strip() ]
+    
+    termextractor=TermExtractor( languages=[ 'en' ], max_ngram=10, remove_stopwords=True , use_spellcheck_tool=False  )
+    terms, ners=termextractor.get_terms_ner( sentences, language='en' )
+    
+    #one chunk
+    assert termextractor.get_terms_ner_chunked( text, max_chunk_chars=len( text ), language='en' ) == ( terms, ners )
+    
+    #several chunks
+    terms_chunked, ners_chunked=termextractor.get_terms_ner_chunked( text, max_chunk_chars=60, language='en' )
+    assert ners_chunked == ners
+    assert sorted( terms_chunked ) == sorted( set( terms_chunked ) )
+    assert set( term for term, _ in terms_chunked ) == set( term for term, _ in terms )
+
+
+def test_get_term_occurrences_ner_en():
+    '''
+    test .get_term_occurrences_ner method of TermExtractor class: the offsets of every occurrence cover the term in its sentence, and the terms of .get_terms_ner are found. We use pretrained Spacy model (EN, en_core_web_lg ).
+    '''
+    
+    sentences=\
+    [ "Credit and mortgage account holders of the rich must submit their requests",
+      "They live in the City Of Monaco near Nice",
+      "mortgage account holders" ]
+    
+    termextractor=TermExtractor( languages=[ 'en' ], max_ngram=10, remove_stopwords=True , use_spellcheck_tool=False  )
+    terms, ners=termextractor.get_terms_ner( sentences, language='en' )
+    occurrences, ners_occurrences=termextractor.get_term_occurrences_ner( sentences, language='en' )
+    
+    assert ners_occurrences == ners
+    #every noun phrase is cleaned (not only the first one with a given text), so all terms of .get_terms_ner are found
+    assert set( term for term, _ in terms ) <= set( occurrences.terms )
+    for sentence, begin, end, term, _ in occurrences:
+        assert sentences[ sentence ][ begin:end ].strip() == term
+    #'mortgage account holders' is extracted from the first and the last sentence
+    assert { sentence for sentence, _, _, term, _ in occurrences if term == 'mortgage account holders' } == { 0, 2 }
+    
+    #every unique term is lemmatized once, not once per occurrence
+    lemmatized=[]
+    lemmatize=termextractor._lemmatize
+    termextractor._lemmatize=lambda term: lemmatized.append( term.text.strip() ) or lemmatize( term )
+    occurrences, _=termextractor.get_term_occurrences_ner( sentences, language='en' )
+    assert sorted( lemmatized ) == sorted( occurrences.terms )
+    assert len( occurrences ) > len( occurrences.terms )
+
+
 def test_parse_doc_1( doc_example_1 ):
     
     '''